@@ -0,0 +1,207 @@
+"""
+边下载边打包（main.py 默认开启，--no-zip 关闭）
+
+每个文件下载并通过校验后（ItemPipeline 的上传阶段登记）立即加入所在网站的 ZIP
+（{输出目录}/archives/{网站}_{时间}_{进程}.zip），由后台线程顺序写入，不占用下载线程；
+运行结束时只需写出 ZIP 目录，不必再把整个 downloads/ 重新读一遍。校验不通过的错误页和
+半截文件不会进入压缩包。
+
+- mp4 / webm / jpg 等本身已压缩的媒体用 ZIP_STORED 直接存储，其余文件 ZIP_DEFLATED
+- --zip-s3：ZIP 不落本地，按分段上传直接写到 S3（video-materials/archives/...）
+- 写入中的本地 ZIP 带 .part 后缀，关闭时才改名，中断的运行不会留下看似完整的压缩包
+"""
+import os
+import queue
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import ARCHIVE_CONFIG, AWS_S3_CONFIG
+from metrics import QUEUE_DEPTH
+
+# 已压缩的格式，再 deflate 只浪费 CPU
+STORED_EXTENSIONS = {'.mp4', '.webm', '.mov', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.zip'}
+
+
+class S3MultipartWriter:
+    """
+    只写、不可 seek 的 S3 分段上传流（供 zipfile 直接写入）
+
+    缓冲满 part_size 上传一个分段，close() 上传最后一段并完成上传；出错时 abort() 中止。
+    不提供 tell / seek，zipfile 会改用数据描述符的流式格式。
+    """
+
+    def __init__(self, s3_key: str, part_size: int = None):
+        from utils import S3Uploader
+
+        self.client = S3Uploader.get_client()
+        self.bucket = AWS_S3_CONFIG['bucket_name']
+        self.s3_key = s3_key
+        self.part_size = max(part_size or ARCHIVE_CONFIG['s3_part_size'], 5 * 1024 * 1024)  # S3 分段下限 5MB
+        self.upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=s3_key, ContentType='application/zip')['UploadId']
+        self._buffer = bytearray()
+        self._parts = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def _upload_part(self, body: bytes):
+        number = len(self._parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.s3_key, UploadId=self.upload_id, PartNumber=number, Body=body)
+        self._parts.append({'PartNumber': number, 'ETag': response['ETag']})
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._buffer or not self._parts:
+            self._upload_part(bytes(self._buffer))
+            self._buffer = bytearray()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.s3_key, UploadId=self.upload_id,
+            MultipartUpload={'Parts': self._parts})
+
+    def abort(self):
+        self.closed = True
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.s3_key, UploadId=self.upload_id)
+        except Exception as e:
+            print(f"    ⚠️  中止 ZIP 分段上传失败: {e}")
+
+
+class SiteArchiver:
+    """按网站把下载完成的文件追加到 ZIP（后台线程写入）"""
+
+    def __init__(self, output_dir: str, to_s3: bool = False):
+        """
+        Args:
+            output_dir: 下载目录（文件按 {类型}/{网站}/... 存放）
+            to_s3: ZIP 直接分段上传到 S3，不写本地
+        """
+        self.output_dir = Path(output_dir).resolve()
+        self.to_s3 = to_s3
+        self.suffix = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self._archives: Dict[str, zipfile.ZipFile] = {}
+        self._streams = {}
+        self._names = {}
+        self.counts: Dict[str, int] = {}
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='archive', daemon=True)
+        self._thread.start()
+
+    def add(self, path):
+        """登记一个下载完成的文件（立即返回）"""
+        self._queue.put(Path(path))
+        QUEUE_DEPTH.set(self._queue.qsize(), queue='archive')
+
+    def _site_of(self, path: Path) -> Optional[str]:
+        """{输出目录}/text2video|image2video/{网站}/... → 网站"""
+        try:
+            parts = path.resolve().relative_to(self.output_dir).parts
+        except ValueError:
+            return None
+        return parts[1] if len(parts) > 2 else None
+
+    def _open(self, site: str) -> zipfile.ZipFile:
+        name = f"{site}_{self.suffix}.zip"
+        if self.to_s3:
+            stream = S3MultipartWriter(f"{ARCHIVE_CONFIG['s3_prefix']}{name}")
+            self._names[site] = f"s3://{stream.bucket}/{stream.s3_key}"
+        else:
+            path = self.output_dir / 'archives' / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            stream = open(f"{path}.part", 'wb')
+            self._names[site] = str(path)
+        self._streams[site] = stream
+        return zipfile.ZipFile(stream, 'w', allowZip64=True)
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                if path is None:
+                    return
+                site = self._site_of(path)
+                if site is None or not path.exists():
+                    continue
+                archive = self._archives.get(site)
+                if archive is None:
+                    archive = self._archives[site] = self._open(site)
+                compress = zipfile.ZIP_STORED if path.suffix.lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                archive.write(path, arcname=str(path.resolve().relative_to(self.output_dir)), compress_type=compress)
+                self.counts[site] = self.counts.get(site, 0) + 1
+            except Exception as e:
+                print(f"    ⚠️  打包失败 {path}: {e}")
+            finally:
+                self._queue.task_done()
+                QUEUE_DEPTH.set(self._queue.qsize(), queue='archive')
+
+    def close(self, aborted: bool = False) -> Dict[str, str]:
+        """
+        等待排队的文件写完，写出 ZIP 目录并关闭
+
+        Args:
+            aborted: 运行被中断，S3 分段上传直接中止（本地 ZIP 仍保留 .part 文件）
+
+        Returns:
+            {网站: ZIP 路径}
+        """
+        self._queue.put(None)
+        self._thread.join()
+        finished = {}
+        for site, archive in self._archives.items():
+            stream = self._streams[site]
+            try:
+                if aborted and self.to_s3:
+                    stream.abort()
+                    continue
+                archive.close()
+                stream.close()
+                if not self.to_s3 and not aborted:
+                    os.replace(f"{self._names[site]}.part", self._names[site])
+                finished[site] = self._names[site]
+            except Exception as e:
+                print(f"  ⚠️  {site} ZIP 写出失败: {e}")
+                if self.to_s3:
+                    stream.abort()
+        self._archives = {}
+        return finished
+
+
+_current: Optional[SiteArchiver] = None
+
+
+def start_archive(output_dir: str, to_s3: bool = False) -> SiteArchiver:
+    """开启本进程的边下载边打包，ItemPipeline 通过校验的文件会自动加入"""
+    global _current
+    _current = SiteArchiver(output_dir, to_s3=to_s3)
+    return _current
+
+
+def current_archive() -> Optional[SiteArchiver]:
+    """本进程的打包器，未开启时为 None"""
+    return _current
+
+
+def finish_archive(aborted: bool = False) -> Dict[str, str]:
+    """关闭本进程的打包器并打印结果"""
+    global _current
+    archiver, _current = _current, None
+    if archiver is None:
+        return {}
+    finished = archiver.close(aborted=aborted)
+    for site, name in finished.items():
+        print(f"  🗜️  {name} ({archiver.counts.get(site, 0)} 个文件)")
+    return finished
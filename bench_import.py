@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+导入耗时基准（基于 `python -X importtime`）
+
+防止启动变慢的回归：
+- `import main` 不允许导入 Scrapy / Playwright / boto3 / openpyxl
+- 只选中某个网站时，只允许导入该网站需要的重量级模块
+- 启动总导入耗时不得超过预算（环境变量 IMPORT_BUDGET_MS，默认 300ms）
+
+用法：
+    python bench_import.py            # 检查所有场景，失败时退出码为 1
+    python bench_import.py --top 20   # 额外打印最慢的 20 个模块
+"""
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+import argparse
+
+# 重量级依赖（按顶层包名匹配）
+HEAVY_MODULES = ['scrapy', 'twisted', 'playwright', 'boto3', 'botocore', 's3transfer', 'openpyxl']
+
+# 场景：名称 → (执行语句, 允许导入的重量级模块, 网站爬虫依赖的包)
+# 只有网站场景在依赖的包未安装时跳过；startup 或已安装依赖的场景执行失败都算检查失败
+SCENARIOS = {
+    'startup': ('import main', [], []),
+    'wan': ("import main; main.load_scraper('wan')", ['scrapy', 'twisted'], ['scrapy']),
+    'imagine': ("import main; main.load_scraper('imagine')", ['scrapy', 'twisted'], ['scrapy']),
+    'pixverse': ("import main; main.load_scraper('pixverse')", ['scrapy', 'twisted'], ['scrapy']),
+    'higgsfield': ("import main; main.load_scraper('higgsfield')", ['scrapy', 'twisted'], ['scrapy']),
+    'invideo': ("import main; main.load_scraper('invideo')", ['playwright'], ['playwright']),
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$')
+
+
+def measure(statement: str) -> list:
+    """
+    在子进程中执行语句并解析 -X importtime 输出
+
+    Returns:
+        [(模块名, 自身耗时us, 累计耗时us, 嵌套深度), ...]
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"执行失败: {statement}\n{proc.stderr[-2000:]}")
+
+    records = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def check_scenario(name: str, statement: str, allowed: list, top: int = 0) -> tuple:
+    """检查单个场景，返回 (错误信息列表, 导入耗时ms)"""
+    records = measure(statement)
+    imported = {module.split('.')[0] for module, *_ in records}
+    total_ms = sum(cumulative for _, _, cumulative, depth in records if depth == 0) / 1000
+
+    errors = []
+    unexpected = sorted(m for m in HEAVY_MODULES if m in imported and m not in allowed)
+    if unexpected:
+        errors.append(f"[{name}] 不应导入: {', '.join(unexpected)}")
+
+    print(f"  {name:<10} {total_ms:8.1f} ms  ({len(records)} 个模块)")
+    if top:
+        for module, self_us, cumulative_us, depth in sorted(records, key=lambda r: -r[1])[:top]:
+            print(f"      {self_us / 1000:8.1f} ms  {module}")
+    return errors, total_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导入耗时基准')
+    parser.add_argument('--top', type=int, default=0, help='打印最慢的 N 个模块')
+    args = parser.parse_args()
+
+    budget_ms = float(os.getenv('IMPORT_BUDGET_MS', 300))
+
+    print("=" * 60)
+    print("导入耗时基准 (-X importtime)")
+    print("=" * 60)
+
+    errors = []
+    for name, (statement, allowed, requires) in SCENARIOS.items():
+        missing = [package for package in requires if importlib.util.find_spec(package) is None]
+        if missing:
+            # 网站爬虫的可选依赖未安装：跳过该网站（只影响对应网站）
+            print(f"  {name:<10} ⚠️  跳过: 未安装 {', '.join(missing)}")
+            continue
+        try:
+            scenario_errors, total_ms = check_scenario(name, statement, allowed, args.top)
+        except RuntimeError as e:
+            print(f"  {name:<10} ❌ 失败")
+            errors.append(f"[{name}] {e}")
+            continue
+        errors.extend(scenario_errors)
+        if name == 'startup' and total_ms > budget_ms:
+            errors.append(f"[startup] 导入耗时 {total_ms:.1f} ms 超出预算 {budget_ms:.0f} ms")
+
+    print("=" * 60)
+    if errors:
+        for error in errors:
+            print(f"❌ {error}")
+        return 1
+
+    print("✅ 导入耗时检查通过")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+端到端吞吐基准：本地模拟的列表接口 + CDN + S3
+
+父进程启动模拟服务器（按网站格式返回列表页，CDN 按配置的延迟 / 带宽 / 错误率返回
+指定大小的文件）；每个网站在独立子进程中用真实的 Spider → ItemWorker → ItemPipeline
+跑完整流程，S3 上传写到本地替身（replay.LocalS3Client）。结束后从结果行清单统计：
+
+- items/s、MB/s（成功记录的作品数 / 字节数 ÷ 墙钟时间）
+- 单个作品处理耗时的 p50 / p99（AssetRecord.total_seconds）
+- 子进程峰值 RSS
+
+报告写到 {输出目录}/benchmarks/{版本}-{场景}.json，按版本（git describe）对比。
+
+用法：
+    python bench_throughput.py                        # small 场景，pixverse
+    python bench_throughput.py --scenario medium --sites pixverse wan imagine higgsfield
+    python bench_throughput.py --scenario large --latency-ms 0 --bandwidth-kb 0
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+# 场景：作品数、媒体大小、列表 / CDN 每个请求的延迟、每个连接的带宽（0 不限）、错误率
+SCENARIOS = {
+    'small': {'items': 100, 'video_kb': 512, 'image_kb': 64, 'latency_ms': 20, 'bandwidth_kb': 0, 'error_rate': 0.0},
+    'medium': {'items': 10_000, 'video_kb': 256, 'image_kb': 32, 'latency_ms': 5, 'bandwidth_kb': 0, 'error_rate': 0.01},
+    'large': {'items': 100_000, 'video_kb': 64, 'image_kb': 8, 'latency_ms': 2, 'bandwidth_kb': 0, 'error_rate': 0.01},
+}
+
+# 可在本地模拟的网站（InVideo 依赖真实浏览器，不参与）
+SITES = ('pixverse', 'wan', 'imagine', 'higgsfield')
+
+# 分类接口的网站：分类数（每个分类的配额 = 作品数 / 分类数）
+CATEGORY_COUNTS = {'pixverse': 7, 'higgsfield': 7}
+
+# 各 Spider 访问线上的类属性 → 模拟服务器上的路径（基准全程不访问网络）
+MOCK_URLS = {
+    'pixverse': {'api_url': '/pixverse/list'},
+    'wan': {'start_urls': ['/wan/'], 'api_url': '/wan/recommend'},
+    'imagine': {'api_url': '/imagine/feeds', 'base_url': '/cdn'},
+    'higgsfield': {'api_url': '/higgsfield/feed'},
+}
+
+VIDEO_HEADER = b'\x00\x00\x00\x18ftypmp42'
+IMAGE_HEADER = b'\xff\xd8\xff\xe0\x00\x10JFIF'
+
+
+# ========== 模拟服务器 ==========
+
+class MockCatalog:
+    """各网站的模拟作品列表（按序号确定生成，不占内存）"""
+
+    def __init__(self, base_url: str, per_site: int, per_category: int):
+        self.cdn = f"{base_url}/cdn"
+        self.per_site = per_site
+        self.per_category = per_category
+
+    def media(self, site: str, idx: int, key: str = '') -> Dict[str, str]:
+        work_id = f"{site}{key}-{idx:07d}"
+        return {
+            'id': work_id,
+            'video': f"{self.cdn}/v/{work_id}.mp4",
+            'cover': f"{self.cdn}/i/{work_id}.jpg",
+            'source': f"{self.cdn}/i/{work_id}-src.jpg" if idx % 3 == 0 else '',
+            'prompt': f"benchmark {site} work {idx} " + 'cinematic ' * (idx % 7),
+        }
+
+    def pixverse(self, query: Dict) -> Dict:
+        offset, limit = int(query['offset'][0]), int(query['limit'][0])
+        category = query['secondary_category'][0]
+        data = []
+        for idx in range(offset, min(offset + limit, self.per_category)):
+            m = self.media('pixverse', idx, category)
+            data.append({'video_id': m['id'], 'create_mode': 'image' if m['source'] else 'text',
+                         'url': m['video'], 'first_frame': m['cover'], 'customer_img_url': m['source'],
+                         'prompt': m['prompt']})
+        return {'ErrCode': 0, 'Resp': {'data': data, 'total': self.per_category}}
+
+    def imagine(self, query: Dict) -> Dict:
+        page, size = int(query['pagination[page]'][0]), int(query['pagination[pageSize]'][0])
+        data = []
+        for idx in range((page - 1) * size, min(page * size, self.per_site)):
+            m = self.media('imagine', idx)
+            data.append({'id': m['id'], 'attributes': {
+                'prompt': m['prompt'],
+                'videoHd': m['video'][len(self.cdn):],
+                'image': m['cover'][len(self.cdn):],
+                'category': {'data': {'attributes': {'label': 'Text to Video'}}},
+                'settings': {},
+            }})
+        return {'data': data, 'meta': {'pagination': {'page': page, 'pageCount': math.ceil(self.per_site / size)}}}
+
+    def wan(self, body: Dict) -> Dict:
+        offset, size = int(body.get('token') or 0), int(body.get('pageSize') or 20)
+        works = []
+        for idx in range(offset, min(offset + size, self.per_site)):
+            m = self.media('wan', idx)
+            works.append({'type': 'WORK', 'data': {
+                'resourceId': m['id'], 'mediaType': 'video',
+                'taskType': 'image_to_video' if m['source'] else 'text_to_video',
+                'taskInput': {'prompt': m['prompt'],
+                              'refImagesurlsInfo': [{'originImage': m['source']}] if m['source'] else []},
+                'image': {'downloadUrl': m['video'], 'resizeUrl': m['cover'], 'url': m['cover']},
+            }})
+        next_offset = offset + size
+        return {'success': True, 'data': {'works': works, 'token': str(next_offset) if next_offset < self.per_site else ''}}
+
+    def higgsfield(self, query: Dict) -> Dict:
+        offset, size = int((query.get('cursor') or ['0'])[0]), int(query['size'][0])
+        feed = query['feed'][0]
+        items = []
+        for idx in range(offset, min(offset + size, self.per_category)):
+            m = self.media('higgsfield', idx, feed)
+            items.append({'id': m['id'], 'params': {'prompt': m['prompt']},
+                          'results': {'raw': {'url': m['video'], 'type': 'video'}, 'min': {'url': m['cover']}}})
+        next_offset = offset + size
+        return {'items': items, 'cursor': str(next_offset) if next_offset < self.per_category else None}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """列表接口 + CDN（配置在 server 上）"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay_or_fail(self) -> bool:
+        """模拟延迟和错误率，返回 True 表示已回复错误"""
+        config = self.server.config
+        if config['latency_ms']:
+            time.sleep(config['latency_ms'] / 1000)
+        if config['error_rate'] and self.server.random.random() < config['error_rate']:
+            self._reply(503, b'{"error":"mock"}', 'application/json')
+            return True
+        return False
+
+    def _reply(self, status: int, body: bytes, content_type: str, bandwidth_kb: int = 0):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not bandwidth_kb:
+            self.wfile.write(body)
+            return
+        chunk = 64 * 1024
+        for start in range(0, len(body), chunk):
+            self.wfile.write(body[start:start + chunk])
+            time.sleep(min(chunk, len(body) - start) / (bandwidth_kb * 1024))
+
+    def _json(self, data: Dict):
+        self._reply(200, json.dumps(data).encode('utf-8'), 'application/json')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if self._delay_or_fail():
+            return
+        if url.path.startswith('/cdn/'):
+            config = self.server.config
+            if url.path.startswith('/cdn/v/'):
+                body = self.server.video_body
+            else:
+                body = self.server.image_body
+            content_type = 'video/mp4' if url.path.endswith('.mp4') else 'image/jpeg'
+            return self._reply(200, body, content_type, config['bandwidth_kb'])
+        query = parse_qs(url.query)
+        catalog = self.server.catalog
+        if url.path == '/pixverse/list':
+            return self._json(catalog.pixverse(query))
+        if url.path == '/imagine/feeds':
+            return self._json(catalog.imagine(query))
+        if url.path == '/higgsfield/feed':
+            return self._json(catalog.higgsfield(query))
+        if url.path == '/wan/':
+            return self._reply(200, b'<html></html>', 'text/html')
+        self._reply(404, b'', 'text/plain')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self._delay_or_fail():
+            return
+        if urlparse(self.path).path == '/wan/recommend':
+            return self._json(self.server.catalog.wan(json.loads(body or b'{}')))
+        self._reply(404, b'', 'text/plain')
+
+
+def start_mock_server(config: Dict) -> ThreadingHTTPServer:
+    """在后台线程启动模拟服务器（随机端口）"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockHandler)
+    server.daemon_threads = True
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    per_site = int(config['items'] * 1.1) + 10  # 留出余量，错误率下仍能凑够目标
+    per_category = math.ceil(per_site / 7)
+    server.config = config
+    server.random = random.Random(42)
+    server.catalog = MockCatalog(base_url, per_site, per_category)
+    server.video_body = VIDEO_HEADER + b'\x00' * (config['video_kb'] * 1024 - len(VIDEO_HEADER))
+    server.image_body = IMAGE_HEADER + b'\x00' * (config['image_kb'] * 1024 - len(IMAGE_HEADER))
+    server.base_url = base_url
+    threading.Thread(target=server.serve_forever, name='mock-server', daemon=True).start()
+    return server
+
+
+# ========== 子进程：运行一个网站 ==========
+
+def _point_spider_at(site: str, base_url: str):
+    """把 Spider 访问线上的地址全部指向模拟服务器；还有遗漏的线上地址时报错，而不是悄悄访问网络"""
+    from scrapers import load_scraper
+
+    spider_cls = load_scraper(site).spider_cls
+    for name, path in MOCK_URLS[site].items():
+        if isinstance(path, list):
+            setattr(spider_cls, name, [base_url + p for p in path])
+        else:
+            setattr(spider_cls, name, base_url + path)
+
+    for name in dir(spider_cls):
+        value = getattr(spider_cls, name, None)
+        urls = value if isinstance(value, (list, tuple)) else [value]
+        live = [url for url in urls if isinstance(url, str) and url.startswith('http') and not url.startswith(base_url)]
+        if live:
+            raise RuntimeError(f"{spider_cls.__name__}.{name} 仍指向线上地址 {live[0]}，请加到 MOCK_URLS")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """最近秩百分位"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024  # macOS 为字节，Linux 为 KB
+
+
+def run_site_benchmark(site: str, items: int, base_url: str, output_dir: str) -> Dict:
+    """子进程入口：对模拟服务器爬取 items 个作品，返回统计"""
+    sys.stdout = open(os.devnull, 'w')  # 逐个作品的下载 / 上传日志照常输出，但不刷屏
+
+    from replay import LocalS3Client
+    from scrapers import create_scraper
+    from utils import DataManager, RowManifest, S3Uploader
+
+    S3Uploader._shared_client = LocalS3Client(str(Path(output_dir) / 's3'))
+    _point_spider_at(site, base_url)
+
+    data_manager = DataManager(output_dir)
+    target = math.ceil(items / CATEGORY_COUNTS[site]) if site in CATEGORY_COUNTS else items
+    scraper = create_scraper(site, data_manager, **{'target_count_per_category' if site == 'higgsfield' else 'target_count': target})
+
+    # 去掉礼貌延迟 / 限速，只衡量本项目的处理能力（优先级高于 Spider.custom_settings）
+    get_settings = scraper.get_settings
+
+    def fast_settings():
+        settings = get_settings()
+        for key, value in (('DOWNLOAD_DELAY', 0), ('RANDOMIZE_DOWNLOAD_DELAY', False),
+                           ('AUTOTHROTTLE_ENABLED', False), ('CONCURRENT_REQUESTS_PER_DOMAIN', 16),
+                           ('LOG_LEVEL', 'WARNING')):
+            settings.set(key, value, priority='cmdline')
+        return settings
+
+    scraper.get_settings = fast_settings
+    started = time.time()
+    scraper.scrape()
+    data_manager.close()
+    seconds = time.time() - started
+
+    # 一个作品都没有记录时清单文件不会创建（首次写入时才创建）
+    manifest_path = data_manager.manifest.path
+    records = list(RowManifest.read_records(manifest_path)) if manifest_path.exists() else []
+    latencies = [r.total_seconds for r in records if r.total_seconds is not None]
+    total_bytes = sum(r.bytes or 0 for r in records)
+    return {
+        'site': site,
+        'target': items,
+        'items': len(records),
+        'seconds': round(seconds, 3),
+        'items_per_second': round(len(records) / seconds, 2) if seconds else 0.0,
+        'mb_per_second': round(total_bytes / (1024 * 1024) / seconds, 2) if seconds else 0.0,
+        'bytes': total_bytes,
+        'p50_seconds': round(_percentile(latencies, 50), 4),
+        'p99_seconds': round(_percentile(latencies, 99), 4),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+def _run_site_star(args):
+    return run_site_benchmark(*args)
+
+
+# ========== 报告 ==========
+
+def release_label() -> str:
+    """当前版本（git describe），不在 git 仓库中时为 'unknown'"""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or 'unknown'
+    except OSError:
+        return 'unknown'
+
+
+def main():
+    from config import OUTPUT_DIR
+
+    parser = argparse.ArgumentParser(description='端到端吞吐基准（本地模拟接口 / CDN / S3）')
+    parser.add_argument('--scenario', choices=list(SCENARIOS), default='small', help='场景 (默认: small)')
+    parser.add_argument('--sites', nargs='+', choices=SITES, default=['pixverse'], help='网站 (默认: pixverse)')
+    parser.add_argument('--items', type=int, help='覆盖场景的作品数')
+    parser.add_argument('--video-kb', type=int, help='覆盖视频大小（KB）')
+    parser.add_argument('--image-kb', type=int, help='覆盖图片大小（KB）')
+    parser.add_argument('--latency-ms', type=int, help='覆盖每个请求的延迟（毫秒）')
+    parser.add_argument('--bandwidth-kb', type=int, help='覆盖每个连接的带宽（KB/s，0 不限）')
+    parser.add_argument('--error-rate', type=float, help='覆盖错误率（0~1，返回 503）')
+    parser.add_argument('--label', help='报告中的版本标识 (默认: git describe)')
+    parser.add_argument('--report-dir', default=os.path.join(OUTPUT_DIR, 'benchmarks'), help='报告目录')
+    args = parser.parse_args()
+
+    config = dict(SCENARIOS[args.scenario])
+    for key in ('items', 'video_kb', 'image_kb', 'latency_ms', 'bandwidth_kb', 'error_rate'):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+    label = args.label or release_label()
+
+    print("=" * 60)
+    print(f"端到端吞吐基准: {args.scenario} ({label})")
+    print(f"   作品数: {config['items']}/网站，视频 {config['video_kb']}KB，图片 {config['image_kb']}KB")
+    print(f"   延迟 {config['latency_ms']}ms，带宽 {config['bandwidth_kb'] or '不限'}KB/s，错误率 {config['error_rate']:.1%}")
+    print("=" * 60)
+
+    server = start_mock_server(config)
+    work_dir = tempfile.mkdtemp(prefix='bench-')
+    results = []
+    try:
+        # 每个网站一个新的 spawn 子进程（Scrapy 的 reactor 不能重启，峰值 RSS 互不影响）
+        # 子进程跑完一个网站后自行退出：CrawlerProcess 接管了 SIGTERM，Pool.terminate() 会一直等它
+        context = multiprocessing.get_context('spawn')
+        for site in args.sites:
+            pool = context.Pool(processes=1, maxtasksperchild=1)
+            try:
+                result = pool.apply(_run_site_star, ((site, config['items'], server.base_url,
+                                                      os.path.join(work_dir, site)),))
+            finally:
+                pool.close()
+                pool.join()
+            results.append(result)
+            print(f"  {site:<11} {result['items']:>7} 个  {result['seconds']:8.1f}s  "
+                  f"{result['items_per_second']:8.1f} items/s  {result['mb_per_second']:7.1f} MB/s  "
+                  f"p50 {result['p50_seconds'] * 1000:7.1f}ms  p99 {result['p99_seconds'] * 1000:7.1f}ms  "
+                  f"RSS {result['peak_rss_mb']:.0f}MB")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'release': label,
+        'scenario': args.scenario,
+        'config': config,
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'results': results,
+    }
+    report_path = Path(args.report_dir) / f"{label}-{args.scenario}.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("=" * 60)
+    print(f"📊 报告: {report_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -20,21 +20,115 @@ DOWNLOAD_CONFIG = {
     'delay_max': int(os.getenv('DOWNLOAD_DELAY_MAX', 5)),
     'max_retries': int(os.getenv('MAX_RETRIES', 3)),
     'timeout': int(os.getenv('TIMEOUT', 30)),
+    'pool_size': int(os.getenv('HTTP_POOL_SIZE', 16)),  # 共享 HTTP 连接池大小
+    'item_workers': int(os.getenv('ITEM_WORKERS', 4)),  # 后台并行处理的作品数
+    'max_backlog': int(os.getenv('ITEM_MAX_BACKLOG', 100)),  # 作品积压上限（约两页）
+}
+
+# 作品处理流水线各阶段的并发上限（进程内所有网站共享，见 scrapers/pipeline.py）
+PIPELINE_CONFIG = {
+    'download': int(os.getenv('PIPELINE_DOWNLOADS', 4)),  # 同时下载的文件数
+    'upload': int(os.getenv('PIPELINE_UPLOADS', 4)),  # 同时上传到 S3 的文件数
 }
 
 # 输出配置
 OUTPUT_DIR = os.getenv('OUTPUT_DIR', './downloads')
 
+# 结果行清单（追加写 JSONL，按批 flush + fsync）
+MANIFEST_CONFIG = {
+    'flush_rows': int(os.getenv('MANIFEST_FLUSH_ROWS', 100)),  # 每积累多少行落盘一次
+    'flush_seconds': float(os.getenv('MANIFEST_FLUSH_SECONDS', 2)),  # 距上次落盘超过多少秒也落盘
+    'fsync': os.getenv('MANIFEST_FSYNC', '1') != '0',
+}
+
+# 续页 token（Wan 中断后从上次的位置继续，见 scrapers/wan_video_spider.py）
+CURSOR_CONFIG = {
+    'max_age_hours': float(os.getenv('CURSOR_MAX_AGE_HOURS', 24)),  # 超过时长的 token 丢弃，从第一页开始
+}
+
+# 素材库（跨运行的 SQLite，见 materials_db.py）；未设置时为 {输出目录}/materials.db，MATERIALS_DB 设为空字符串则不写入
+MATERIALS_DB_CONFIG = {
+    'path': os.getenv('MATERIALS_DB'),
+}
+
+# 边下载边打包（见 archive.py）
+ARCHIVE_CONFIG = {
+    's3_prefix': os.getenv('ARCHIVE_S3_PREFIX', 'video-materials/archives/'),  # --zip-s3 的 S3 键前缀
+    's3_part_size': int(os.getenv('ARCHIVE_S3_PART_MB', 16)) * 1024 * 1024,  # 分段上传每段大小
+}
+
+# 列表接口响应缓存（见 http_cache.py）：TTL 内直接复用，过期后带 ETag / If-Modified-Since 重新验证
+# 默认关闭（TTL 内看不到网站的新作品，只适合开发调试），HTTP_CACHE=1 开启；
+# 缓存目录未设置时为 {输出目录}/httpcache
+HTTP_CACHE_CONFIG = {
+    'enabled': os.getenv('HTTP_CACHE', '0') == '1',
+    'dir': os.getenv('HTTP_CACHE_DIR'),
+    'default_ttl': int(os.getenv('HTTP_CACHE_TTL', 600)),  # 秒，0 表示每次都重新验证
+    'ttl': {  # 各网站的 TTL（秒），按爬虫名称
+        'wan_video': int(os.getenv('HTTP_CACHE_TTL_WAN', 600)),
+        'higgsfield': int(os.getenv('HTTP_CACHE_TTL_HIGGSFIELD', 600)),
+        'imagine_art': int(os.getenv('HTTP_CACHE_TTL_IMAGINE', 900)),
+        'invideo': int(os.getenv('HTTP_CACHE_TTL_INVIDEO', 3600)),  # /ideas 文档很少变化
+        'pixverse': int(os.getenv('HTTP_CACHE_TTL_PIXVERSE', 600)),
+    },
+}
+
+# Excel 导出配置
+EXPORT_CONFIG = {
+    'workers': int(os.getenv('EXPORT_WORKERS', 4)),  # 并行生成 Excel 文件的进程数
+    'verify': os.getenv('EXPORT_VERIFY', '0') == '1',  # 保存后重新打开文件抽查提示词
+    'parquet_row_group': int(os.getenv('PARQUET_ROW_GROUP', 1000)),  # --parquet 每个行组的行数
+}
+
+# 守护进程配置（main.py --daemon）
+DAEMON_CONFIG = {
+    'control_host': os.getenv('DAEMON_CONTROL_HOST', '127.0.0.1'),  # 控制端口只监听本机
+    'control_port': int(os.getenv('DAEMON_CONTROL_PORT', 8765)),
+    'tick_seconds': int(os.getenv('DAEMON_TICK_SECONDS', 30)),  # 调度检查间隔
+    'metrics_port': int(os.getenv('DAEMON_METRICS_PORT', 9108)),  # Prometheus GET /metrics（0 关闭）
+}
+
+# 分布式队列配置（main.py --queue URL --role coordinator|worker）
+QUEUE_CONFIG = {
+    'namespace': os.getenv('QUEUE_NAMESPACE', 'webscript'),  # Redis 键前缀
+    'item_visibility_timeout': int(os.getenv('QUEUE_ITEM_TIMEOUT', 300)),  # 作品任务租约（秒）
+    'listing_visibility_timeout': int(os.getenv('QUEUE_LISTING_TIMEOUT', 1800)),  # 列表任务租约（秒）
+    'max_attempts': int(os.getenv('QUEUE_MAX_ATTEMPTS', 3)),  # 超过后进入死信
+    'poll_interval': float(os.getenv('QUEUE_POLL_INTERVAL', 2)),
+    'idle_exit_seconds': int(os.getenv('QUEUE_IDLE_EXIT', 120)),  # worker 空闲多久后退出
+}
+
+# 截止时间预算配置（main.py --deadline）
+DEADLINE_CONFIG = {
+    'flush_reserve': int(os.getenv('DEADLINE_FLUSH_RESERVE', 60)),  # 截止前留给写出结果的秒数
+    'safety_factor': float(os.getenv('DEADLINE_SAFETY_FACTOR', 2.0)),  # 预计耗时放大倍数（含上传）
+    'assumed_bandwidth': int(os.getenv('DEADLINE_ASSUMED_BANDWIDTH', 2 * 1024 * 1024)),  # 尚无观测时假定的单文件吞吐（字节/秒）
+}
+
+# 性能剖析配置（main.py --profile，见 profiling.py）
+PROFILE_CONFIG = {
+    'sample_interval': float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005)),  # 调用栈采样间隔（秒）
+    'tracemalloc_frames': int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', 10)),  # 每次分配记录的栈深度
+    'top_lines': int(os.getenv('PROFILE_TOP_LINES', 25)),  # 内存快照报告的行数
+}
+
+# 作品处理追踪配置（main.py --trace，见 tracing.py）
+TRACE_CONFIG = {
+    'min_item_seconds': float(os.getenv('TRACE_MIN_ITEM_SECONDS', 0)),  # 只保留耗时超过它的作品（0 全部保留）
+}
+
 # 网站配置
 WEBSITES = {
     'wan_video': {
         'url': 'https://create.wan.video/',
         'target_count': 50,
+        'schedule_minutes': 180,  # 守护进程模式下的爬取间隔（分钟）
         'types': ['text2video', 'image2video']
     },
     'higgsfield': {
         'url': 'https://higgsfield.ai/',
-        'target_count': 50,  # 每个网站50个素材
+        'target_count': 20,  # 每个类别20个素材 (总共7个类别 = 140个)
+        'schedule_minutes': 180,
         'categories': [
             'Kling 2.5 Turbo',
             'Camera Controls',
@@ -48,10 +142,12 @@ WEBSITES = {
     'imagine_art': {
         'url': 'https://www.imagine.art/community',  # 改为community页面
         'target_count': 50,  # 每个网站50个素材
+        'schedule_minutes': 180,
     },
     'invideo': {
         'url': 'https://invideo.io/ideas',
         'target_count': 50,  # 每个网站50个素材
+        'schedule_minutes': 360,
         'categories': [
             'Million Dollar Ads',
             'UGC & Avatars'
@@ -60,6 +156,7 @@ WEBSITES = {
     'pixverse': {
         'url': 'https://app.pixverse.ai/onboard',
         'target_count': 20,  # 每个类别20个素材 (总共7个类别 = 140个)
+        'schedule_minutes': 180,
         'categories': [
             'Winter Vibe',
             'Ad Magic',
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+守护进程模式 - 常驻进程按计划爬取（main.py --daemon）
+
+与 cron 每次重新启动 start.sh 相比，常驻进程可以复用：
+- 共享的 HTTP 连接池与 S3 客户端（utils.get_http_session / S3Uploader.get_client）
+- 内存中的已处理作品索引（SeenIndex，每次运行后持久化到 seen_index.json）
+- Twisted reactor（Scrapy 爬虫通过 CrawlerRunner 在同一个 reactor 中反复运行）
+- InVideo 使用的 Chromium 浏览器（在专用线程中常驻）
+
+各网站的爬取间隔见 config.WEBSITES[...]['schedule_minutes']。
+
+本机控制端口（每行一条命令，返回一行 JSON）：
+    status          查看各网站运行状态
+    run <site>      立即触发一次爬取
+    metrics         运行指标快照（JSON）
+    stop            停止守护进程
+
+运行指标另以 Prometheus 文本格式在 http://{control_host}:{metrics_port}/metrics 提供
+（DAEMON_CONFIG['metrics_port']，0 关闭），指标定义见 metrics.py。
+
+客户端：
+    python daemon.py status
+    python daemon.py run pixverse
+"""
+import json
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from config import DAEMON_CONFIG, WEBSITES
+from materials_db import materials_db_path
+from metrics import REGISTRY
+from utils import DataManager, SeenIndex
+from scrapers import SITES, create_scraper
+from scrapers.base_scraper import ScrapyScraper
+
+
+def _format_time(timestamp):
+    """时间戳 → 可读字符串"""
+    if not timestamp:
+        return None
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    """控制端口连接处理：读一行命令，回一行 JSON"""
+
+    def handle(self):
+        line = self.rfile.readline(4096).decode('utf-8', errors='replace').strip()
+        try:
+            response = self.server.crawl_daemon.handle_command(line)
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+        self.wfile.write((json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8'))
+
+
+class _ControlServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics：Prometheus 文本格式"""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class CrawlDaemon:
+    """常驻爬虫进程"""
+
+    def __init__(self, sites: list, output_dir: str):
+        """
+        Args:
+            sites: 要调度的网站标识列表
+            output_dir: 输出目录
+        """
+        self.sites = sites
+        self.output_dir = Path(output_dir)
+
+        # 常驻资源：已处理索引（S3 客户端由 S3Uploader.get_client 进程内共享）
+        # 数据管理器每次运行新建一个：结果行清单按运行轮换，导出只读本次运行的行
+        self.seen_index = SeenIndex(self.output_dir / 'seen_index.json')
+        self.materials_db = materials_db_path(output_dir)
+        self._run_managers = {}  # {site: 本次运行的 DataManager}
+
+        self.started_at = time.time()
+        self.state = {
+            site: {
+                'running': False,
+                'runs': 0,
+                'last_start': None,
+                'last_end': None,
+                'last_count': None,
+                'last_error': None,
+                'next_run': self.started_at,  # 启动后立即运行一次
+            }
+            for site in sites
+        }
+        self._lock = threading.Lock()
+
+        # 非 Scrapy 爬虫（Playwright）在专用线程中运行，浏览器在该线程中常驻
+        self._browser_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='browser')
+        self._playwright = None
+        self._browser = None
+
+        # 正在运行的爬虫（停止时取消）
+        self._active = {}
+
+        self._server = None
+        self._metrics_server = None
+        self.reactor = None
+
+    # ========== 运行 ==========
+
+    def run_forever(self) -> int:
+        """启动 reactor、调度器和控制端口，阻塞直到收到 stop 或信号"""
+        self._install_reactor()
+
+        from twisted.internet import reactor, task
+        from scrapy.utils.log import configure_logging
+
+        configure_logging({'LOG_LEVEL': 'INFO'})
+        self.reactor = reactor
+
+        self._start_control_server()
+        self._start_metrics_server()
+        reactor.addSystemEventTrigger('before', 'shutdown', self._on_shutdown)
+
+        ticker = task.LoopingCall(self._tick)
+        ticker.start(DAEMON_CONFIG['tick_seconds'], now=True)
+
+        print(f"🛰️  守护进程已启动: {', '.join(self.sites)}")
+        print(f"   控制端口: {DAEMON_CONFIG['control_host']}:{DAEMON_CONFIG['control_port']}")
+        if self._metrics_server:
+            print(f"   指标: http://{DAEMON_CONFIG['control_host']}:{DAEMON_CONFIG['metrics_port']}/metrics")
+        print(f"   已处理索引: {len(self.seen_index)} 条")
+
+        reactor.run()
+        return 0
+
+    @staticmethod
+    def _install_reactor():
+        """按 Scrapy 设置安装 reactor（必须在导入 twisted.internet.reactor 之前）"""
+        from scrapy.utils.project import get_project_settings
+        from scrapy.utils.reactor import install_reactor
+
+        reactor_path = get_project_settings().get('TWISTED_REACTOR')
+        if reactor_path:
+            install_reactor(reactor_path)
+
+    def _tick(self):
+        """调度检查：到期且未在运行的网站触发爬取"""
+        now = time.time()
+        for site in self.sites:
+            state = self.state[site]
+            if not state['running'] and state['next_run'] <= now:
+                self.trigger(site)
+
+    def trigger(self, site: str) -> bool:
+        """
+        触发一次爬取（在 reactor 线程中调用）
+
+        Returns:
+            是否已启动（正在运行时返回 False）
+        """
+        from twisted.internet import defer
+
+        with self._lock:
+            state = self.state[site]
+            if state['running']:
+                return False
+            state['running'] = True
+            state['last_start'] = time.time()
+            state['last_error'] = None
+
+        print(f"\n⏰ 开始计划爬取: {SITES[site]['display_name']}")
+        try:
+            deferred = self._start_run(site)
+        except Exception as e:
+            deferred = defer.fail(e)
+        deferred.addCallbacks(
+            self._on_run_done, self._on_run_failed,
+            callbackArgs=(site,), errbackArgs=(site,)
+        )
+        return True
+
+    def _start_run(self, site: str):
+        """启动单个网站的爬取，返回 Deferred（结果为爬取条数）"""
+        from twisted.internet import defer
+
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{site}"
+        data_manager = DataManager(self.output_dir, seen_index=self.seen_index,
+                                   manifest_path=self.output_dir / 'manifests' / f"rows-{run_id}.jsonl",
+                                   materials_db=self.materials_db)
+        self._run_managers[site] = (run_id, data_manager)
+        scraper = create_scraper(site, data_manager)
+        if scraper is None:
+            return defer.fail(RuntimeError('爬虫暂未实现'))
+        self._active[site] = scraper
+
+        if isinstance(scraper, ScrapyScraper):
+            # 在常驻 reactor 中运行，不会重启 reactor
+            return scraper.crawl()
+
+        future = self._browser_executor.submit(self._run_blocking, scraper)
+        return self._defer_future(future)
+
+    def _run_blocking(self, scraper) -> int:
+        """在浏览器线程中运行阻塞式爬虫，为其注入常驻浏览器"""
+        if hasattr(scraper, 'browser'):
+            if self._browser is None or not self._browser.is_connected():
+                from playwright.sync_api import sync_playwright
+                from scrapers.invideo_spider import InVideoSpider
+
+                if self._playwright is None:
+                    self._playwright = sync_playwright().start()
+                self._browser = InVideoSpider.launch_browser(self._playwright)
+            scraper.browser = self._browser
+        try:
+            return scraper.scrape()
+        finally:
+            scraper.close()
+
+    def _defer_future(self, future):
+        """concurrent.futures.Future → Deferred（回调在 reactor 线程中触发）"""
+        from twisted.internet import defer
+
+        deferred = defer.Deferred()
+
+        def done(f):
+            error = f.exception()
+            if error is not None:
+                self.reactor.callFromThread(deferred.errback, error)
+            else:
+                self.reactor.callFromThread(deferred.callback, f.result())
+
+        future.add_done_callback(done)
+        return deferred
+
+    def _finish_run(self, site: str, count=None, error=None):
+        """更新状态、安排下次运行；持久化索引和导出 Excel 在线程池中进行，不阻塞 reactor"""
+        from twisted.internet import threads
+
+        interval = WEBSITES[SITES[site]['config_key']].get('schedule_minutes', 180) * 60
+        now = time.time()
+        with self._lock:
+            state = self.state[site]
+            state['running'] = False
+            state['runs'] += 1
+            state['last_end'] = now
+            state['last_count'] = count
+            state['last_error'] = error
+            state['next_run'] = now + interval
+        self._active.pop(site, None)
+
+        run = self._run_managers.pop(site, None)
+        deferred = threads.deferToThread(self._save_run, run)
+        deferred.addErrback(lambda failure: print(f"  ⚠️  保存运行结果失败: {failure.getErrorMessage()}"))
+
+    def _save_run(self, run):
+        """（线程池中）持久化索引，导出本次运行的 Excel（{表名}-{运行ID}.xlsx），关闭清单和素材库"""
+        self.seen_index.save()
+        if run is None:
+            return
+        run_id, data_manager = run
+        try:
+            data_manager.save_excel(include_all=False, name_suffix=f"-{run_id}")
+        finally:
+            data_manager.close()
+
+    def _on_run_done(self, count, site):
+        print(f"✓ {SITES[site]['display_name']} 完成: {count} 条")
+        self._finish_run(site, count=count)
+
+    def _on_run_failed(self, failure, site):
+        print(f"✗ {SITES[site]['display_name']} 失败: {failure.getErrorMessage()}")
+        self._finish_run(site, error=failure.getErrorMessage())
+
+    # ========== 控制端口 ==========
+
+    def _start_control_server(self):
+        address = (DAEMON_CONFIG['control_host'], DAEMON_CONFIG['control_port'])
+        self._server = _ControlServer(address, _ControlHandler)
+        self._server.crawl_daemon = self
+        thread = threading.Thread(target=self._server.serve_forever, name='control', daemon=True)
+        thread.start()
+
+    def _start_metrics_server(self):
+        if not DAEMON_CONFIG['metrics_port']:
+            return
+        address = (DAEMON_CONFIG['control_host'], DAEMON_CONFIG['metrics_port'])
+        self._metrics_server = _MetricsServer(address, _MetricsHandler)
+        thread = threading.Thread(target=self._metrics_server.serve_forever, name='metrics', daemon=True)
+        thread.start()
+
+    def handle_command(self, line: str) -> dict:
+        """处理控制命令（在控制端口线程中调用）"""
+        from twisted.internet import threads
+
+        parts = line.split()
+        if not parts:
+            return {'ok': False, 'error': '空命令'}
+
+        command, args = parts[0].lower(), parts[1:]
+        if command == 'status':
+            return {'ok': True, 'status': self.status()}
+        if command == 'run':
+            if len(args) != 1 or args[0] not in self.state:
+                return {'ok': False, 'error': f"用法: run <{'|'.join(self.sites)}>"}
+            started = threads.blockingCallFromThread(self.reactor, self.trigger, args[0])
+            return {'ok': True, 'started': started}
+        if command == 'metrics':
+            return {'ok': True, 'metrics': REGISTRY.snapshot()}
+        if command == 'stop':
+            self.reactor.callFromThread(self.reactor.stop)
+            return {'ok': True}
+        return {'ok': False, 'error': f'未知命令: {command}'}
+
+    def status(self) -> dict:
+        """当前状态快照"""
+        with self._lock:
+            sites = {
+                site: {
+                    **state,
+                    'last_start': _format_time(state['last_start']),
+                    'last_end': _format_time(state['last_end']),
+                    'next_run': _format_time(state['next_run']),
+                }
+                for site, state in self.state.items()
+            }
+        return {
+            'started_at': _format_time(self.started_at),
+            'uptime_seconds': int(time.time() - self.started_at),
+            'seen_count': len(self.seen_index),
+            'sites': sites,
+        }
+
+    # ========== 退出 ==========
+
+    def _on_shutdown(self):
+        """reactor 停止前：取消正在运行的爬取、关闭控制端口、持久化索引、关闭浏览器"""
+        from twisted.internet import defer
+
+        print("\n🛑 守护进程停止中...")
+        pending = []
+        for site, scraper in list(self._active.items()):
+            print(f"   ⏹️  取消正在运行的爬取: {SITES[site]['display_name']}")
+            result = scraper.cancel()
+            if isinstance(result, defer.Deferred):
+                pending.append(result)
+        if pending:
+            # reactor 等待 Spider 关闭（正在下载 / 上传的作品收尾并清理）后再继续停止
+            return defer.DeferredList(pending).addBoth(lambda _: self._release_resources())
+        self._release_resources()
+
+    def _release_resources(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._metrics_server:
+            self._metrics_server.shutdown()
+            self._metrics_server.server_close()
+        self.seen_index.save()
+        try:
+            self._browser_executor.submit(self._close_browser).result(timeout=30)
+        except Exception as e:
+            print(f"  ⚠️  关闭浏览器失败: {e}")
+        self._browser_executor.shutdown(wait=False)
+
+    def _close_browser(self):
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+
+def send_command(command: str) -> dict:
+    """向运行中的守护进程发送控制命令"""
+    address = (DAEMON_CONFIG['control_host'], DAEMON_CONFIG['control_port'])
+    with socket.create_connection(address, timeout=10) as sock:
+        sock.sendall((command + '\n').encode('utf-8'))
+        line = sock.makefile('r', encoding='utf-8').readline()
+    return json.loads(line)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("用法: python daemon.py status | run <site> | stop")
+        sys.exit(1)
+    try:
+        result = send_command(' '.join(sys.argv[1:]))
+    except OSError as e:
+        print(f"❌ 无法连接守护进程: {e}")
+        sys.exit(1)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    sys.exit(0 if result.get('ok') else 1)
@@ -0,0 +1,137 @@
+"""
+截止时间预算（main.py --deadline）
+
+在给定的墙钟时间内尽量多完成作品，而不是超时后被杀掉、丢失内存中的结果：
+- 每个下载拿到响应头后，按 Content-Length 和已观测到的单文件吞吐估算耗时，
+  预计在截止前完成不了的文件不再开始（小文件照常下载）
+- 截止前 flush_reserve 秒取消正在运行的爬取（已完成的作品保留）
+- 主程序用留出的时间写出结果
+
+只做准入，不调整顺序：作品仍按列表顺序处理，不会优先处理更可能按时完成的小文件
+（列表接口不返回文件大小，要先发请求才知道）。
+"""
+import re
+import threading
+import time
+from typing import Optional
+
+from config import DEADLINE_CONFIG
+
+
+class RunDeadline:
+    """单次运行的截止时间与吞吐估算（线程安全）"""
+
+    def __init__(self, ends_at: float, flush_reserve: float = None):
+        """
+        Args:
+            ends_at: 截止时间（time.time() 时间戳）
+            flush_reserve: 截止前预留给写出结果的秒数
+        """
+        self.ends_at = ends_at
+        if flush_reserve is None:
+            # 预算很短时最多预留十分之一
+            flush_reserve = min(DEADLINE_CONFIG['flush_reserve'], max(ends_at - time.time(), 0) * 0.1)
+        self.flush_reserve = flush_reserve
+
+        self._lock = threading.Lock()
+        self._rate = None           # 单文件吞吐（字节/秒，指数滑动平均）
+        self._item_seconds = None   # 未知大小的文件平均耗时
+        self._watched = set()
+        self._timer = None
+
+    # ========== 预算 ==========
+
+    def remaining(self) -> float:
+        """距截止还有多少秒"""
+        return self.ends_at - time.time()
+
+    def transfer_budget(self) -> float:
+        """还能用于传输的秒数（扣除写出结果的预留）"""
+        return self.remaining() - self.flush_reserve
+
+    def expired(self) -> bool:
+        """传输预算是否已用完"""
+        return self.transfer_budget() <= 0
+
+    def estimate_seconds(self, nbytes: Optional[int] = None) -> float:
+        """估算下载一个文件的耗时"""
+        with self._lock:
+            rate = self._rate or DEADLINE_CONFIG['assumed_bandwidth']
+            item_seconds = self._item_seconds
+        if nbytes:
+            return nbytes / rate
+        return item_seconds or 0.0
+
+    def admit(self, nbytes: Optional[int] = None) -> bool:
+        """该文件（nbytes 为 None 表示大小未知）预计能否在截止前下载并上传完"""
+        return self.estimate_seconds(nbytes) * DEADLINE_CONFIG['safety_factor'] <= self.transfer_budget()
+
+    def record_transfer(self, nbytes: int, seconds: float):
+        """记录一次完成的下载，更新吞吐估算"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            rate = nbytes / seconds
+            self._rate = rate if self._rate is None else 0.7 * self._rate + 0.3 * rate
+            self._item_seconds = seconds if self._item_seconds is None else 0.7 * self._item_seconds + 0.3 * seconds
+
+    # ========== 到期取消 ==========
+
+    def watch(self, scraper):
+        """登记正在运行的爬虫，传输预算用完时调用其 cancel()"""
+        with self._lock:
+            self._watched.add(scraper)
+            if self._timer is None:
+                self._timer = threading.Timer(max(self.transfer_budget(), 0), self._expire)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def unwatch(self, scraper):
+        with self._lock:
+            self._watched.discard(scraper)
+
+    def _expire(self):
+        with self._lock:
+            watched = list(self._watched)
+        for scraper in watched:
+            print(f"\n⏰ 即将到达截止时间，取消正在运行的爬取（剩余 {self.remaining():.0f}s 用于写出结果）")
+            try:
+                scraper.cancel()
+            except Exception as e:
+                print(f"  ⚠️  取消失败: {e}")
+
+    def close(self):
+        """停止到期计时器"""
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+
+
+_current: Optional[RunDeadline] = None
+
+
+def start_deadline(ends_at: float) -> RunDeadline:
+    """设置本进程的截止时间（时间戳），下载会按它做准入判断"""
+    global _current
+    _current = RunDeadline(ends_at)
+    return _current
+
+
+def current_deadline() -> Optional[RunDeadline]:
+    """本进程的截止时间，未设置时为 None"""
+    return _current
+
+
+def parse_duration(text: str) -> float:
+    """
+    解析时长：'900'（秒）、'90s'、'30m'、'1.5h'
+
+    Returns:
+        秒数
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*', text.lower())
+    if not match:
+        raise ValueError(f"无法解析的时长: {text}")
+    value, unit = float(match.group(1)), match.group(2)
+    return value * {'': 1, 's': 1, 'm': 60, 'h': 3600}[unit]
@@ -0,0 +1,194 @@
+"""
+分布式爬取（main.py --queue URL --role coordinator|worker）
+
+- 协调者：把每个列表分片（网站 / 分类，见 sharding.plan_shards）作为 listing 任务入队，
+  等待队列清空后汇总 worker 回传的结果行
+- worker（可部署在多台机器 / 多个出口 IP 上）：
+  - listing 任务：在子进程中运行该分片的爬虫，作品不就地下载，而是作为 item 任务入队
+    （按 "网站:作品ID" 去重，多个协调者不会重复派发）
+  - item 任务：下载 → 上传 → 记录，结果行回传给协调者
+"""
+import multiprocessing
+import os
+import socket
+import time
+from typing import Dict, List
+
+from config import QUEUE_CONFIG
+from models import AssetRecord, WorkItem
+from scrapers import create_scraper, load_scraper
+from sharding import plan_shards
+from work_queue import WorkQueue, open_queue
+
+
+class QueueItemSink:
+    """把爬虫提取到的作品作为 item 任务入队（作为爬虫的 item_sink）"""
+
+    def __init__(self, queue: WorkQueue, site: str):
+        self.queue = queue
+        self.site = site
+        self.enqueued = 0
+
+    def __call__(self, item: WorkItem):
+        dedupe_key = f"{self.site}:{item.id}" if item.id else None
+        if self.queue.put({'kind': 'item', 'site': self.site, 'item': item.to_list()}, dedupe_key=dedupe_key):
+            self.enqueued += 1
+
+
+def run_coordinator(sites: List[str], queue_url: str, data_manager, wait: bool = True) -> int:
+    """
+    入队列表任务，并（可选）等待所有任务完成后汇总结果
+
+    Returns:
+        汇总到的结果行数
+    """
+    queue = open_queue(queue_url)
+    run_id = time.strftime('%Y%m%d%H%M%S')
+
+    shards = plan_shards(sites)
+    for shard in shards:
+        queue.put({'kind': 'listing', 'shard': shard}, dedupe_key=f"listing:{run_id}:{shard['id']}")
+    print(f"📮 已入队 {len(shards)} 个列表任务 → {queue_url}")
+
+    if not wait:
+        queue.close()
+        return 0
+
+    collected = 0
+    try:
+        while True:
+            collected += _collect_results(queue, data_manager)
+            stats = queue.stats()
+            if stats['pending'] == 0 and stats['leased'] == 0:
+                break
+            print(f"   ⏳ 待处理 {stats['pending']} / 处理中 {stats['leased']} / "
+                  f"完成 {stats['done']} / 死信 {stats['dead']}")
+            time.sleep(max(QUEUE_CONFIG['poll_interval'], 5))
+        collected += _collect_results(queue, data_manager)
+    finally:
+        queue.close()
+
+    print(f"✅ 队列已清空，汇总 {collected} 条结果")
+    return collected
+
+
+def _collect_results(queue: WorkQueue, data_manager) -> int:
+    results = queue.drain_results()
+    for record in results:
+        data_manager.record_asset(AssetRecord.from_obj(record['record']))
+    return len(results)
+
+
+def _run_listing(shard: Dict, queue_url: str, output_dir: str):
+    """子进程入口：遍历一个列表分片，作品入队"""
+    from utils import DataManager
+
+    queue = open_queue(queue_url)
+    data_manager = DataManager(output_dir, use_s3=False)
+    try:
+        extra = {'categories': shard['categories']} if shard['categories'] else {}
+        scraper = create_scraper(shard['site'], data_manager, **extra)
+        if scraper is None:
+            raise RuntimeError('爬虫暂未实现')
+        sink = QueueItemSink(queue, shard['site'])
+        scraper.item_sink = sink
+        scraper.scrape()
+        scraper.close()
+        print(f"📮 [{shard['id']}] 入队 {sink.enqueued} 个作品")
+    finally:
+        queue.close()
+
+
+class QueueWorker:
+    """从共享队列租用并执行任务"""
+
+    def __init__(self, queue_url: str, output_dir: str, data_manager):
+        self.queue_url = queue_url
+        self.queue = open_queue(queue_url)
+        self.output_dir = output_dir
+        self.data_manager = data_manager
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._spiders = {}
+
+        # 记录的每一行都回传给协调者
+        self.data_manager.row_listeners.append(self._push_row)
+
+    def _push_row(self, record: AssetRecord):
+        self.queue.push_result({'record': record.to_list(), 'worker': self.worker_id})
+
+    def run(self, idle_exit: float = None) -> int:
+        """
+        循环租用任务，空闲超过 idle_exit 秒后退出
+
+        Returns:
+            成功处理的作品数
+        """
+        idle_exit = QUEUE_CONFIG['idle_exit_seconds'] if idle_exit is None else idle_exit
+        processed = 0
+        idle_since = time.time()
+        print(f"👷 worker {self.worker_id} 已连接 {self.queue_url}")
+
+        try:
+            while True:
+                task = self.queue.lease(self.worker_id, QUEUE_CONFIG['item_visibility_timeout'])
+                if task is None:
+                    if time.time() - idle_since > idle_exit:
+                        print(f"💤 空闲 {idle_exit}s，worker 退出")
+                        break
+                    time.sleep(QUEUE_CONFIG['poll_interval'])
+                    continue
+
+                idle_since = time.time()
+                kind = task.payload.get('kind')
+                try:
+                    if kind == 'listing':
+                        ok = self._run_listing_task(task)
+                    elif kind == 'item':
+                        ok = self._run_item_task(task)
+                        processed += int(ok)
+                    else:
+                        print(f"⚠️  未知任务类型: {kind}")
+                        ok = True
+                except Exception as e:
+                    print(f"❌ 任务 {task} 失败: {e}")
+                    ok = False
+
+                if ok:
+                    self.queue.ack(task)
+                else:
+                    # 指数退避后重试，超过最大尝试次数进入死信
+                    self.queue.nack(task, delay=min(2 ** task.attempts, 60))
+        finally:
+            self.queue.close()
+        return processed
+
+    def _run_listing_task(self, task) -> bool:
+        """列表任务在子进程中运行（Scrapy reactor 不能在本进程内重复启动）"""
+        # 列表遍历比单个作品慢得多，先把租约延长到列表超时
+        self.queue.extend(task, QUEUE_CONFIG['listing_visibility_timeout'])
+        shard = task.payload['shard']
+        print(f"\n📄 列表任务: {shard['id']}")
+        context = multiprocessing.get_context('spawn')
+        process = context.Process(target=_run_listing, args=(shard, self.queue_url, self.output_dir))
+        process.start()
+        process.join(QUEUE_CONFIG['listing_visibility_timeout'])
+        if process.is_alive():
+            process.terminate()
+            process.join()
+            return False
+        return process.exitcode == 0
+
+    def _run_item_task(self, task) -> bool:
+        """作品任务：交给对应网站 Spider 的作品处理流水线"""
+        site = task.payload['site']
+        spider = self._spiders.get(site)
+        if spider is None:
+            scraper_cls = load_scraper(site)
+            spider = scraper_cls.spider_cls(data_manager=self.data_manager)
+            self._spiders[site] = spider
+        return bool(spider.pipeline.process(WorkItem.from_obj(task.payload['item'])))
+
+
+def run_worker(queue_url: str, output_dir: str, data_manager) -> int:
+    """worker 入口"""
+    return QueueWorker(queue_url, output_dir, data_manager).run()
@@ -0,0 +1,181 @@
+"""
+列表接口响应缓存（磁盘）
+
+每次运行都会重复请求同样的列表页（Wan 的 square/recommend、Pixverse 的
+content/relation/list、Imagine 的 video-feeds、InVideo 的 /ideas 文档），开发调试时
+一天要重复几十次。这里按 方法 + URL + 请求体 缓存响应：
+
+- TTL（按网站，HTTP_CACHE_CONFIG['ttl']）内直接复用，不发请求
+- 过期后带上次响应的 ETag / Last-Modified 发条件请求，304 时复用缓存并刷新时间
+- hits / misses / revalidated 计数，运行结束时打印
+
+Scrapy 爬虫通过 scrapers/listing_cache.py 的 HttpCache 策略 / 存储使用同一份缓存，
+InVideo（Playwright）直接调用 ListingCache.fetch。媒体下载不经过这里。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from config import HTTP_CACHE_CONFIG, OUTPUT_DIR
+from metrics import CACHE_TOTAL
+
+
+def cache_key(method: str, url: str, body: bytes = b'') -> str:
+    """缓存键：方法 + URL + 请求体的 SHA1"""
+    digest = hashlib.sha1()
+    digest.update(method.upper().encode('utf-8'))
+    digest.update(b'\n')
+    digest.update(url.encode('utf-8'))
+    digest.update(b'\n')
+    digest.update(body or b'')
+    return digest.hexdigest()
+
+
+def http_cache_dir(output_dir: str) -> str:
+    """缓存根目录：HTTP_CACHE_DIR，未设置时为 {输出目录}/httpcache"""
+    return HTTP_CACHE_CONFIG['dir'] or str(Path(output_dir) / 'httpcache')
+
+
+def site_ttl(site: str) -> int:
+    """网站的缓存 TTL（秒），0 表示每次都重新验证"""
+    return HTTP_CACHE_CONFIG['ttl'].get(site, HTTP_CACHE_CONFIG['default_ttl'])
+
+
+class ListingCache:
+    """
+    一个网站的列表响应缓存：{缓存目录}/{网站}/{键前两位}/{键}.json（元数据）+ .body（响应体）
+
+    元数据：{"method", "url", "status", "headers", "stored_at"}，headers 只保留 kept_headers
+    （Content-Type / ETag / Last-Modified；为 None 时全部保留）。
+    """
+
+    kept_headers = ('Content-Type', 'ETag', 'Last-Modified')
+    # 计数同时记入 metrics 的 webscript_cache_total
+    report_metrics = True
+
+    def __init__(self, site: str, ttl: int = None, cache_dir: str = None):
+        """
+        Args:
+            site: 爬虫名称（缓存子目录，决定默认 TTL）
+            ttl: 缓存有效期（秒），默认按网站取 HTTP_CACHE_CONFIG
+            cache_dir: 缓存根目录，默认为 http_cache_dir(OUTPUT_DIR)
+        """
+        self.site = site
+        self.ttl = site_ttl(site) if ttl is None else ttl
+        self.root = Path(cache_dir or http_cache_dir(OUTPUT_DIR)) / site
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        base = self.root / key[:2] / key
+        return base.with_suffix('.json'), base.with_suffix('.body')
+
+    def load(self, method: str, url: str, body: bytes = b'') -> Optional[Dict]:
+        """
+        读取缓存条目
+
+        Returns:
+            元数据字典（含 'content' 响应体），没有缓存时返回 None
+        """
+        meta_path, body_path = self._paths(cache_key(method, url, body))
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(body_path, 'rb') as f:
+                entry['content'] = f.read()
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def save(self, method: str, url: str, body: bytes, status: int, headers: Dict[str, str], content: bytes):
+        """写入 / 覆盖缓存条目（先写临时文件再改名，读者不会看到半个条目）"""
+        meta_path, body_path = self._paths(cache_key(method, url, body))
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        lookup = {name.lower(): value for name, value in headers.items()}
+        entry = {
+            'method': method.upper(),
+            'url': url,
+            'status': status,
+            'headers': dict(headers) if self.kept_headers is None else {
+                name: lookup[name.lower()] for name in self.kept_headers if lookup.get(name.lower())},
+            'stored_at': time.time(),
+        }
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(f"{body_path}{suffix}", 'wb') as f:
+            f.write(content)
+        os.replace(f"{body_path}{suffix}", body_path)
+        with open(f"{meta_path}{suffix}", 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(f"{meta_path}{suffix}", meta_path)
+
+    def touch(self, method: str, url: str, body: bytes = b''):
+        """304 重新验证通过后刷新条目时间，下一个 TTL 内不再发请求"""
+        meta_path, _ = self._paths(cache_key(method, url, body))
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            entry['stored_at'] = time.time()
+            tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, meta_path)
+        except (OSError, ValueError):
+            pass
+
+    def is_fresh(self, entry: Dict) -> bool:
+        """条目是否仍在 TTL 内"""
+        return self.ttl > 0 and time.time() - entry.get('stored_at', 0) < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: Dict) -> Dict[str, str]:
+        """重新验证用的条件请求头"""
+        headers = {}
+        if entry['headers'].get('ETag'):
+            headers['If-None-Match'] = entry['headers']['ETag']
+        if entry['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        return headers
+
+    def count(self, outcome: str):
+        """记录一次 hit / miss / revalidated"""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+        if self.report_metrics:
+            CACHE_TOTAL.inc(site=self.site, outcome=outcome)
+
+    def fetch(self, method: str, url: str, send: Callable[[Dict[str, str]], Tuple[int, Dict[str, str], bytes]],
+              body: bytes = b'') -> Tuple[int, bytes]:
+        """
+        带缓存地请求一个列表页（非 Scrapy 的爬虫使用）
+
+        Args:
+            send: send(额外请求头) -> (状态码, 响应头, 响应体)，实际发出请求
+            body: 请求体（参与缓存键）
+
+        Returns:
+            (状态码, 响应体)；缓存命中 / 304 时为缓存的内容
+        """
+        entry = self.load(method, url, body)
+        if entry is not None and self.is_fresh(entry):
+            self.count('hits')
+            return entry['status'], entry['content']
+
+        status, headers, content = send(self.conditional_headers(entry) if entry else {})
+        if status == 304 and entry is not None:
+            self.count('revalidated')
+            self.touch(method, url, body)
+            return entry['status'], entry['content']
+
+        self.count('misses')
+        if status == 200:
+            self.save(method, url, body, status, headers, content)
+        return status, content
+
+    def summary(self) -> str:
+        return f"列表缓存 [{self.site}]: 命中 {self.hits}，304 重新验证 {self.revalidated}，未命中 {self.misses}"
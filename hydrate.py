@@ -0,0 +1,192 @@
+"""
+两阶段爬取：元数据清单 + 媒体补全
+
+- 第一阶段（main.py --metadata-only）：只遍历列表接口，把作品元数据（ID、提示词、
+  媒体 URL、类型）写入 JSONL 清单，不下载任何媒体，几秒内就能知道有哪些新作品
+- 第二阶段（python3 hydrate.py 清单路径）：读取清单，并行下载 / 上传媒体并记录结果，
+  可以在另一台带宽更好的机器上运行；中断后重新运行会跳过已完成的作品
+
+清单每行一个作品：{"site": 网站标识, "item": [...]}，item 为 WorkItem.to_list()，与队列模式的作品任务格式相同。
+进度文件（清单路径 + .done）记录已完成的 "网站 / 作品ID"（没有 ID 的作品为 "网站 / 作品 URL"），结果行清单（清单路径 + .rows.jsonl）
+保存已记录的数据，重新运行时接着追加，导出时包含之前的结果。
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterator, Tuple
+
+from archive import finish_archive, start_archive
+from config import DOWNLOAD_CONFIG, OUTPUT_DIR
+from materials_db import materials_db_path
+from models import WorkItem
+
+
+class ManifestWriter:
+    """元数据清单写入器（追加写，每行立即 flush）"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def sink(self, site: str):
+        """返回某个网站的 item_sink（提取到的作品写入清单而不是就地下载）"""
+        def write(item: WorkItem):
+            line = json.dumps({'site': site, 'item': item.to_list()}, ensure_ascii=False)
+            with self._lock:
+                self._file.write(line + '\n')
+                self._file.flush()
+                self.written += 1
+        return write
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def progress_key(site: str, item: WorkItem) -> str:
+    """进度文件和去重用的作品键；没有 ID 的作品（Pixverse / Imagine.art 会保留）用作品 URL"""
+    return f"{site}/{item.id or item.video_url}"
+
+
+def read_manifest(path: str) -> Iterator[Tuple[str, WorkItem]]:
+    """逐行读取清单，返回 (网站标识, 作品)；跳过不完整的行"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 写入被中断时最后一行可能不完整
+            yield record['site'], WorkItem.from_obj(record['item'])
+
+
+class Hydrator:
+    """按清单并行下载 / 上传媒体"""
+
+    def __init__(self, manifest_path: str, output_dir: str = OUTPUT_DIR, workers: int = None,
+                 zip_mode: str = 'local'):
+        """
+        Args:
+            manifest_path: 元数据清单路径
+            output_dir: 输出目录（下载文件和 Excel）
+            workers: 并行处理的作品数
+            zip_mode: 'local' / 's3' 边下载边打包，None 不打包
+        """
+        from utils import DataManager
+
+        self.manifest_path = Path(manifest_path)
+        self.workers = workers or DOWNLOAD_CONFIG['item_workers']
+        self.output_dir = output_dir
+        self.zip_mode = zip_mode
+        self.done_path = Path(f"{manifest_path}.done")
+        self.rows_path = Path(f"{manifest_path}.rows.jsonl")
+
+        # 上次运行已完成的作品
+        self.done = set()
+        if self.done_path.exists():
+            with open(self.done_path, 'r', encoding='utf-8') as f:
+                self.done = {line.strip() for line in f if line.strip()}
+
+        self.data_manager = DataManager(output_dir, manifest_path=str(self.rows_path),
+                                        materials_db=materials_db_path(output_dir))
+        previous = self.data_manager.get_summary()['total_count']
+        if previous:
+            print(f"♻️  上次运行的结果: {previous} 行")
+
+        self._done_file = open(self.done_path, 'a', encoding='utf-8')
+        self._done_lock = threading.Lock()
+        self._spiders = {}
+        self._spiders_lock = threading.Lock()
+
+    def _spider_for(self, site: str):
+        """每个网站一个 Spider 实例，只用它的作品处理流水线"""
+        from scrapers import load_scraper
+
+        with self._spiders_lock:
+            if site not in self._spiders:
+                scraper_cls = load_scraper(site)
+                spider_cls = getattr(scraper_cls, 'spider_cls', None) if scraper_cls else None
+                self._spiders[site] = spider_cls(data_manager=self.data_manager) if spider_cls else None
+            return self._spiders[site]
+
+    def _hydrate_one(self, site: str, item: WorkItem) -> bool:
+        spider = self._spider_for(site)
+        if spider is None:
+            print(f"⚠️  {site} 爬虫暂未实现，跳过作品 {item.id}")
+            return False
+        if not spider.pipeline.process(item):
+            return False
+        with self._done_lock:
+            self._done_file.write(progress_key(site, item) + '\n')
+            self._done_file.flush()
+        return True
+
+    def run(self) -> int:
+        """
+        处理清单中所有未完成的作品，最后写出 Excel
+
+        Returns:
+            本次完成的作品数
+        """
+        pending = []
+        queued = set()
+        for site, item in read_manifest(str(self.manifest_path)):
+            key = progress_key(site, item)
+            if key in self.done or key in queued:
+                continue
+            queued.add(key)
+            pending.append((site, item))
+
+        print(f"💧 清单: {self.manifest_path}")
+        print(f"   待处理 {len(pending)} 个（已完成 {len(self.done)} 个），并行 {self.workers}")
+
+        started = time.time()
+        completed = failed = 0
+        if self.zip_mode:
+            start_archive(self.output_dir, to_s3=self.zip_mode == 's3')
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hydrate') as executor:
+                futures = [executor.submit(self._hydrate_one, site, item) for site, item in pending]
+                for future in as_completed(futures):
+                    try:
+                        ok = future.result()
+                    except Exception as e:
+                        print(f"❌ 处理失败: {e}")
+                        ok = False
+                    completed += int(ok)
+                    failed += int(not ok)
+        finally:
+            self._done_file.close()
+            self.data_manager.close()
+            finish_archive()
+
+        print(f"\n✅ 完成 {completed} 个，失败 {failed} 个（{time.time() - started:.1f}s）")
+        if failed:
+            print("   重新运行同一命令会重试失败的作品")
+        self.data_manager.save_excel()
+        return completed
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='按元数据清单下载 / 上传媒体')
+    parser.add_argument('manifest', help='main.py --metadata-only 生成的清单')
+    parser.add_argument('--output', default=OUTPUT_DIR, help=f'输出目录 (默认: {OUTPUT_DIR})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f"并行处理的作品数 (默认: {DOWNLOAD_CONFIG['item_workers']})")
+    parser.add_argument('--no-zip', action='store_true', help='不创建ZIP压缩包')
+    parser.add_argument('--zip-s3', action='store_true', help='ZIP 不写本地，按分段上传直接写到 S3')
+    args = parser.parse_args()
+
+    zip_mode = None if args.no_zip else ('s3' if args.zip_s3 else 'local')
+    Hydrator(args.manifest, args.output, args.workers, zip_mode=zip_mode).run()
@@ -10,17 +10,65 @@ AI视频素材爬虫主程序
 - Pixverse.ai
 """
 import sys
+import time
 import argparse
 from pathlib import Path
-from config import OUTPUT_DIR, WEBSITES
+from config import OUTPUT_DIR
 from utils import DataManager
-from scrapers import (
-    WanVideoScraper,
-    HiggsfieldScraper,
-    ImagineArtScraper,
-    InvideoScraper,
-    PixverseScraper
-)
+from materials_db import materials_db_path
+from scrapers import SITES, create_scraper, load_scraper
+from archive import finish_archive, start_archive
+from deadline import current_deadline, parse_duration, start_deadline
+from replay import finish_tape, start_tape
+from profiling import finish_profile, profiled, start_profile
+from tracing import finish_tracing, start_tracing
+import metrics
+
+
+def run_site(site: str, data_manager: DataManager, item_sink=None) -> int:
+    """
+    爬取单个网站（只在此时导入该网站的爬虫模块）
+    
+    Args:
+        site: 命令行网站标识
+        data_manager: 数据管理器
+        item_sink: 作品去向（如元数据清单），为 None 时就地下载上传
+        
+    Returns:
+        爬取的数据条数
+    """
+    display_name = SITES[site]['display_name']
+    
+    try:
+        scraper = create_scraper(site, data_manager)
+    except Exception as e:
+        print(f"✗ {display_name} 加载失败: {e}")
+        return 0
+    
+    if scraper is None:
+        print(f"⚠️  {display_name} 爬虫暂未实现（需要改造为 API 版本）")
+        return 0
+    scraper.item_sink = item_sink
+    
+    # 设置了截止时间时，传输预算用完后取消本网站的爬取
+    deadline = current_deadline()
+    if deadline:
+        deadline.watch(scraper)
+    
+    try:
+        with profiled(site):
+            count = scraper.scrape()
+        scraper.close()
+        print(f"✓ {display_name} 完成: {count} 条 (已实时写入TXT)")
+        return count
+    except Exception as e:
+        print(f"✗ {display_name} 失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return 0
+    finally:
+        if deadline:
+            deadline.unwatch(scraper)
 
 
 def main():
@@ -29,7 +77,7 @@ def main():
     parser.add_argument(
         '--sites',
         nargs='+',
-        choices=['wan', 'higgsfield', 'imagine', 'invideo', 'pixverse', 'all'],
+        choices=list(SITES) + ['all'],
         default=['all'],
         help='要爬取的网站 (默认: all)'
     )
@@ -44,11 +92,89 @@ def main():
         action='store_true',
         help='不创建ZIP压缩包'
     )
+    parser.add_argument(
+        '--zip-s3',
+        action='store_true',
+        help='ZIP 不写本地，按分段上传直接写到 S3'
+    )
     
-    args = parser.parse_args()
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='守护进程模式：常驻运行，按 config.WEBSITES 中的 schedule_minutes 定时爬取'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='并行进程数：>1 时每个网站/分类分片在独立进程中运行，结束后合并结果 (默认: 1)'
+    )
+    parser.add_argument(
+        '--queue',
+        type=str,
+        help='分布式模式的共享队列地址：sqlite:///queue.db 或 redis://host:6379/0'
+    )
+    parser.add_argument(
+        '--role',
+        choices=['coordinator', 'worker'],
+        default='coordinator',
+        help='分布式模式角色：coordinator 入队并汇总结果，worker 租用并执行任务 (默认: coordinator)'
+    )
+    parser.add_argument(
+        '--metadata-only',
+        action='store_true',
+        help='只遍历列表，把作品元数据写入 JSONL 清单（不下载），之后用 hydrate.py 补全媒体'
+    )
+    parser.add_argument(
+        '--manifest',
+        type=str,
+        help='--metadata-only 的清单路径 (默认: {输出目录}/manifests/metadata-时间.jsonl)'
+    )
+    parser.add_argument(
+        '--deadline',
+        type=parse_duration,
+        help='墙钟时间预算，如 900、30m、1.5h：赶不上的大文件不再开始，截止前取消爬取并写出结果'
+    )
+    parser.add_argument(
+        '--parquet',
+        action='store_true',
+        help='同时把结果增量写入 {输出目录}/parquet/site=网站/（需要 pyarrow）'
+    )
+    parser.add_argument(
+        '--record',
+        type=str,
+        metavar='DIR',
+        help='录制每个列表接口响应和媒体文件（含响应头）到 DIR，之后可用 --replay 离线回放'
+    )
+    parser.add_argument(
+        '--replay',
+        type=str,
+        metavar='DIR',
+        help='离线回放 --record 录制的目录：不访问网络，S3 上传写到 DIR/s3/'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='性能剖析：每个网站的 cProfile、全线程调用栈采样（火焰图）和阶段边界的内存快照，'
+             '写到 {output}/profiles/（守护进程模式不支持）'
+    )
+    parser.add_argument(
+        '--trace',
+        action='store_true',
+        help='记录每个作品各阶段的耗时 span（主机、字节数、状态码、重试），OTLP JSON 写到 {output}/traces/'
+    )
     
-    # 初始化数据管理器
-    data_manager = DataManager(args.output)
+    args = parser.parse_args()
+    if args.record and args.replay:
+        parser.error('--record 和 --replay 不能同时使用')
+    if args.daemon:
+        # 守护进程按 config.WEBSITES 定时逐个网站爬取，不会用到这些选项
+        unsupported = [flag for flag, used in (
+            ('--deadline', args.deadline), ('--workers', args.workers != 1), ('--queue', args.queue),
+            ('--metadata-only', args.metadata_only), ('--parquet', args.parquet), ('--trace', args.trace),
+            ('--profile', args.profile), ('--zip-s3', args.zip_s3)) if used]
+        if unsupported:
+            parser.error(f"{' / '.join(unsupported)} 不支持守护进程模式（--daemon）")
     
     print("=" * 60)
     print("AI视频素材爬虫")
@@ -60,103 +186,94 @@ def main():
     # 确定要爬取的网站
     sites_to_scrape = args.sites
     if 'all' in sites_to_scrape:
-        sites_to_scrape = ['wan', 'higgsfield', 'imagine', 'invideo', 'pixverse']
+        sites_to_scrape = list(SITES)
+    
+    tape = None
+    if args.record or args.replay:
+        tape = (args.record, 'record') if args.record else (args.replay, 'replay')
+        start_tape(*tape)
+        print(f"📼 {'录制到' if args.record else '回放'}: {tape[0]}")
+    
+    if args.daemon:
+        from daemon import CrawlDaemon
+        try:
+            return CrawlDaemon(sites_to_scrape, args.output).run_forever()
+        finally:
+            finish_tape()
+    
+    deadline = None
+    if args.deadline:
+        deadline = start_deadline(time.time() + args.deadline)
+        print(f"⏱️  截止时间: {time.strftime('%H:%M:%S', time.localtime(deadline.ends_at))}"
+              f"（预留 {deadline.flush_reserve:.0f}s 写出结果）")
+    
+    profile_dir = None
+    if args.profile:
+        profile_dir = str(Path(args.output) / 'profiles' / f"run-{time.strftime('%Y%m%d-%H%M%S')}")
+        start_profile(profile_dir)
+        print(f"🔬 性能剖析: {profile_dir}")
+    
+    trace_dir = None
+    if args.trace:
+        trace_dir = str(Path(args.output) / 'traces' / f"run-{time.strftime('%Y%m%d-%H%M%S')}")
+        start_tracing(str(Path(trace_dir) / 'spans.jsonl'))
+        print(f"🧵 作品追踪: {trace_dir}")
+    
+    # 初始化数据管理器
+    data_manager = DataManager(args.output, materials_db=materials_db_path(args.output))
     
+    parquet_sink = None
     total_scraped = 0
+    zip_mode = None if args.no_zip else ('s3' if args.zip_s3 else 'local')
+    interrupted = False
     
     try:
-        # 爬取 Wan Video (新的超简单版本)
-        if 'wan' in sites_to_scrape:
+        if args.parquet:
+            from parquet_export import ParquetSink
+            parquet_sink = ParquetSink(args.output)
+            data_manager.row_listeners.append(parquet_sink)
+        
+        if args.metadata_only:
+            from hydrate import ManifestWriter
+            manifest_path = args.manifest or str(
+                Path(args.output) / 'manifests' / f"metadata-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+            manifest = ManifestWriter(manifest_path)
             try:
-                scraper = WanVideoScraper(
-                    data_manager,
-                    target_count=WEBSITES['wan_video']['target_count']
-                )
-                count = scraper.scrape()
-                total_scraped += count
-                scraper.close()
-                print(f"✓ Wan Video 完成: {count} 条 (已实时写入TXT)")
-            except Exception as e:
-                print(f"✗ Wan Video 失败: {e}")
-                import traceback
-                traceback.print_exc()
+                for site in sites_to_scrape:
+                    run_site(site, data_manager, item_sink=manifest.sink(site))
+            finally:
+                manifest.close()
+            print(f"\n📝 元数据清单: {manifest_path}（{manifest.written} 个作品）")
+            print(f"   补全媒体: python3 hydrate.py {manifest_path}")
+            return 0
         
-        # 爬取 Higgsfield
-        if 'higgsfield' in sites_to_scrape:
-            if HiggsfieldScraper is None:
-                print("⚠️  Higgsfield 爬虫暂未实现（需要改造为 API 版本）")
-            else:
-                try:
-                    scraper = HiggsfieldScraper(
-                        data_manager,
-                        target_count_per_category=WEBSITES['higgsfield']['target_count']
-                    )
-                    count = scraper.scrape()
-                    total_scraped += count
-                    scraper.close()
-                    print(f"✓ Higgsfield 完成: {count} 条 (已实时写入TXT)")
-                except Exception as e:
-                    print(f"✗ Higgsfield 失败: {e}")
-                    import traceback
-                    traceback.print_exc()
+        # 下载完成的文件边下载边打包（分片模式下由各子进程打包）
+        if zip_mode and not (args.workers > 1 and not args.queue):
+            start_archive(args.output, to_s3=zip_mode == 's3')
         
-        # 爬取 Imagine.art
-        if 'imagine' in sites_to_scrape:
-            if ImagineArtScraper is None:
-                print("⚠️  Imagine.art 爬虫暂未实现（需要改造为 API 版本）")
+        if args.queue:
+            from distributed import run_coordinator, run_worker
+            if args.role == 'worker':
+                total_scraped = run_worker(args.queue, args.output, data_manager)
             else:
-                try:
-                    scraper = ImagineArtScraper(
-                        data_manager,
-                        target_count=WEBSITES['imagine_art']['target_count']
-                    )
-                    count = scraper.scrape()
-                    total_scraped += count
-                    scraper.close()
-                    print(f"✓ Imagine.art 完成: {count} 条 (已实时写入TXT)")
-                except Exception as e:
-                    print(f"✗ Imagine.art 失败: {e}")
-                    import traceback
-                    traceback.print_exc()
+                total_scraped = run_coordinator(sites_to_scrape, args.queue, data_manager)
+        elif args.workers > 1:
+            from sharding import run_sharded
+            total_scraped = run_sharded(sites_to_scrape, args.output, args.workers, data_manager,
+                                        deadline_at=deadline.ends_at if deadline else None, zip_mode=zip_mode,
+                                        tape=tape, profile_dir=profile_dir, trace_dir=trace_dir)
+        else:
+            for site in sites_to_scrape:
+                if deadline and deadline.expired():
+                    print(f"⏰ 已到截止时间，跳过: {SITES[site]['display_name']}")
+                    continue
+                total_scraped += run_site(site, data_manager)
         
-        # 爬取 InVideo
-        if 'invideo' in sites_to_scrape:
-            if InvideoScraper is None:
-                print("⚠️  InVideo 爬虫暂未实现（需要改造为 API 版本）")
-            else:
-                try:
-                    scraper = InvideoScraper(
-                        data_manager,
-                        target_count_per_category=WEBSITES['invideo']['target_count']
-                    )
-                    count = scraper.scrape()
-                    total_scraped += count
-                    scraper.close()
-                    print(f"✓ InVideo 完成: {count} 条 (已实时写入TXT)")
-                except Exception as e:
-                    print(f"✗ InVideo 失败: {e}")
-                    import traceback
-                    traceback.print_exc()
-        
-        # 爬取 Pixverse
-        if 'pixverse' in sites_to_scrape:
-            if PixverseScraper is None:
-                print("⚠️  Pixverse 爬虫暂未实现（需要改造为 API 版本）")
-            else:
-                try:
-                    scraper = PixverseScraper(
-                        data_manager,
-                        target_count=WEBSITES['pixverse']['target_count'],
-                        categories=WEBSITES['pixverse'].get('categories')
-                    )
-                    count = scraper.scrape()
-                    total_scraped += count
-                    scraper.close()
-                    print(f"✓ Pixverse 完成: {count} 条 (已实时写入TXT)")
-                except Exception as e:
-                    print(f"✗ Pixverse 失败: {e}")
-                    import traceback
-                    traceback.print_exc()
+        if deadline:
+            # 在截止前写出已完成的结果
+            deadline.close()
+            data_manager.save_excel()
+            print(f"💾 结果已写出（距截止 {deadline.remaining():.0f}s）")
         
         # TXT已实时写入
         print("\n" + "=" * 60)
@@ -177,12 +294,53 @@ def main():
         
     except KeyboardInterrupt:
         print("\n\n用户中断")
+        interrupted = True
         return 1
     except Exception as e:
         print(f"\n\n错误: {e}")
         import traceback
         traceback.print_exc()
         return 1
+    finally:
+        data_manager.close()
+        finish_archive(aborted=interrupted)
+        finish_tape()
+        if parquet_sink:
+            parquet_sink.close()
+            print(f"🧱 Parquet: {parquet_sink.root}（{parquet_sink.written} 行）")
+        write_run_report(args.output, sites_to_scrape, total_scraped)
+        tracer = finish_tracing()
+        if tracer:
+            print(f"🧵 作品追踪: {trace_dir}（{tracer.written} 个作品）")
+            print(f"   分析: python3 tracing.py {trace_dir}/*.jsonl")
+        if profile_dir:
+            finish_profile()
+            print(f"🔬 剖析结果: {profile_dir}（*.pstats / *.collapsed / memory-*.txt）")
+
+
+def write_run_report(output_dir: str, sites: list, total: int):
+    """
+    写出本次运行的指标报告并打印各阶段耗时
+
+    Args:
+        output_dir: 输出目录（报告写到 {输出目录}/reports/run-{时间}.json）
+        sites: 本次爬取的网站
+        total: 爬取的数据总条数
+    """
+    path = Path(output_dir) / 'reports' / f"run-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    try:
+        metrics.write_run_report(path, extra={'sites': sites, 'total': total})
+    except OSError as e:
+        print(f"⚠️  写出运行报告失败: {e}")
+        return
+    rows = metrics.stage_summary()
+    if rows:
+        print("\n⏱️  各阶段耗时:")
+        for row in rows:
+            failed = f"，失败 {row['failed']}" if row['failed'] else ''
+            print(f"   {row['site']:<12} {row['stage']:<9} {row['count']:>6} 次{failed}  "
+                  f"共 {row['seconds']:.1f}s  平均 {row['mean_seconds'] * 1000:.0f}ms")
+    print(f"📈 运行报告: {path}")
 
 
 if __name__ == '__main__':
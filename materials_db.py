@@ -0,0 +1,352 @@
+"""
+素材库 - 所有历史运行的结果保存在一个 SQLite 数据库中（默认 {输出目录}/materials.db，见 materials_db_path）
+
+- works：每个作品一行（网站 + 作品URL 唯一），含提示词、分类、类型、上传状态、字节数和耗时
+- assets：作品的媒体（work 作品 / source 原图 / cover 缩略图）及是否已在 S3
+- works_fts：提示词全文索引（FTS5，SQLite 未编译 FTS5 时退化为 LIKE 查询）
+
+DataManager 记录结果行时同时写入素材库（main.py / 守护进程 / hydrate.py），
+同一作品重复爬到时更新而不是重复插入。
+
+命令行：
+    python3 materials_db.py query "neon city" --site pixverse --type image2video
+    python3 materials_db.py --output /data/run query sci-fi      # 其他输出目录的素材库
+    python3 materials_db.py query --status partial --limit 0 --xlsx partial.xlsx
+    python3 materials_db.py import downloads/manifests/rows-*.jsonl   # 导入历史清单
+    python3 materials_db.py stats
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from config import AWS_S3_CONFIG, MANIFEST_CONFIG, MATERIALS_DB_CONFIG, OUTPUT_DIR
+from models import PLACEHOLDERS, AssetRecord
+
+ASSET_ROLES = ('work', 'source', 'cover')
+
+
+class MaterialsStore:
+    """SQLite 素材库（线程安全，写入按批提交）"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS works (
+            id INTEGER PRIMARY KEY,
+            site TEXT NOT NULL,
+            work_url TEXT NOT NULL,
+            prompt TEXT,
+            category TEXT,
+            type TEXT,
+            upload_status TEXT NOT NULL,    -- uploaded: 所有媒体都在 S3；partial: 原图/缩略图仍是源站地址
+            bytes INTEGER,
+            download_seconds REAL,
+            upload_seconds REAL,
+            total_seconds REAL,
+            run_id TEXT,
+            recorded_at REAL NOT NULL,
+            UNIQUE (site, work_url)
+        );
+        CREATE INDEX IF NOT EXISTS idx_works_site ON works(site, recorded_at);
+        CREATE INDEX IF NOT EXISTS idx_works_type ON works(type);
+        CREATE INDEX IF NOT EXISTS idx_works_upload_status ON works(upload_status);
+        CREATE TABLE IF NOT EXISTS assets (
+            work_id INTEGER NOT NULL REFERENCES works(id) ON DELETE CASCADE,
+            role TEXT NOT NULL,             -- work / source / cover
+            url TEXT NOT NULL,
+            uploaded INTEGER NOT NULL,
+            PRIMARY KEY (work_id, role)
+        );
+        CREATE INDEX IF NOT EXISTS idx_assets_uploaded ON assets(uploaded, role);
+    """
+
+    # 外部内容 FTS5 表：只存索引，正文仍在 works.prompt，由触发器同步
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS works_fts USING fts5(prompt, content='works', content_rowid='id');
+        CREATE TRIGGER IF NOT EXISTS works_fts_insert AFTER INSERT ON works BEGIN
+            INSERT INTO works_fts(rowid, prompt) VALUES (new.id, new.prompt);
+        END;
+        CREATE TRIGGER IF NOT EXISTS works_fts_delete AFTER DELETE ON works BEGIN
+            INSERT INTO works_fts(works_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt);
+        END;
+        CREATE TRIGGER IF NOT EXISTS works_fts_update AFTER UPDATE OF prompt ON works BEGIN
+            INSERT INTO works_fts(works_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt);
+            INSERT INTO works_fts(rowid, prompt) VALUES (new.id, new.prompt);
+        END;
+    """
+
+    def __init__(self, path: str, run_id: Optional[str] = None):
+        """
+        Args:
+            path: 数据库文件路径
+            run_id: 本次运行标识（默认 时间-进程号），用于区分历史运行
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.time()
+
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA foreign_keys=ON')
+        self._conn.executescript(self.SCHEMA)
+        try:
+            self._conn.executescript(self.FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False  # SQLite 未编译 FTS5
+
+    def add(self, record: AssetRecord, run_id: Optional[str] = None, recorded_at: Optional[float] = None):
+        """记录一个作品（按批写入，见 MANIFEST_CONFIG 的 flush_rows / flush_seconds）"""
+        with self._lock:
+            self._pending.append((record, run_id or self.run_id, recorded_at or time.time()))
+            if (len(self._pending) >= MANIFEST_CONFIG['flush_rows']
+                    or time.time() - self._last_flush >= MANIFEST_CONFIG['flush_seconds']):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        pending, self._pending = self._pending, []
+        self._last_flush = time.time()
+        if not pending:
+            return
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            for record in pending:
+                self._upsert(*record)
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+
+    def _upsert(self, record: AssetRecord, run_id: str, recorded_at: float):
+        urls = dict(zip(ASSET_ROLES, (record.work_url, record.source_url, record.cover_url)))
+        uploaded = {role: _is_uploaded(url) for role, url in urls.items() if url}
+        status = 'uploaded' if all(uploaded.values()) else 'partial'
+
+        self._conn.execute(
+            """
+            INSERT INTO works (site, work_url, prompt, category, type, upload_status, bytes,
+                               download_seconds, upload_seconds, total_seconds, run_id, recorded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (site, work_url) DO UPDATE SET
+                prompt = excluded.prompt,
+                category = COALESCE(excluded.category, category),
+                type = COALESCE(excluded.type, type),
+                upload_status = excluded.upload_status,
+                bytes = COALESCE(excluded.bytes, bytes),
+                download_seconds = COALESCE(excluded.download_seconds, download_seconds),
+                upload_seconds = COALESCE(excluded.upload_seconds, upload_seconds),
+                total_seconds = COALESCE(excluded.total_seconds, total_seconds),
+                run_id = excluded.run_id,
+                recorded_at = excluded.recorded_at
+            """,
+            (record.site, record.work_url, record.prompt or None, record.category or None, record.type or None,
+             status, record.bytes, record.download_seconds, record.upload_seconds,
+             record.total_seconds, run_id, recorded_at)
+        )
+        work_id = self._conn.execute(
+            'SELECT id FROM works WHERE site = ? AND work_url = ?', (record.site, record.work_url)
+        ).fetchone()[0]
+        self._conn.execute('DELETE FROM assets WHERE work_id = ?', (work_id,))
+        self._conn.executemany(
+            'INSERT INTO assets (work_id, role, url, uploaded) VALUES (?, ?, ?, ?)',
+            [(work_id, role, urls[role], int(is_uploaded)) for role, is_uploaded in uploaded.items()]
+        )
+
+    def query(self, text: Optional[str] = None, site: Optional[str] = None, work_type: Optional[str] = None,
+              status: Optional[str] = None, category: Optional[str] = None, run_id: Optional[str] = None,
+              limit: int = 50) -> List[Dict]:
+        """
+        按条件筛选作品（最新的在前）
+
+        Args:
+            text: 提示词检索，空格分隔的词都要出现（如 neon city、sci-fi；按原文匹配，不解释 FTS5 语法）
+            site: 网站表名，如 pixverse
+            work_type: text2video / image2video
+            status: uploaded / partial
+            category: 作品分类
+            run_id: 只看某次运行
+            limit: 最多返回多少条，0 表示不限
+
+        Returns:
+            作品字典列表（含 source_url / cover_url）
+        """
+        sql = [
+            "SELECT w.*, s.url AS source_url, c.url AS cover_url FROM works w",
+            "LEFT JOIN assets s ON s.work_id = w.id AND s.role = 'source'",
+            "LEFT JOIN assets c ON c.work_id = w.id AND c.role = 'cover'",
+        ]
+        where, params = [], []
+        if text:
+            terms = text.split()
+            if self.fts:
+                where.append('w.id IN (SELECT rowid FROM works_fts WHERE works_fts MATCH ?)')
+                params.append(fts_query(terms))
+            else:
+                where.extend('w.prompt LIKE ?' for _ in terms)
+                params.extend(f'%{term}%' for term in terms)
+        for column, value in (('site', site), ('type', work_type), ('upload_status', status),
+                              ('category', category), ('run_id', run_id)):
+            if value:
+                where.append(f'w.{column} = ?')
+                params.append(value)
+        if where:
+            sql.append('WHERE ' + ' AND '.join(where))
+        sql.append('ORDER BY w.recorded_at DESC, w.id DESC')
+        if limit:
+            sql.append('LIMIT ?')
+            params.append(limit)
+
+        self.flush()
+        with self._lock:
+            cursor = self._conn.execute(' '.join(sql), params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, values)) for values in cursor.fetchall()]
+
+    def stats(self) -> Dict:
+        """各网站 / 上传状态的作品数"""
+        self.flush()
+        with self._lock:
+            by_site = dict(self._conn.execute('SELECT site, COUNT(*) FROM works GROUP BY site').fetchall())
+            by_status = dict(self._conn.execute(
+                'SELECT upload_status, COUNT(*) FROM works GROUP BY upload_status').fetchall())
+            runs = self._conn.execute('SELECT COUNT(DISTINCT run_id) FROM works').fetchone()[0]
+        return {'total': sum(by_site.values()), 'sites': by_site, 'upload_status': by_status, 'runs': runs}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._flush_locked()
+                self._conn.close()
+                self._conn = None
+
+
+def fts_query(terms: List[str]) -> str:
+    """
+    用户输入的词 → FTS5 查询：每个词作为带引号的字符串，
+    sci-fi、it's、city, 等含标点的词不会被当成 FTS5 运算符而报语法错误
+    """
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def materials_db_path(output_dir: str) -> Optional[str]:
+    """素材库路径：MATERIALS_DB（空字符串表示不启用），未设置时为 {输出目录}/materials.db"""
+    path = MATERIALS_DB_CONFIG['path']
+    if path is None:
+        return str(Path(output_dir) / 'materials.db')
+    return path or None
+
+
+def _is_uploaded(url: str) -> bool:
+    return url.startswith(AWS_S3_CONFIG['url_prefix'])
+
+
+def to_row(work: Dict) -> List:
+    """查询结果 → Excel 结果行（与 DataManager.append_to_txt 的格式相同）"""
+    return [
+        work['work_url'],
+        work.get('source_url') or PLACEHOLDERS['source_url'],
+        work.get('prompt') or PLACEHOLDERS['prompt'],
+        work.get('cover_url') or PLACEHOLDERS['cover_url'],
+    ]
+
+
+def open_store(path: Optional[str] = None, output_dir: str = OUTPUT_DIR) -> Optional[MaterialsStore]:
+    """打开素材库（默认见 materials_db_path）；未启用时返回 None"""
+    path = path or materials_db_path(output_dir)
+    if not path:
+        return None
+    return MaterialsStore(path)
+
+
+def import_manifest(store: MaterialsStore, manifest_path: str) -> int:
+    """
+    导入历史结果行清单（运行标识取清单文件名，记录时间取文件修改时间）
+
+    Returns:
+        导入的行数
+    """
+    from utils import RowManifest
+
+    run_id = Path(manifest_path).stem.replace('rows-', '', 1)
+    recorded_at = os.path.getmtime(manifest_path)
+    count = 0
+    for record in RowManifest.read_records(manifest_path):
+        store.add(record, run_id=run_id, recorded_at=recorded_at)
+        count += 1
+    store.flush()
+    return count
+
+
+def _print_works(works: Iterator[Dict]):
+    for work in works:
+        prompt = (work.get('prompt') or '').replace('\n', ' ')
+        if len(prompt) > 100:
+            prompt = prompt[:100] + '…'
+        flag = '✅' if work['upload_status'] == 'uploaded' else '⚠️ '
+        print(f"{flag} [{work['site']}] {work.get('type') or '-'} {work.get('category') or '-'} "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(work['recorded_at']))}")
+        print(f"   {work['work_url']}")
+        if prompt:
+            print(f"   {prompt}")
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='查询 / 导入素材库')
+    parser.add_argument('--output', default=OUTPUT_DIR, help=f'输出目录 (默认: {OUTPUT_DIR})')
+    parser.add_argument('--db', help='数据库路径 (默认: MATERIALS_DB 或 {输出目录}/materials.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query_parser = commands.add_parser('query', help='筛选作品 / 全文检索提示词')
+    query_parser.add_argument('text', nargs='?', help='提示词检索（空格分隔的词都要出现）')
+    query_parser.add_argument('--site', help='网站表名，如 pixverse')
+    query_parser.add_argument('--type', choices=['text2video', 'image2video'])
+    query_parser.add_argument('--status', choices=['uploaded', 'partial'], help='上传状态')
+    query_parser.add_argument('--category', help='作品分类')
+    query_parser.add_argument('--run', help='运行标识')
+    query_parser.add_argument('--limit', type=int, default=50, help='最多返回条数，0 不限 (默认: 50)')
+    query_parser.add_argument('--json', action='store_true', help='每行输出一个 JSON')
+    query_parser.add_argument('--xlsx', help='把结果导出为 Excel 文件')
+
+    import_parser = commands.add_parser('import', help='导入历史结果行清单')
+    import_parser.add_argument('manifests', nargs='+', help='downloads/manifests/rows-*.jsonl')
+
+    commands.add_parser('stats', help='各网站 / 上传状态的作品数')
+
+    args = parser.parse_args()
+    db_path = args.db or materials_db_path(args.output)
+    if not db_path:
+        parser.error('素材库未启用（MATERIALS_DB 为空），请用 --db 指定路径')
+    store = MaterialsStore(db_path)
+    try:
+        if args.command == 'import':
+            for manifest in args.manifests:
+                print(f"📥 {manifest}: {import_manifest(store, manifest)} 行")
+        elif args.command == 'stats':
+            print(json.dumps(store.stats(), ensure_ascii=False, indent=2))
+        else:
+            works = store.query(args.text, site=args.site, work_type=args.type, status=args.status,
+                                category=args.category, run_id=args.run, limit=args.limit)
+            if args.xlsx:
+                from utils import excel_column_widths, write_excel_rows
+                rows = [to_row(work) for work in works]
+                write_excel_rows(rows, args.xlsx, excel_column_widths(rows))
+                print(f"📊 {args.xlsx} ({len(rows)} 条)")
+            elif args.json:
+                for work in works:
+                    print(json.dumps(work, ensure_ascii=False))
+            else:
+                _print_works(works)
+                print(f"\n共 {len(works)} 条")
+    finally:
+        store.close()
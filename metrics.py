@@ -0,0 +1,214 @@
+"""
+运行指标（进程内注册表）
+
+按网站、阶段统计次数和耗时分布，另有字节数、重试、缓存命中和队列深度：
+
+- webscript_stage_seconds{site, stage}            各阶段耗时直方图（listing / probe / download /
+                                                    validate / upload / record / export）
+- webscript_stage_total{site, stage, outcome}     各阶段次数（ok / failed）
+- webscript_bytes_total{site, direction}          下载（in）/ 上传（out）字节数
+- webscript_retries_total{site}                   列表请求重试次数（Scrapy retry/count）
+- webscript_cache_total{site, outcome}            列表缓存 hits / misses / revalidated
+- webscript_queue_depth{queue}                    积压深度（作品后台线程、打包队列）
+
+守护进程模式在 DAEMON_CONFIG['metrics_port'] 提供 Prometheus 文本格式（GET /metrics），
+main.py 结束时把快照写到 {输出目录}/reports/run-{时间}.json。多进程分片把各自的快照
+随结果交回父进程合并（merge_snapshot）。
+"""
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 默认直方图分桶（秒）：覆盖毫秒级的列表解析到分钟级的大文件下载
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    """样本值：整数原样输出，浮点数用 repr 保留全部精度（'%g' 只有 6 位有效数字）"""
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer() and abs(value) < 2 ** 53):
+        return '%d' % value
+    return repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Metric:
+    """一个指标（counter / gauge / histogram），按标签值分组"""
+
+    def __init__(self, name: str, kind: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][idx] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        """(指标名, 标签, 值)，直方图展开为 _bucket / _sum / _count"""
+        with self._lock:
+            items = [(key, value if self.kind != 'histogram' else dict(value, buckets=list(value['buckets'])))
+                     for key, value in self._values.items()]
+        for key, value in sorted(items):
+            labels = dict(zip(self.labelnames, key))
+            if self.kind != 'histogram':
+                yield self.name, labels, value
+                continue
+            cumulative = 0
+            for bound, count in zip(self.buckets, value['buckets']):
+                cumulative += count
+                yield f"{self.name}_bucket", dict(labels, le=_format_value(bound)), cumulative
+            yield f"{self.name}_bucket", dict(labels, le='+Inf'), value['count']
+            yield f"{self.name}_sum", labels, value['sum']
+            yield f"{self.name}_count", labels, value['count']
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [dict(zip(self.labelnames, key), value=value if self.kind != 'histogram' else dict(value))
+                    for key, value in self._values.items()]
+
+    def merge(self, entries: List[Dict]):
+        """合并另一个进程的 snapshot()（counter / histogram 相加，gauge 取最新值）"""
+        for entry in entries:
+            key = self._key(entry)
+            value = entry['value']
+            with self._lock:
+                if self.kind == 'gauge':
+                    self._values[key] = value
+                elif self.kind == 'counter':
+                    self._values[key] = self._values.get(key, 0.0) + value
+                else:
+                    state = self._values.setdefault(
+                        key, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+                    state['buckets'] = [a + b for a, b in zip(state['buckets'], value['buckets'])]
+                    state['sum'] += value['sum']
+                    state['count'] += value['count']
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self.started_at = time.time()
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render_prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def merge_snapshot(self, snapshot: Optional[Dict[str, List[Dict]]]):
+        for name, entries in (snapshot or {}).items():
+            if name in self._metrics:
+                self._metrics[name].merge(entries)
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Metric(
+    'webscript_stage_seconds', 'histogram', '各阶段耗时（秒）', ('site', 'stage')))
+STAGE_TOTAL = REGISTRY.register(Metric(
+    'webscript_stage_total', 'counter', '各阶段次数', ('site', 'stage', 'outcome')))
+BYTES_TOTAL = REGISTRY.register(Metric(
+    'webscript_bytes_total', 'counter', '下载（in）/ 上传（out）字节数', ('site', 'direction')))
+RETRIES_TOTAL = REGISTRY.register(Metric(
+    'webscript_retries_total', 'counter', '列表请求重试次数', ('site',)))
+CACHE_TOTAL = REGISTRY.register(Metric(
+    'webscript_cache_total', 'counter', '列表缓存命中 / 未命中 / 304 重新验证', ('site', 'outcome')))
+QUEUE_DEPTH = REGISTRY.register(Metric(
+    'webscript_queue_depth', 'gauge', '积压深度', ('queue',)))
+
+
+def record_stage(site: str, stage: str, seconds: float, ok: bool = True):
+    """记录一次阶段耗时和结果"""
+    STAGE_SECONDS.observe(seconds, site=site, stage=stage)
+    STAGE_TOTAL.inc(site=site, stage=stage, outcome='ok' if ok else 'failed')
+
+
+def add_bytes(site: str, direction: str, amount: int):
+    """累计下载（'in'）/ 上传（'out'）字节数"""
+    if amount:
+        BYTES_TOTAL.inc(amount, site=site, direction=direction)
+
+
+def stage_summary() -> List[Dict]:
+    """按网站 / 阶段汇总：次数、失败数、总耗时、平均耗时（运行报告和结束时的打印）"""
+    rows = {}
+    for entry in STAGE_SECONDS.snapshot():
+        rows[(entry['site'], entry['stage'])] = {
+            'site': entry['site'], 'stage': entry['stage'], 'count': entry['value']['count'],
+            'failed': 0, 'seconds': round(entry['value']['sum'], 3),
+            'mean_seconds': round(entry['value']['sum'] / entry['value']['count'], 4) if entry['value']['count'] else 0.0,
+        }
+    for entry in STAGE_TOTAL.snapshot():
+        row = rows.get((entry['site'], entry['stage']))
+        if row is not None and entry['outcome'] == 'failed':
+            row['failed'] = int(entry['value'])
+    return sorted(rows.values(), key=lambda row: (row['site'], row['stage']))
+
+
+def write_run_report(path, extra: Dict = None) -> Path:
+    """把本进程的指标写成 JSON 运行报告"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(REGISTRY.started_at)),
+        'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seconds': round(time.time() - REGISTRY.started_at, 3),
+        'stages': stage_summary(),
+        'metrics': REGISTRY.snapshot(),
+    }
+    report.update(extra or {})
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(path)
+    return path
@@ -0,0 +1,136 @@
+"""
+作品数据模型 - 所有爬虫、队列、清单和导出共用
+
+- WorkItem：列表接口提取到的一个作品（下载前），在 Spider → ItemWorker / 元数据清单 / 队列之间传递
+- AssetRecord：上传完成后记录的一行结果，写入结果行清单、素材库、Parquet 和 Excel
+
+两者都用 __slots__（没有每个实例的 __dict__），网站、分类、类型等重复度很高的字符串
+用 sys.intern 共享同一个对象。序列化走定长列表（to_list / from_obj）而不是带键名的字典，
+JSON 行更短、解析更快。
+"""
+import json
+import sys
+from typing import Dict, List, Optional
+
+# 结果行里的占位文本（Excel 中显示，内部一律存空串）
+PLACEHOLDERS = {'source_url': '无原图', 'prompt': '无提示词', 'cover_url': '无缩略图'}
+
+
+def _intern(value) -> str:
+    return sys.intern(value) if value else ''
+
+
+class WorkItem:
+    """待处理的作品"""
+
+    __slots__ = ('site', 'id', 'type', 'category', 'prompt', 'video_url', 'source_image_url',
+                 'cover_url', 'media_type', 'local_path', 'bytes')
+
+    def __init__(self, site: str, id: str, type: str = 'text2video', category: str = '', prompt: str = '',
+                 video_url: str = '', source_image_url: str = '', cover_url: str = '',
+                 media_type: str = 'video', local_path: str = '', bytes: int = 0):
+        """
+        Args:
+            site: 爬虫标识（Spider.category_name）
+            id: 网站上的作品 ID
+            type: text2video / image2video
+            category: 网站分类
+            prompt: 提示词
+            video_url: 作品（视频或图片）源地址
+            source_image_url: 原图源地址（图生视频）
+            cover_url: 封面源地址
+            media_type: video / image
+            local_path: 已下载到本地的路径（InVideo 先下载后上传时使用）
+            bytes: 已下载的字节数
+        """
+        self.site = _intern(site)
+        self.id = str(id) if id is not None else ''
+        self.type = _intern(type or 'text2video')
+        self.category = _intern(category)
+        self.prompt = prompt or ''
+        self.video_url = video_url or ''
+        self.source_image_url = source_image_url or ''
+        self.cover_url = cover_url or ''
+        self.media_type = _intern(media_type or 'video')
+        self.local_path = str(local_path) if local_path else ''
+        self.bytes = bytes or 0
+
+    def to_list(self) -> List:
+        """按 __slots__ 顺序的定长列表（JSON 序列化用）"""
+        return [getattr(self, name) for name in self.__slots__]
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_obj(cls, data) -> 'WorkItem':
+        """从 to_list() 的列表还原"""
+        if isinstance(data, cls):
+            return data
+        return cls(*data)
+
+    def __repr__(self):
+        return f"WorkItem({self.site}/{self.id} {self.type})"
+
+
+class AssetRecord:
+    """一个作品的结果（S3 地址 + 提示词 + 分类、类型、字节数和耗时）"""
+
+    __slots__ = ('site', 'work_url', 'source_url', 'prompt', 'cover_url', 'category', 'type',
+                 'bytes', 'download_seconds', 'upload_seconds', 'total_seconds')
+
+    def __init__(self, site: str, work_url: str, source_url: str = '', prompt: str = '', cover_url: str = '',
+                 category: str = '', type: str = '', bytes: Optional[int] = None,
+                 download_seconds: Optional[float] = None, upload_seconds: Optional[float] = None,
+                 total_seconds: Optional[float] = None):
+        self.site = _intern(site)
+        self.work_url = work_url or ''
+        self.source_url = source_url or ''
+        self.prompt = prompt or ''
+        self.cover_url = cover_url or ''
+        self.category = _intern(category)
+        self.type = _intern(type)
+        self.bytes = bytes
+        self.download_seconds = download_seconds
+        self.upload_seconds = upload_seconds
+        self.total_seconds = total_seconds
+
+    def attach_stats(self, stats: Optional[Dict], now: float):
+        """填入本作品的下载 / 上传统计（utils.current_item_stats）"""
+        if stats is None:
+            return self
+        self.bytes = stats['bytes']
+        self.download_seconds = round(stats['download_seconds'], 3)
+        self.upload_seconds = round(stats['upload_seconds'], 3)
+        self.total_seconds = round(now - stats['started'], 3)
+        return self
+
+    def row(self) -> List[str]:
+        """Excel 结果行：作品URL | 原图URL | 提示词 | 缩略图URL（空值显示占位文本）"""
+        return [
+            self.work_url,
+            self.source_url or PLACEHOLDERS['source_url'],
+            self.prompt or PLACEHOLDERS['prompt'],
+            self.cover_url or PLACEHOLDERS['cover_url'],
+        ]
+
+    def to_list(self) -> List:
+        return [getattr(self, name) for name in self.__slots__]
+
+    def to_json(self) -> str:
+        """结果行清单中的一行"""
+        return json.dumps(self.to_list(), ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_obj(cls, data) -> 'AssetRecord':
+        """从 to_list() 的列表还原"""
+        if isinstance(data, cls):
+            return data
+        return cls(*data)
+
+    @classmethod
+    def from_json(cls, line: str) -> 'AssetRecord':
+        return cls.from_obj(json.loads(line))
+
+    def __repr__(self):
+        return f"AssetRecord({self.site} {self.work_url})"
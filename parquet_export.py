@@ -0,0 +1,162 @@
+"""
+Parquet 导出（main.py --parquet）
+
+作品记录按网站分区写入 {输出目录}/parquet/site={网站}/part-{时间}-{进程}-{随机后缀}.parquet
+（Hive 风格分区，pandas / pyarrow.dataset / DuckDB 直接按目录读取，site 列由分区目录提供）。
+
+ParquetSink 作为 DataManager 的 row listener，作品完成后进入缓冲区，
+每个网站积累 row_group_size 行写出一个行组，运行中途文件已可读到大部分数据。
+分片 / 队列模式下父进程合并结果时同样经过 listener，不需要额外步骤。
+
+也可以把已有的结果行清单转换成 Parquet：
+    python3 parquet_export.py downloads/manifests/rows-*.jsonl
+"""
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+from config import EXPORT_CONFIG
+from models import AssetRecord
+
+COLUMNS = [
+    ('work_url', 'string'),
+    ('source_url', 'string'),
+    ('prompt', 'string'),
+    ('cover_url', 'string'),
+    ('category', 'string'),
+    ('type', 'string'),
+    ('bytes', 'int64'),
+    ('download_seconds', 'float64'),
+    ('upload_seconds', 'float64'),
+    ('total_seconds', 'float64'),
+    ('recorded_at', 'timestamp'),
+]
+
+
+def _schema():
+    import pyarrow as pa
+
+    types = {
+        'string': pa.string(),
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'timestamp': pa.timestamp('s'),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+def to_record(record: AssetRecord, recorded_at: float = None) -> Dict:
+    """作品结果 → Parquet 记录（空串存为空值）"""
+    from datetime import datetime
+
+    return {
+        'work_url': record.work_url or None,
+        'source_url': record.source_url or None,
+        'prompt': record.prompt or None,
+        'cover_url': record.cover_url or None,
+        'category': record.category or None,
+        'type': record.type or None,
+        'bytes': record.bytes,
+        'download_seconds': record.download_seconds,
+        'upload_seconds': record.upload_seconds,
+        'total_seconds': record.total_seconds,
+        'recorded_at': datetime.fromtimestamp(int(recorded_at or time.time())),
+    }
+
+
+class ParquetSink:
+    """按网站分区、增量写行组的 Parquet 写入器（线程安全）"""
+
+    def __init__(self, output_dir: str, row_group_size: int = None):
+        """
+        Args:
+            output_dir: 输出目录（写入其下的 parquet/）
+            row_group_size: 每个行组的行数
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError('Parquet 导出需要 pyarrow：pip install pyarrow')
+
+        self.root = Path(output_dir) / 'parquet'
+        self.row_group_size = row_group_size or EXPORT_CONFIG['parquet_row_group']
+        # 随机后缀：同一秒内创建的多个写入器（如命令行逐个转换清单）不会写到同一个文件
+        self.part_name = f"part-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet"
+        self.schema = _schema()
+        self._buffers: Dict[str, List[Dict]] = {}
+        self._writers = {}
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def __call__(self, record: AssetRecord):
+        """DataManager row listener"""
+        self.add(record.site, to_record(record))
+
+    def add(self, site_key: str, record: Dict):
+        with self._lock:
+            buffer = self._buffers.setdefault(site_key, [])
+            buffer.append(record)
+            if len(buffer) >= self.row_group_size:
+                self._write_locked(site_key)
+
+    def _write_locked(self, site_key: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = self._buffers.pop(site_key, None)
+        if not rows:
+            return
+        writer = self._writers.get(site_key)
+        if writer is None:
+            partition = self.root / f"site={site_key}"
+            partition.mkdir(parents=True, exist_ok=True)
+            writer = pq.ParquetWriter(str(partition / self.part_name), self.schema, compression='zstd')
+            self._writers[site_key] = writer
+        writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+        self.written += len(rows)
+
+    def close(self):
+        """写出剩余缓冲并关闭所有文件（关闭前文件尾部元数据不完整，不可读）"""
+        with self._lock:
+            for site_key in list(self._buffers):
+                self._write_locked(site_key)
+            for writer in self._writers.values():
+                writer.close()
+            self._writers = {}
+
+
+def convert_manifest(manifest_path: str, output_dir: str) -> int:
+    """
+    把结果行清单转换成 Parquet
+
+    Returns:
+        写入的行数
+    """
+    from utils import RowManifest
+
+    sink = ParquetSink(output_dir)
+    recorded_at = os.path.getmtime(manifest_path)
+    try:
+        for record in RowManifest.read_records(manifest_path):
+            sink.add(record.site, to_record(record, recorded_at))
+    finally:
+        sink.close()
+    return sink.written
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from config import OUTPUT_DIR
+
+    parser = argparse.ArgumentParser(description='把结果行清单转换成按网站分区的 Parquet')
+    parser.add_argument('manifests', nargs='+', help='结果行清单（downloads/manifests/rows-*.jsonl）')
+    parser.add_argument('--output', default=OUTPUT_DIR, help=f'输出目录 (默认: {OUTPUT_DIR})')
+    args = parser.parse_args()
+
+    for path in args.manifests:
+        count = convert_manifest(path, args.output)
+        print(f"✅ {path} → {Path(args.output) / 'parquet'}（{count} 行）")
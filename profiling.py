@@ -0,0 +1,185 @@
+"""
+性能剖析（main.py --profile）
+
+运行变慢时不用改代码就能看到时间和内存花在哪里（JSON 解析、Excel 样式、I/O 等待……）。
+输出写到 {输出目录}/profiles/run-{时间}/：
+
+- {网站}.pstats        主线程的 cProfile（Scrapy reactor：请求调度、列表解析回调）
+                       查看：python -m pstats xxx.pstats，或 snakeviz xxx.pstats
+- {网站}.collapsed     所有线程的采样调用栈（墙钟时间，含 I/O 和锁等待），每行
+                       "线程名;函数 (文件:行);... 次数"，可直接给 flamegraph.pl / speedscope
+- memory-NN-{阶段}.txt tracemalloc 快照：分配最多的代码行，以及与上一个快照相比的增长
+
+cProfile 只记录调用它的线程，后台下载 / 上传 / 打包线程由采样器覆盖。
+内存快照在阶段边界拍摄：列表爬完（ItemWorker 开始收尾）、下载处理完、save_excel 之后。
+"""
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import PROFILE_CONFIG
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RunProfiler:
+    """一次运行的 CPU（cProfile + 调用栈采样）和内存（tracemalloc）剖析"""
+
+    def __init__(self, directory: str, tag: str = ''):
+        """
+        Args:
+            directory: 输出目录
+            tag: 文件名前缀（多进程分片时为分片 ID，避免互相覆盖）
+        """
+        self.root = Path(directory)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.tag = tag
+        self.interval = PROFILE_CONFIG['sample_interval']
+
+        self._label = tag or 'run'                   # 采样记入哪个文件（当前网站）
+        self._stacks: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+        self._snapshot_count = 0
+        self._last_snapshot = None
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_CONFIG['tracemalloc_frames'])
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+        self._sampler.start()
+
+    def _name(self, name: str) -> str:
+        return f"{self.tag}-{name}" if self.tag and name != self.tag else name
+
+    # ========== CPU ==========
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(_frame_name(frame))
+                    frame = frame.f_back
+                frames.append(names.get(ident, f'thread-{ident}'))
+                stacks.append(';'.join(reversed(frames)))
+            with self._lock:
+                self._stacks.setdefault(self._label, Counter()).update(stacks)
+
+    @contextmanager
+    def site(self, label: str):
+        """剖析一个网站：主线程 cProfile，采样记入 {网站}.collapsed"""
+        label = self._name(label)
+        with self._lock:
+            previous, self._label = self._label, label
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._label = previous
+            profiler.dump_stats(str(self.root / f"{label}.pstats"))
+            self._write_stacks(label)
+
+    def _write_stacks(self, label: str):
+        with self._lock:
+            stacks = self._stacks.pop(label, None)
+        if not stacks:
+            return
+        with open(self.root / f"{label}.collapsed", 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    # ========== 内存 ==========
+
+    def snapshot(self, label: str):
+        """拍一个 tracemalloc 快照，写出分配最多的代码行和相对上一个快照的增长"""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        top = PROFILE_CONFIG['top_lines']
+        with self._lock:
+            self._snapshot_count += 1
+            previous, self._last_snapshot = self._last_snapshot, snapshot
+            path = self.root / self._name(f"memory-{self._snapshot_count:02d}-{label.replace(' ', '_')}.txt")
+
+        lines = [f"# {label} @ {time.strftime('%H:%M:%S')}",
+                 f"# 当前 {current / 1024 / 1024:.1f} MB，峰值 {peak / 1024 / 1024:.1f} MB", '',
+                 f"## 分配最多的 {top} 行"]
+        lines += [str(stat) for stat in snapshot.statistics('lineno')[:top]]
+        if previous is not None:
+            lines += ['', f"## 相对上一个快照增长最多的 {top} 行"]
+            lines += [str(stat) for stat in snapshot.compare_to(previous, 'lineno')[:top]]
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    # ========== 结束 ==========
+
+    def close(self):
+        """停止采样，写出不属于任何网站的采样（排队、导出等）"""
+        self._stopped.set()
+        self._sampler.join()
+        with self._lock:
+            labels = list(self._stacks)
+        for label in labels:
+            self._write_stacks(label)
+        tracemalloc.stop()
+
+
+_current: Optional[RunProfiler] = None
+
+
+def start_profile(directory: str, tag: str = '') -> RunProfiler:
+    """开始剖析本进程，输出写到 directory"""
+    global _current
+    _current = RunProfiler(directory, tag)
+    return _current
+
+
+def current_profile() -> Optional[RunProfiler]:
+    """本进程的剖析器，未开启时为 None"""
+    return _current
+
+
+def finish_profile() -> Optional[Path]:
+    """结束剖析并写出剩余结果，返回输出目录"""
+    global _current
+    profiler, _current = _current, None
+    if profiler is None:
+        return None
+    profiler.close()
+    return profiler.root
+
+
+@contextmanager
+def profiled(label: str):
+    """开启剖析时按网站剖析，否则什么都不做"""
+    if _current is None:
+        yield
+        return
+    with _current.site(label):
+        yield
+
+
+def checkpoint(label: str):
+    """阶段边界：开启剖析时拍内存快照"""
+    if _current is not None:
+        _current.snapshot(label)
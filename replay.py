@@ -0,0 +1,187 @@
+"""
+录制 / 回放（main.py --record DIR / --replay DIR）
+
+--record：正常爬取，同时把每个列表接口响应和媒体文件（含状态码和响应头）录制到 DIR
+--replay：不访问网络，列表请求和媒体下载从 DIR 读取，S3 上传写到本地替身
+          （DIR/s3/{bucket}/{key}），返回的 CDN URL 与真实上传一致
+
+回放时去掉下载延迟和自动限速，整轮五个网站的爬取只受本机 CPU / 磁盘限制，
+可以反复运行做性能分析和回归对比。
+
+目录结构（条目格式与 http_cache.py 相同，按 方法 + URL + 请求体 的 SHA1 存放）：
+    DIR/http/{爬虫名称}/...    列表接口响应
+    DIR/http/media/...          媒体文件
+    DIR/s3/{bucket}/{key}       回放时的上传结果
+"""
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from http_cache import ListingCache
+
+MODES = ('record', 'replay')
+
+
+class TapeCache(ListingCache):
+    """录制条目保留全部响应头（不计入列表缓存指标）"""
+
+    kept_headers = None
+    report_metrics = False
+
+
+class LocalS3Client:
+    """
+    本地 S3 替身：实现本项目用到的 boto3 S3 客户端方法，对象写到 {根目录}/{bucket}/{key}
+
+    upload_file（S3Uploader）和分段上传（archive.S3MultipartWriter）都可用。
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self._uploads: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, bucket: str, key: str) -> Path:
+        path = self.root / bucket / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None, Callback=None, Config=None):
+        with open(Filename, 'rb') as src, open(self._path(Bucket, Key), 'wb') as dst:
+            while True:
+                chunk = src.read(1024 * 1024)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                if Callback is not None:
+                    Callback(len(chunk))
+
+    def put_object(self, Bucket, Key, Body=b'', **kwargs):
+        with open(self._path(Bucket, Key), 'wb') as f:
+            f.write(Body if isinstance(Body, bytes) else Body.read())
+        return {'ETag': '"local"'}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[upload_id] = {'Key': Key, 'UploadId': upload_id, 'parts': {}}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self._lock:
+            self._uploads[UploadId]['parts'][PartNumber] = bytes(Body)
+        return {'ETag': f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload=None):
+        with self._lock:
+            upload = self._uploads.pop(UploadId)
+        with open(self._path(Bucket, Key), 'wb') as f:
+            for number in sorted(upload['parts']):
+                f.write(upload['parts'][number])
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        return {}
+
+    def list_multipart_uploads(self, Bucket, Prefix=''):
+        with self._lock:
+            uploads = [{'Key': u['Key'], 'UploadId': u['UploadId']}
+                       for u in self._uploads.values() if u['Key'].startswith(Prefix)]
+        return {'Uploads': uploads}
+
+
+class Tape:
+    """一个录制目录"""
+
+    def __init__(self, directory: str, mode: str):
+        """
+        Args:
+            directory: 录制目录
+            mode: 'record' / 'replay'
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知模式: {mode}")
+        self.root = Path(directory)
+        self.mode = mode
+        self._caches: Dict[str, TapeCache] = {}
+        self._s3 = None
+        self._lock = threading.Lock()
+        if mode == 'replay' and not (self.root / 'http').is_dir():
+            raise FileNotFoundError(f"录制目录不存在或为空: {self.root}")
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == 'record'
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def cache(self, site: str) -> TapeCache:
+        """某个爬虫（或 'media'）的录制条目"""
+        with self._lock:
+            if site not in self._caches:
+                self._caches[site] = TapeCache(site, ttl=0, cache_dir=str(self.root / 'http'))
+            return self._caches[site]
+
+    def record_media(self, url: str, status: int, headers: Dict[str, str], save_path):
+        """录制下载完成的媒体文件"""
+        with open(save_path, 'rb') as f:
+            self.cache('media').save('GET', url, b'', status, headers, f.read())
+        self.cache('media').count('misses')
+
+    def replay_media(self, url: str, save_path) -> int:
+        """
+        把录制的媒体写到 save_path
+
+        Returns:
+            写入的字节数；没有录制或录制的是错误响应时抛出 IOError
+        """
+        entry = self.cache('media').load('GET', url)
+        if entry is None:
+            raise IOError(f"未录制: {url}")
+        if entry['status'] >= 400:
+            raise IOError(f"HTTP {entry['status']}（录制）: {url}")
+        with open(save_path, 'wb') as f:
+            f.write(entry['content'])
+        self.cache('media').count('hits')
+        return len(entry['content'])
+
+    def s3_client(self) -> LocalS3Client:
+        """回放时的 S3 替身"""
+        with self._lock:
+            if self._s3 is None:
+                self._s3 = LocalS3Client(str(self.root / 's3'))
+            return self._s3
+
+    def summary(self) -> str:
+        verb = '录制' if self.recording else '回放'
+        counts = {site: cache.hits + cache.misses + cache.revalidated for site, cache in self._caches.items()}
+        detail = '，'.join(f"{site} {count}" for site, count in sorted(counts.items())) or '无'
+        return f"{verb} {self.root}: {detail}"
+
+
+_current: Optional[Tape] = None
+
+
+def start_tape(directory: str, mode: str) -> Tape:
+    """开启本进程的录制 / 回放"""
+    global _current
+    _current = Tape(directory, mode)
+    return _current
+
+
+def current_tape() -> Optional[Tape]:
+    """本进程的录制 / 回放，未开启时为 None"""
+    return _current
+
+
+def finish_tape():
+    """关闭本进程的录制 / 回放并打印统计"""
+    global _current
+    tape, _current = _current, None
+    if tape is not None:
+        print(f"  📼 {tape.summary()}")
@@ -1,22 +1,130 @@
 """
 爬虫模块 - 基于 Scrapy 框架（专业爬虫）
+
+各网站爬虫按需懒加载：只有被选中的网站才会导入 Scrapy / Playwright，
+`import scrapers` 本身不会引入任何重量级依赖。
 """
-# Scrapy 爬虫实现
-from .wan_scraper_wrapper import WanVideoScraper
-from .imagine_art_scraper_wrapper import ImagineArtScraper
-from .pixverse_scraper_wrapper import PixverseScraper
+import importlib
+
+# 爬虫类名 → 所在模块（首次访问时才导入）
+_SCRAPER_MODULES = {
+    # Scrapy 爬虫实现
+    'WanVideoScraper': '.wan_scraper_wrapper',
+    'ImagineArtScraper': '.imagine_art_scraper_wrapper',
+    'PixverseScraper': '.pixverse_scraper_wrapper',
+    'HiggsfieldScraper': '.higgsfield_scraper_wrapper',
+    # Playwright 网络监听（特殊情况：无 API 网站）
+    'InvideoScraper': '.invideo_scraper_wrapper',
+}
+
+# 网站注册表：命令行标识 → 爬虫类名、config.WEBSITES 键名、显示名称、构造参数、
+# 是否可按分类拆成多进程分片（--workers）
+SITES = {
+    'wan': {
+        'scraper': 'WanVideoScraper',
+        'config_key': 'wan_video',
+        'display_name': 'Wan Video',
+        'target_arg': 'target_count',
+        'pass_categories': False,
+        'shard_by_category': False,
+    },
+    'higgsfield': {
+        'scraper': 'HiggsfieldScraper',
+        'config_key': 'higgsfield',
+        'display_name': 'Higgsfield',
+        'target_arg': 'target_count_per_category',
+        'pass_categories': True,
+        'shard_by_category': True,
+    },
+    'imagine': {
+        'scraper': 'ImagineArtScraper',
+        'config_key': 'imagine_art',
+        'display_name': 'Imagine.art',
+        'target_arg': 'target_count',
+        'pass_categories': False,
+        'shard_by_category': False,
+    },
+    'invideo': {
+        'scraper': 'InvideoScraper',
+        'config_key': 'invideo',
+        'display_name': 'InVideo',
+        'target_arg': 'target_count',
+        'pass_categories': True,
+        'shard_by_category': False,  # target_count 是所有分类的总数，不能按分类拆分
+    },
+    'pixverse': {
+        'scraper': 'PixverseScraper',
+        'config_key': 'pixverse',
+        'display_name': 'Pixverse',
+        'target_arg': 'target_count',
+        'pass_categories': True,
+        'shard_by_category': True,
+    },
+}
+
+
+def load_scraper(site: str):
+    """
+    按网站标识加载爬虫类（仅导入该网站需要的模块）
+
+    Args:
+        site: 命令行网站标识（如 'pixverse'）
+
+    Returns:
+        爬虫类，未实现则返回 None
+    """
+    name = SITES[site]['scraper']
+    if name in globals():
+        return globals()[name]
+    return __getattr__(name)
+
 
-# Playwright 网络监听（特殊情况：无 API 网站）
-from .invideo_scraper_wrapper import InvideoScraper
+def create_scraper(site: str, data_manager, **extra):
+    """
+    按 config.WEBSITES 中的配置创建网站爬虫实例
+
+    Args:
+        site: 命令行网站标识
+        data_manager: 数据管理器
+        **extra: 额外的构造参数
+
+    Returns:
+        爬虫实例，未实现则返回 None
+    """
+    from config import WEBSITES
+
+    scraper_cls = load_scraper(site)
+    if scraper_cls is None:
+        return None
+
+    entry = SITES[site]
+    site_config = WEBSITES[entry['config_key']]
+    kwargs = {entry['target_arg']: site_config['target_count']}
+    if entry['pass_categories']:
+        kwargs['categories'] = site_config.get('categories')
+    kwargs.update(extra)
+    return scraper_cls(data_manager, **kwargs)
+
+
+def __getattr__(name):
+    """PEP 562 懒加载：`from scrapers import PixverseScraper` 时才导入对应模块"""
+    module_name = _SCRAPER_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module(module_name, __name__)
+    scraper_cls = getattr(module, name)
+    globals()[name] = scraper_cls  # 缓存，后续访问不再走 __getattr__
+    return scraper_cls
 
-# 其他网站暂未实现
-HiggsfieldScraper = None
 
 __all__ = [
     'WanVideoScraper',
     'HiggsfieldScraper',
     'ImagineArtScraper',
     'InvideoScraper',
-    'PixverseScraper'
+    'PixverseScraper',
+    'SITES',
+    'load_scraper',
+    'create_scraper',
 ]
-
@@ -3,34 +3,179 @@
 专业爬虫实现，使用行业标准工具
 """
 from abc import ABC, abstractmethod
+import metrics
+from config import HTTP_CACHE_CONFIG
+from http_cache import http_cache_dir
+from replay import current_tape
 from utils import DataManager
 import logging
 
 
 class BaseScraper(ABC):
     """基础爬虫抽象类"""
-    
+
     def __init__(self, data_manager: DataManager):
         """
         初始化爬虫
-        
+
         Args:
             data_manager: 数据管理器
         """
         self.data_manager = data_manager
         self.logger = logging.getLogger(self.__class__.__name__)
-    
+
     @abstractmethod
     def scrape(self) -> int:
         """
         执行爬取
-        
+
         Returns:
             爬取的数据条数
         """
         pass
-    
+
+    def cancel(self):
+        """请求中止正在进行的爬取（协作式，可从其他线程调用）"""
+        pass
+
     def close(self):
         """关闭资源"""
         pass
 
+
+class ScrapyScraper(BaseScraper):
+    """
+    Scrapy 爬虫封装基类
+
+    子类只需声明 spider_cls / settings 并实现 spider_kwargs()。
+    Scrapy 在方法内导入，保证 `import scrapers.base_scraper` 不引入 Scrapy。
+    """
+
+    # 子类指定的 Spider 类
+    spider_cls = None
+
+    # 额外的 Scrapy 设置（覆盖项目默认设置）
+    settings = {}
+
+    def __init__(self, data_manager: DataManager):
+        super().__init__(data_manager)
+        self.process = None
+        self.runner = None
+        # 队列模式：作品交给 item_sink 入队而不是就地下载（见 distributed.py）
+        self.item_sink = None
+
+    def spider_kwargs(self) -> dict:
+        """传给 Spider 构造函数的参数"""
+        return {'data_manager': self.data_manager}
+
+    def _crawl_kwargs(self) -> dict:
+        kwargs = self.spider_kwargs()
+        if self.item_sink:
+            kwargs['item_sink'] = self.item_sink
+        return kwargs
+
+    def print_banner(self):
+        """启动时打印的说明信息"""
+        pass
+
+    def get_settings(self):
+        """构造本网站的 Scrapy 设置"""
+        from scrapy.utils.project import get_project_settings
+
+        settings = get_project_settings()
+        tape = current_tape()
+        if tape is not None:
+            # 录制 / 回放（见 replay.py）：不经过列表缓存，每个请求都录制或从录制目录返回。
+            # Spider.custom_settings 中的 DOWNLOADER_MIDDLEWARES 会整个替换这里的设置，
+            # 所以合并 Spider 自己的中间件后以更高优先级设置
+            settings.set('DOWNLOADER_MIDDLEWARES', self.downloader_middlewares(), priority='cmdline')
+            if tape.replaying:
+                # 回放不访问网络，去掉礼貌延迟和限速（优先级高于 Spider.custom_settings）
+                for key, value in (('DOWNLOAD_DELAY', 0), ('RANDOMIZE_DOWNLOAD_DELAY', False),
+                                   ('AUTOTHROTTLE_ENABLED', False), ('CONCURRENT_REQUESTS_PER_DOMAIN', 16)):
+                    settings.set(key, value, priority='cmdline')
+        elif HTTP_CACHE_CONFIG['enabled']:
+            # 列表接口响应缓存（见 scrapers/listing_cache.py），放在本次运行的输出目录下
+            settings.set('HTTPCACHE_ENABLED', True)
+            settings.set('HTTPCACHE_DIR', http_cache_dir(self.data_manager.output_dir))
+            settings.set('HTTPCACHE_STORAGE', 'scrapers.listing_cache.ListingCacheStorage')
+            settings.set('HTTPCACHE_POLICY', 'scrapers.listing_cache.ListingCachePolicy')
+        for key, value in self.settings.items():
+            settings.set(key, value)
+        return settings
+
+    def downloader_middlewares(self) -> dict:
+        """录制 / 回放时的下载中间件：Spider 自己的中间件 + ReplayMiddleware"""
+        custom_settings = getattr(self.spider_cls, 'custom_settings', None) or {}
+        middlewares = dict(custom_settings.get('DOWNLOADER_MIDDLEWARES') or {})
+        middlewares['scrapers.replay_middleware.ReplayMiddleware'] = 950
+        return middlewares
+
+    def _instrument(self, crawler):
+        """列表请求耗时和重试次数记入 metrics（见 metrics.py）"""
+        from scrapy import signals
+
+        crawler.signals.connect(self._on_response, signal=signals.response_received)
+        crawler.signals.connect(self._on_spider_closed, signal=signals.spider_closed)
+
+    def _on_response(self, response, request, spider):
+        latency = request.meta.get('download_latency')
+        if latency is not None:  # 缓存 / 回放的响应没有网络耗时
+            metrics.record_stage(spider.category_name, 'listing', latency, response.status < 400)
+
+    def _on_spider_closed(self, spider, reason):
+        retries = spider.crawler.stats.get_value('retry/count', 0)
+        if retries:
+            metrics.RETRIES_TOTAL.inc(retries, site=spider.category_name)
+
+    def scrape(self) -> int:
+        """独立运行（启动并阻塞于 reactor，每个进程只能调用一次）"""
+        from scrapy.crawler import CrawlerProcess
+
+        self.print_banner()
+
+        self.process = CrawlerProcess(self.get_settings())
+        crawler = self.process.create_crawler(self.spider_cls)
+        self._instrument(crawler)
+        self.process.crawl(crawler, **self._crawl_kwargs())
+        self.process.start()
+
+        return crawler.spider.scraped_count if crawler.spider else 0
+
+    def crawl(self):
+        """
+        在已运行的 reactor 中爬取（守护进程模式，可重复调用）
+
+        Returns:
+            Deferred，结果为爬取条数
+        """
+        from scrapy.crawler import CrawlerRunner
+
+        self.print_banner()
+
+        runner = CrawlerRunner(self.get_settings())
+        self.runner = runner
+        crawler = runner.create_crawler(self.spider_cls)
+        self._instrument(crawler)
+        deferred = runner.crawl(crawler, **self._crawl_kwargs())
+        deferred.addCallback(lambda _: crawler.spider.scraped_count if crawler.spider else 0)
+        return deferred
+
+    def cancel(self):
+        """
+        中止爬取：Spider 以 'shutdown' 关闭，积压的作品随之取消（见 ItemWorker.close）
+
+        Returns:
+            Deferred（守护进程模式）或 None
+        """
+        if self.runner:
+            return self.runner.stop()  # 守护进程模式：已在 reactor 线程中
+        if self.process:
+            # 独立运行：可能从其他线程调用（如截止时间计时器）
+            from twisted.internet import reactor
+            reactor.callFromThread(self.process.stop)
+        return None
+
+    def close(self):
+        if self.process:
+            self.process.stop()
@@ -0,0 +1,96 @@
+"""
+按类别配额调度列表页（Pixverse / Higgsfield 共用）
+
+每个类别独立配额、独立下载槽，类别达到配额后：
+- CategoryCancelMiddleware 丢弃它尚未发出的列表请求
+- bytes_received 信号中止它仍在下载的列表页
+列表已耗尽而配额未满的类别，把用不完的配额平均分给仍有作品的类别（_rebalance）。
+
+Spider 混入 CategoryScheduler（写在 scrapy.Spider 之前），在 __init__ 中调用
+_init_categories()，并实现 _plan_category()：各网站翻页方式不同（Pixverse 按 offset
+多页并行，Higgsfield 按游标一页接一页）。
+"""
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, StopDownload
+
+
+class CategoryCancelMiddleware:
+    """下载中间件：丢弃已达到配额的类别中尚未发出的列表请求"""
+
+    def process_request(self, request, spider):
+        category_name = request.meta.get('category_name')
+        if category_name and spider.is_category_done(category_name):
+            raise IgnoreRequest(f"category {category_name} done")
+        return None
+
+
+class CategoryScheduler:
+    """Spider 混入：类别配额、配额再分配、达到配额后取消请求"""
+
+    def _init_categories(self, target_count_per_category: int):
+        """每个类别的计数器、配额和在途页数（短类别用不完的配额会分给仍有作品的类别）"""
+        self.category_counts = {cat: 0 for cat in self.categories.keys()}
+        self.category_quotas = {cat: target_count_per_category for cat in self.categories.keys()}
+        self.total_target = len(self.categories) * target_count_per_category
+        self.pages_in_flight = {cat: 0 for cat in self.categories.keys()}
+        self.exhausted_categories = set()                       # 已无更多作品的类别
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider._on_bytes_received, signal=signals.bytes_received)
+        spider.item_worker.bind_crawler(crawler)
+        return spider
+
+    def is_category_done(self, category_name) -> bool:
+        """类别是否已达到配额"""
+        return self.category_counts[category_name] >= self.category_quotas[category_name]
+
+    def all_categories_done(self) -> bool:
+        """达到总目标，或每个类别都已达到配额 / 耗尽"""
+        return self.scraped_count >= self.total_target or all(
+            self.is_category_done(cat) or cat in self.exhausted_categories for cat in self.categories)
+
+    def _on_bytes_received(self, data, request, spider):
+        """类别达到配额后中止其仍在下载的列表页"""
+        category_name = request.meta.get('category_name')
+        if category_name in self.category_counts and self.is_category_done(category_name):
+            raise StopDownload(fail=True)
+
+    def _plan_category(self, category_name):
+        """按类别剩余配额补发列表页请求；列表耗尽时调用 _rebalance（子类实现）"""
+        raise NotImplementedError
+
+    def _rebalance(self, category_name):
+        """把已耗尽类别未用完的配额平均分给仍有作品的类别，并为它们补发请求"""
+        shortfall = self.category_quotas[category_name] - self.category_counts[category_name]
+        self.category_quotas[category_name] = self.category_counts[category_name]
+        open_categories = [cat for cat in self.categories if cat not in self.exhausted_categories]
+        if shortfall <= 0 or not open_categories:
+            return
+
+        share, extra = divmod(shortfall, len(open_categories))
+        for idx, cat in enumerate(open_categories):
+            self.category_quotas[cat] += share + (1 if idx < extra else 0)
+        self.logger.info(f"   🔀 [{category_name}] 未用完的 {shortfall} 个配额分给 {len(open_categories)} 个类别")
+
+        for cat in open_categories:
+            yield from self._plan_category(cat)
+
+    def errback_httpbin(self, failure):
+        """错误回调"""
+        category_name = failure.request.meta.get('category_name')
+        if category_name in self.pages_in_flight:
+            self.pages_in_flight[category_name] -= 1
+            if failure.check(IgnoreRequest, StopDownload) and self.is_category_done(category_name):
+                return  # 类别已达到配额而取消的请求
+
+        self.logger.error(f"❌ 请求失败: {failure.request.url}")
+        self.logger.error(f"   原因: {failure.value}")
+
+        if category_name in self.pages_in_flight:
+            yield from self._on_page_failed(category_name)
+
+    def _on_page_failed(self, category_name):
+        """失败页已重试过，跳过它继续调度本类别"""
+        yield from self._plan_category(category_name)
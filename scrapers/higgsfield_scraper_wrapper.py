@@ -0,0 +1,39 @@
+"""
+Higgsfield Scraper Wrapper - Scrapy 爬虫封装
+"""
+from .higgsfield_spider import HiggsfieldSpider
+from .base_scraper import ScrapyScraper
+
+
+class HiggsfieldScraper(ScrapyScraper):
+    spider_cls = HiggsfieldSpider
+
+    settings = {
+        'LOG_LEVEL': 'INFO',
+        'USER_AGENT': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36',
+        'DOWNLOAD_DELAY': 1,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 7,  # 7 个分类各占一个下载槽
+        'AUTOTHROTTLE_ENABLED': True,
+        'RETRY_TIMES': 3,
+    }
+
+    def __init__(self, data_manager, target_count_per_category: int = 20, categories: list = None):
+        super().__init__(data_manager)
+        self.target_count = target_count_per_category
+        # 默认类别
+        self.categories = categories or list(HiggsfieldSpider.categories)
+
+    def spider_kwargs(self) -> dict:
+        return {
+            'data_manager': self.data_manager,
+            'target_count': self.target_count,
+            'categories': self.categories,
+        }
+
+    def print_banner(self):
+        print(f"\n🚀 启动 Higgsfield Scrapy 爬虫...")
+        print(f"   目标: {self.target_count} 条/类别")
+        print(f"   类别数: {len(self.categories)}")
+        print(f"   总计: {self.target_count * len(self.categories)} 条")
+        print(f"   框架: Scrapy (专业爬虫框架)")
+        print("=" * 60)
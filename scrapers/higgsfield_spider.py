@@ -0,0 +1,313 @@
+"""
+Higgsfield Spider - 基于 Scrapy 框架
+直接调用社区作品 JSON 接口，7 个分类同时爬取，每个分类独立配额
+
+接口按游标翻页（响应里带下一页的 cursor），同一分类只能一页接一页地请求，
+所以并发来自分类之间：每个分类一个下载槽，互不阻塞。
+
+解析逻辑（parse_feed / extract_work）是不依赖 Spider 的纯函数，可以离线检查
+保存下来的接口响应：
+
+    python -m scrapers.higgsfield_spider response.json [分类名]
+
+tests/test_higgsfield_parser.py 对 tests/fixtures/higgsfield/ 下的每个响应检查解析结果。
+接口地址、feed 参数和响应结构变化时，用 --record 录制一次，再把录制的列表响应导出为 fixture：
+
+    python3 main.py --sites higgsfield --record recordings/higgsfield
+    python -m scrapers.higgsfield_spider --from-tape recordings/higgsfield tests/fixtures/higgsfield
+"""
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import scrapy
+from scrapy.exceptions import CloseSpider
+
+from models import WorkItem
+from utils import CancelToken
+from .category_scheduler import CategoryScheduler
+from .item_worker import ItemWorker
+from .pipeline import ItemPipeline
+
+SITE_NAME = 'Higgsfield'
+
+def parse_feed(data: Dict) -> Tuple[List[Dict], Optional[str]]:
+    """
+    解析一页接口响应：{"items": [...], "cursor": 下一页游标或 null}
+
+    Returns:
+        (作品列表, 下一页游标)，没有更多作品时游标为 None
+    """
+    items = data.get('items') or []
+    cursor = data.get('cursor') if items else None
+    return items, (str(cursor) if cursor else None)
+
+
+def extract_work(item_data: Dict, category_name: str, site: str = SITE_NAME) -> Optional[WorkItem]:
+    """
+    从接口的一个作品中提取 WorkItem
+
+    作品媒体在 results.raw（原始尺寸，{"url", "type"}）/ results.min（缩略图），
+    提示词和参考图（input_images: [{"url"}]）在 params 中
+    """
+    results = item_data.get('results') or {}
+    params = item_data.get('params') or {}
+    raw = results.get('raw') or {}
+    video_url = raw.get('url', '')
+    if not video_url:
+        return None
+    cover_url = (results.get('min') or {}).get('url', '')
+    input_images = params.get('input_images') or []
+    source_image_url = input_images[0].get('url', '') if input_images else ''
+
+    return WorkItem(
+        site, item_data.get('id', ''),
+        type='image2video' if source_image_url else 'text2video',
+        category=category_name,
+        prompt=params.get('prompt', ''),
+        video_url=video_url,
+        source_image_url=source_image_url,
+        cover_url=cover_url if cover_url != video_url else '',
+        media_type='image' if raw.get('type') == 'image' else 'video',
+    )
+
+
+class HiggsfieldSpider(CategoryScheduler, scrapy.Spider):
+    name = 'higgsfield'
+
+    # API 配置
+    api_url = 'https://fnf.higgsfield.ai/publications/community'
+
+    headers = {
+        'accept': 'application/json, text/plain, */*',
+        'accept-language': 'en-US',
+        'origin': 'https://higgsfield.ai',
+        'referer': 'https://higgsfield.ai/',
+        'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36',
+    }
+
+    # 类别映射：分类名称 → 接口的 feed 参数
+    categories = {
+        'Kling 2.5 Turbo': 'kling-2-5-turbo',
+        'Camera Controls': 'camera-controls',
+        'Viral': 'viral',
+        'Commercial': 'commercial',
+        'UGC': 'ugc',
+        'Sora 2 Community': 'sora-2',
+        'Wan 2.5 Community': 'wan-2-5',
+    }
+
+    page_size = 50
+
+    custom_settings = {
+        'DOWNLOADER_MIDDLEWARES': {
+            'scrapers.category_scheduler.CategoryCancelMiddleware': 50,
+        },
+    }
+
+    def __init__(self, target_count=20, data_manager=None, categories=None, item_sink=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.target_count_per_category = int(target_count)
+        self.data_manager = data_manager
+        # 队列模式下作品交给 item_sink 入队，而不是就地下载
+        self.item_sink = item_sink
+        # 取消信号（列表回调与后台下载 / 上传共用）
+        self.cancel_token = CancelToken()
+        self.category_name = SITE_NAME
+        self.scraped_count = 0
+
+        # 如果指定了类别，则只爬取这些类别
+        if categories:
+            self.categories = {k: v for k, v in self.categories.items() if k in categories}
+
+        # 每个类别的计数器、配额和在途页数（见 category_scheduler.py）
+        self._init_categories(self.target_count_per_category)
+
+        # 每个类别的翻页状态
+        self.category_cursors = {cat: '' for cat in self.categories.keys()}  # 下一页游标（'' 为第一页）
+        self.seen_ids = set()                                   # 跨页 / 跨类别去重
+
+        # 确保有 data_manager
+        if not self.data_manager:
+            self.logger.error("❌ data_manager 未提供！")
+            raise ValueError("data_manager is required")
+
+        # 下载 / 上传 / 记录由共用的流水线在后台线程中完成，回调可以立即发出下一页请求
+        self.pipeline = ItemPipeline(self.data_manager, self.category_name, by_category=True,
+                                     cancel_token=self.cancel_token, logger=self.logger)
+        self.item_worker = ItemWorker(self.pipeline.process, cancel_token=self.cancel_token,
+                                      name=self.category_name)
+
+    async def start(self):
+        """Scrapy 2.13+ 的入口（不再调用 start_requests），旧版本仍调用 start_requests"""
+        for request in self.start_requests():
+            yield request
+
+    def start_requests(self):
+        """所有类别的第一页同时发出"""
+        for category_name in self.categories:
+            self.logger.info(f"\n📂 开始爬取类别: {category_name}")
+            yield self._next_request(category_name)
+
+    def _next_request(self, category_name):
+        """发出类别的下一页请求"""
+        cursor = self.category_cursors[category_name]
+        self.category_cursors[category_name] = None  # 等本页响应给出下一页游标
+        self.pages_in_flight[category_name] += 1
+        return self._make_request(category_name, cursor)
+
+    def _plan_category(self, category_name):
+        """类别未达到配额且还有下一页时继续翻页；列表已耗尽而配额未满时，把差额分给其他类别"""
+        if self.is_category_done(category_name) or category_name in self.exhausted_categories:
+            return
+        if self.pages_in_flight[category_name]:
+            return
+        if self.category_cursors[category_name] is not None:
+            self.logger.info(f"   ⏩ [{category_name}] 请求下一页...")
+            yield self._next_request(category_name)
+            return
+
+        self.logger.info(f"   ℹ️  [{category_name}] 已到最后一页")
+        self.exhausted_categories.add(category_name)
+        yield from self._rebalance(category_name)
+
+    def _make_request(self, category_name, cursor):
+        """构造 API 请求（每个类别独立的下载槽，互不阻塞）"""
+        feed = self.categories[category_name]
+        params = {'feed': feed, 'size': self.page_size}
+        if cursor:
+            params['cursor'] = cursor
+
+        return scrapy.Request(
+            url=f"{self.api_url}?{urlencode(params)}",
+            headers=self.headers,
+            callback=self.parse_api,
+            errback=self.errback_httpbin,
+            dont_filter=True,
+            meta={
+                'category_name': category_name,
+                'cursor': cursor,
+                'download_slot': f"{self.name}-{feed}",
+            }
+        )
+
+    def parse_api(self, response):
+        """解析 API 响应"""
+        try:
+            category_name = response.meta['category_name']
+            self.pages_in_flight[category_name] -= 1
+            if self.is_category_done(category_name):
+                return  # 类别在本页下载期间已达到配额
+
+            items, cursor = parse_feed(json.loads(response.text))
+            self.category_cursors[category_name] = cursor
+            self.logger.info(f"✅ [{category_name}] 找到 {len(items)} 个作品")
+
+            # 提取本页作品（只做计数，下载在后台线程中进行）
+            page_items = []
+            for item_data in items:
+                if self.is_category_done(category_name):
+                    break
+
+                item = extract_work(item_data, category_name, self.category_name)
+                if not item:
+                    continue  # 没有作品地址（还在生成中）
+                if item.id:  # 没有 ID 的作品无法去重，直接保留
+                    if item.id in self.seen_ids:
+                        continue  # 其他页 / 类别已提取过
+                    self.seen_ids.add(item.id)
+                if self.data_manager.seen_index.contains(self.category_name, item.id):
+                    continue  # 之前的运行已处理过
+                self.category_counts[category_name] += 1
+                self.scraped_count += 1
+                page_items.append(item)
+                self.logger.info(
+                    f"   ✅ [{category_name}] {self.category_counts[category_name]}/{self.category_quotas[category_name]} "
+                    f"(总计: {self.scraped_count}/{self.total_target})"
+                )
+
+            # 先发出本类别的下一页（或把耗尽类别的配额分出去），本页作品下载时下一页已在路上
+            yield from self._plan_category(category_name)
+            if self.is_category_done(category_name):
+                self.logger.info(f"   🏁 [{category_name}] 已达到配额")
+
+            # 再把本页作品交给后台处理
+            for item in page_items:
+                self._handle_item(item)
+
+            if self.all_categories_done():
+                raise CloseSpider('Target count reached')
+
+        except CloseSpider as e:
+            self.logger.info(f"🏁 爬取完成: {e}")
+            raise
+        except json.JSONDecodeError:
+            self.logger.warning(f"⚠️  API 响应不是 JSON: {response.url}")
+        except Exception as e:
+            self.logger.error(f"❌ 解析 API 失败: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def _handle_item(self, item):
+        """处理提取到的作品（队列模式下只入队，否则提交到后台线程）"""
+        if self.item_sink:
+            self.item_sink(item)
+        else:
+            self.item_worker.submit(item)
+
+    def closed(self, reason):
+        """Spider 关闭时等待后台作品处理完成，被中断时取消（不阻塞 reactor）"""
+        from twisted.internet import threads
+        return threads.deferToThread(self.item_worker.close, reason)
+
+    def _on_page_failed(self, category_name):
+        """失败页已重试过；游标翻页无法跳过失败页，本类别到此为止"""
+        self.category_cursors[category_name] = None
+        yield from self._plan_category(category_name)
+
+
+def export_recorded_feeds(tape_dir: str, fixture_dir: str) -> List[Path]:
+    """
+    把 --record 录制的列表响应导出为解析测试的 fixture：{feed}-{游标或 first}.json
+
+    Returns:
+        写出的文件
+    """
+    from urllib.parse import parse_qs, urlparse
+
+    written = []
+    target = Path(fixture_dir)
+    target.mkdir(parents=True, exist_ok=True)
+    for meta_path in sorted((Path(tape_dir) / 'http' / HiggsfieldSpider.name).rglob('*.json')):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if entry.get('status') != 200 or not entry.get('url', '').startswith(HiggsfieldSpider.api_url):
+            continue
+        query = parse_qs(urlparse(entry['url']).query)
+        name = f"{query.get('feed', ['feed'])[0]}-{query.get('cursor', ['first'])[0]}.json"
+        data = json.loads(meta_path.with_suffix('.body').read_bytes())
+        with open(target / name, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        written.append(target / name)
+    return written
+
+
+if __name__ == '__main__':
+    # 离线检查保存下来的接口响应：python -m scrapers.higgsfield_spider response.json [分类名]
+    if len(sys.argv) < 2:
+        print("用法: python -m scrapers.higgsfield_spider response.json [分类名]")
+        print("      python -m scrapers.higgsfield_spider --from-tape 录制目录 fixture目录")
+        sys.exit(1)
+    if sys.argv[1] == '--from-tape':
+        for path in export_recorded_feeds(sys.argv[2], sys.argv[3]):
+            print(f"✅ {path}")
+        sys.exit(0)
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        feed_items, next_cursor = parse_feed(json.load(f))
+    category = sys.argv[2] if len(sys.argv) > 2 else ''
+    parsed = [extract_work(raw, category) for raw in feed_items]
+    for work in parsed:
+        print(json.dumps(work.to_dict() if work else None, ensure_ascii=False))
+    print(f"# {sum(1 for w in parsed if w)}/{len(feed_items)} 个作品，下一页游标: {next_cursor}")
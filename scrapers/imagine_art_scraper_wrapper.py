@@ -1,41 +1,34 @@
 """
 Imagine.art Scraper Wrapper - Scrapy 爬虫封装
 """
-import os
-from scrapy.crawler import CrawlerProcess
-from scrapy.utils.project import get_project_settings
 from .imagine_art_spider import ImagineArtSpider
-from .base_scraper import BaseScraper
+from .base_scraper import ScrapyScraper
 
 
-class ImagineArtScraper(BaseScraper):
+class ImagineArtScraper(ScrapyScraper):
+    spider_cls = ImagineArtSpider
+
+    settings = {
+        'LOG_LEVEL': 'INFO',
+        'USER_AGENT': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36',
+        # 列表页并行扇出（ImagineArtSpider._plan_pages），由在途页数而不是固定间隔限速
+        'DOWNLOAD_DELAY': 0,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': ImagineArtSpider.max_page_fanout,
+        'AUTOTHROTTLE_ENABLED': True,
+        'AUTOTHROTTLE_START_DELAY': 0.5,
+        'AUTOTHROTTLE_TARGET_CONCURRENCY': ImagineArtSpider.max_page_fanout,
+        'RETRY_TIMES': 3,
+    }
+
     def __init__(self, data_manager, target_count: int = 50):
         super().__init__(data_manager)
         self.target_count = target_count
-        self.process = None
-    
-    def scrape(self) -> int:
+
+    def spider_kwargs(self) -> dict:
+        return {'data_manager': self.data_manager, 'target_count': self.target_count}
+
+    def print_banner(self):
         print(f"\n🚀 启动 Imagine.art Scrapy 爬虫...")
         print(f"   目标: {self.target_count} 条")
         print(f"   框架: Scrapy (专业爬虫框架)")
         print("=" * 60)
-        
-        settings = get_project_settings()
-        settings.set('LOG_LEVEL', 'INFO')
-        settings.set('USER_AGENT', 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36')
-        settings.set('DOWNLOAD_DELAY', 1)
-        settings.set('CONCURRENT_REQUESTS_PER_DOMAIN', 3)
-        settings.set('AUTOTHROTTLE_ENABLED', True)
-        settings.set('RETRY_TIMES', 3)
-        
-        self.process = CrawlerProcess(settings)
-        crawler = self.process.create_crawler(ImagineArtSpider)
-        self.process.crawl(crawler, data_manager=self.data_manager, target_count=self.target_count)
-        self.process.start()
-        
-        return crawler.spider.scraped_count if crawler.spider else 0
-    
-    def close(self):
-        if self.process:
-            self.process.stop()
-
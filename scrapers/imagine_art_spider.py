@@ -5,11 +5,15 @@ Imagine.art Spider - 基于 Scrapy 框架
 import scrapy
 from scrapy.http import Request
 import json
-import os
 from pathlib import Path
 from typing import Dict, Optional
-import requests
-from scrapy.exceptions import CloseSpider
+from utils import CancelToken
+from models import WorkItem
+from .item_worker import ItemWorker
+from .pipeline import ItemPipeline
+from scrapy import signals
+from scrapy.exceptions import CloseSpider, StopDownload
+import math
 
 
 class ImagineArtSpider(scrapy.Spider):
@@ -19,6 +23,10 @@ class ImagineArtSpider(scrapy.Spider):
     api_url = 'https://imagine-blog.vyro.ai/api/video-feeds'
     base_url = 'https://imagine.animagic.art/imagine-dashboard'  # ✅ 正确的素材域名
     
+    # 分页配置：第 1 页返回 pageCount 后，按剩余目标并行请求后续页
+    page_size = 50
+    max_page_fanout = 4  # 同时在途的列表页上限
+    
     headers = {
         'accept': 'application/json, text/plain, */*',
         'accept-language': 'zh-CN,zh;q=0.9',
@@ -28,29 +36,61 @@ class ImagineArtSpider(scrapy.Spider):
         'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36',
     }
     
-    def __init__(self, target_count=50, data_manager=None, *args, **kwargs):
+    def __init__(self, target_count=50, data_manager=None, item_sink=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.target_count = int(target_count)
         self.data_manager = data_manager
+        # 队列模式下作品交给 item_sink 入队，而不是就地下载
+        self.item_sink = item_sink
+        # 取消信号（列表回调与后台下载 / 上传共用）
+        self.cancel_token = CancelToken()
         self.scraped_count = 0
         self.category_name = 'ImagineArt'
         self.current_page = 1
+        self.page_count = None      # 第 1 页响应后得知
+        self.next_page = 2          # 下一个待发出的页码
+        self.pages_in_flight = set()
+        self.seen_ids = set()       # 跨页去重（翻页期间新作品会让条目在相邻页间移动）
         
         # 确保有 data_manager
         if not self.data_manager:
             self.logger.error("❌ data_manager 未提供！")
             raise ValueError("data_manager is required")
+        
+        # 下载 / 上传 / 记录由共用的流水线在后台线程中完成，回调可以立即发出下一页请求
+        self.pipeline = ItemPipeline(self.data_manager, self.category_name,
+                                     cancel_token=self.cancel_token, logger=self.logger)
+        self.item_worker = ItemWorker(self.pipeline.process, cancel_token=self.cancel_token,
+                                      name=self.category_name)
+    
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider._on_bytes_received, signal=signals.bytes_received)
+        spider.item_worker.bind_crawler(crawler)
+        return spider
+    
+    def _on_bytes_received(self, data, request, spider):
+        """达到目标后中止仍在下载的列表页，不再接收多余的字节"""
+        if self.scraped_count >= self.target_count:
+            raise StopDownload(fail=False)
+    
+    async def start(self):
+        """Scrapy 2.13+ 的入口（不再调用 start_requests），旧版本仍调用 start_requests"""
+        for request in self.start_requests():
+            yield request
     
     def start_requests(self):
         """开始请求第一页"""
         yield self._make_request(page=1)
     
     def _make_request(self, page):
-        """构造 API 请求"""
+        """构造 API 请求（并记录为在途页）"""
+        self.pages_in_flight.add(page)
         params = {
             'populate[category][fields][0]': '*',
             'pagination[page]': page,
-            'pagination[pageSize]': 50,
+            'pagination[pageSize]': self.page_size,
         }
         
         url = self.api_url + '?' + '&'.join([f"{k}={v}" for k, v in params.items()])
@@ -64,11 +104,35 @@ class ImagineArtSpider(scrapy.Spider):
             meta={'page': page}
         )
     
+    def _plan_pages(self):
+        """
+        按剩余目标补发列表页请求
+        
+        在途页预计能补足剩余目标、或已达到并行上限 / 最后一页时停止；
+        每一页落地后重新计算，已处理过而跳过的作品会自动多请求几页。
+        """
+        remaining = self.target_count - self.scraped_count
+        if remaining <= 0 or not self.page_count:
+            return
+        
+        pages_needed = math.ceil(remaining / self.page_size)
+        while (len(self.pages_in_flight) < min(pages_needed, self.max_page_fanout)
+               and self.next_page <= self.page_count):
+            self.logger.info(f"   ⏩ 请求第 {self.next_page} 页（在途 {len(self.pages_in_flight) + 1} 页）")
+            yield self._make_request(page=self.next_page)
+            self.next_page += 1
+        
+        if not self.pages_in_flight and self.next_page > self.page_count:
+            self.logger.info(f"   ℹ️  已到最后一页")
+    
     def parse_api(self, response):
         """解析 API 响应"""
         try:
-            data = json.loads(response.text)
             page = response.meta['page']
+            self.pages_in_flight.discard(page)
+            if self.scraped_count >= self.target_count:
+                return  # 达到目标后被中止的页（StopDownload 交回的是不完整响应）
+            data = json.loads(response.text)
             
             self.logger.info(f"✅ API 响应成功: 第 {page} 页")
             
@@ -78,27 +142,37 @@ class ImagineArtSpider(scrapy.Spider):
             self.logger.info(f"   找到 {len(items)} 个作品")
             self.logger.info(f"   分页信息: {page}/{pagination.get('pageCount', '?')}")
             
-            # 处理每个作品
+            if pagination.get('pageCount'):
+                self.page_count = pagination['pageCount']
+            
+            # 提取本页作品（只做计数，下载在后台线程中进行）
+            page_items = []
             for item_data in items:
                 if self.scraped_count >= self.target_count:
-                    raise CloseSpider('Target count reached')
+                    break
                 
                 item = self._extract_work_data(item_data)
+                if item and item.id:  # 没有 ID 的作品无法去重，直接保留
+                    if item.id in self.seen_ids:
+                        continue  # 其他页已提取过
+                    self.seen_ids.add(item.id)
+                if item and self.data_manager.seen_index.contains(self.category_name, item.id):
+                    continue  # 之前的运行已处理过
                 if item:
                     self.scraped_count += 1
-                    self._process_work(item)
+                    page_items.append(item)
                     self.logger.info(f"   ✅ 提取作品 [{self.scraped_count}/{self.target_count}]")
             
-            # 自动翻页
-            if self.scraped_count < self.target_count:
-                next_page = page + 1
-                page_count = pagination.get('pageCount', 0)
-                
-                if next_page <= page_count:
-                    self.logger.info(f"   ⏩ 翻页到第 {next_page} 页...")
-                    yield self._make_request(page=next_page)
-                else:
-                    self.logger.info(f"   ℹ️  已到最后一页")
+            # 先补发后续页（并行），本页作品下载时后续页已在路上
+            yield from self._plan_pages()
+            
+            # 再把本页作品交给后台处理
+            for item in page_items:
+                self._handle_item(item)
+            
+            # 达到目标后关闭 Spider，取消仍在途的列表页
+            if self.scraped_count >= self.target_count:
+                raise CloseSpider('Target count reached')
         
         except CloseSpider as e:
             self.logger.info(f"🏁 爬取完成: {e}")
@@ -131,126 +205,43 @@ class ImagineArtSpider(scrapy.Spider):
             source_image_url = self.base_url + image_path if image_path and work_type == 'image2video' else ''
             cover_url = self.base_url + attrs.get('image', '') if attrs.get('image') else ''
             
-            return {
-                'id': str(item_data.get('id', '')),
-                'prompt': attrs.get('prompt', ''),
-                'video_url': video_url,
-                'source_image_url': source_image_url,
-                'cover_url': cover_url,
-                'type': work_type,
-                'media_type': 'video' if video_path.endswith('.mp4') else 'image',
-            }
+            return WorkItem(
+                self.category_name, item_data.get('id', ''),
+                type=work_type,
+                prompt=attrs.get('prompt', ''),
+                video_url=video_url,
+                source_image_url=source_image_url,
+                cover_url=cover_url,
+                media_type='video' if video_path.endswith('.mp4') else 'image',
+            )
         
         except Exception as e:
             self.logger.error(f"提取作品数据失败: {e}")
             return None
     
-    def _process_work(self, item):
-        """处理作品：下载、上传、写入TXT"""
-        try:
-            work_id = item['id'][:8] if item.get('id') else str(self.scraped_count)
-            work_type = item['type']
-            
-            # 确定保存目录
-            if work_type == 'image2video':
-                save_dir = self.data_manager.image2video_dir / self.category_name
-            else:
-                save_dir = self.data_manager.text2video_dir / self.category_name
-            
-            save_dir.mkdir(exist_ok=True, parents=True)
-            
-            video_s3_url = None
-            cover_s3_url = None
-            source_s3_url = None
-            
-            # 下载原图（如果有）
-            if item.get('source_image_url'):
-                try:
-                    self.logger.info(f"    📥 下载原图...")
-                    local_path = self._download_file(
-                        item['source_image_url'],
-                        save_dir / f"{work_id}_source.jpg"
-                    )
-                    if local_path:
-                        s3_url = self.data_manager.upload_to_s3(
-                            str(local_path), '', os.path.basename(str(local_path)))
-                        if s3_url:
-                            source_s3_url = s3_url
-                            self.logger.info(f"    ✅ 原图上传成功")
-                except Exception as e:
-                    self.logger.warning(f"    ⚠️  原图处理失败: {e}")
-            
-            # 下载视频/图片
-            if item.get('video_url'):
-                try:
-                    ext = '.mp4' if item.get('media_type') == 'video' else '.jpg'
-                    self.logger.info(f"    📥 下载{'视频' if ext == '.mp4' else '图片'}...")
-                    
-                    local_path = self._download_file(
-                        item['video_url'],
-                        save_dir / f"{work_id}_video{ext}"
-                    )
-                    if local_path:
-                        s3_url = self.data_manager.upload_to_s3(
-                            str(local_path), '', os.path.basename(str(local_path)))
-                        if s3_url:
-                            video_s3_url = s3_url
-                            self.logger.info(f"    ✅ {'视频' if ext == '.mp4' else '图片'}上传成功")
-                except Exception as e:
-                    self.logger.warning(f"    ⚠️  视频/图片处理失败: {e}")
-            
-            # 下载封面
-            if item.get('cover_url'):
-                try:
-                    self.logger.info(f"    📥 下载封面...")
-                    local_path = self._download_file(
-                        item['cover_url'],
-                        save_dir / f"{work_id}_cover.jpg"
-                    )
-                    if local_path:
-                        s3_url = self.data_manager.upload_to_s3(
-                            str(local_path), '', os.path.basename(str(local_path)))
-                        if s3_url:
-                            cover_s3_url = s3_url
-                            self.logger.info(f"    ✅ 封面上传成功")
-                except Exception as e:
-                    self.logger.warning(f"    ⚠️  封面处理失败: {e}")
-            
-            # 写入 TXT 文件
-            if video_s3_url:
-                self.data_manager.append_to_txt(
-                    work_url=video_s3_url,
-                    site_name=self.category_name,
-                    source_url=source_s3_url or '',
-                    prompt=item.get('prompt', ''),
-                    cover_url=cover_s3_url or ''
-                )
-                self.logger.info(f"    ✅ 已写入TXT文件")
-            
-        except Exception as e:
-            self.logger.error(f"    ❌ 处理失败: {e}")
-            import traceback
-            traceback.print_exc()
+    def _handle_item(self, item):
+        """处理提取到的作品（队列模式下只入队，否则提交到后台线程）"""
+        if self.item_sink:
+            self.item_sink(item)
+        else:
+            self.item_worker.submit(item)
     
-    def _download_file(self, url, save_path):
-        """下载文件"""
-        try:
-            response = requests.get(url, timeout=60, stream=True)
-            response.raise_for_status()
-            
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            return save_path
-        except Exception as e:
-            self.logger.error(f"      下载失败: {e}")
-            return None
+    def closed(self, reason):
+        """Spider 关闭时等待后台作品处理完成，被中断时取消（不阻塞 reactor）"""
+        from twisted.internet import threads
+        return threads.deferToThread(self.item_worker.close, reason)
     
     def errback_httpbin(self, failure):
         """错误回调"""
+        self.pages_in_flight.discard(failure.request.meta.get('page'))
+        if self.scraped_count >= self.target_count:
+            return  # 达到目标后取消的请求
+        
         self.logger.error(f"❌ 请求失败: {failure.request.url}")
         self.logger.error(f"   原因: {failure.value}")
+        
+        # 失败页已重试过，跳过它并按剩余目标补发其他页
+        yield from self._plan_pages()
 
 
 def run_spider(data_manager, target_count=50):
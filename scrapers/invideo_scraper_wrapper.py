@@ -6,24 +6,31 @@ from .base_scraper import BaseScraper
 
 
 class InvideoScraper(BaseScraper):
-    def __init__(self, data_manager, target_count: int = 50, categories: list = None):
+    spider_cls = InVideoSpider
+    
+    def __init__(self, data_manager, target_count: int = 50, categories: list = None, browser=None):
         super().__init__(data_manager)
         self.target_count = target_count
+        # 外部传入的常驻浏览器（守护进程模式），为 None 时每次自行启动
+        self.browser = browser
         # 默认类别
         self.categories = categories or [
             'Million Dollar Ads',
             'UGC & Avatars'
         ]
         self.spider = None
+        # 队列模式：作品交给 item_sink 入队而不是就地下载
+        self.item_sink = None
     
     def scrape(self) -> int:
         try:
             self.spider = InVideoSpider(
                 target_count=self.target_count,
                 data_manager=self.data_manager,
-                categories=self.categories
+                categories=self.categories,
+                item_sink=self.item_sink
             )
-            count = self.spider.scrape()
+            count = self.spider.scrape(browser=self.browser)
             return count
         except Exception as e:
             print(f"❌ 爬取失败: {e}")
@@ -31,6 +38,10 @@ class InvideoScraper(BaseScraper):
             traceback.print_exc()
             return 0
     
+    def cancel(self):
+        if self.spider:
+            self.spider.cancel('shutdown')
+    
     def close(self):
         if self.spider:
             self.spider.close()
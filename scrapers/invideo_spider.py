@@ -1,11 +1,19 @@
 """
 InVideo Spider - 基于 DOC 请求精准解析
-逻辑：先请求 DOC 获取完整 HTML，从中精准解析视频对象和提示词，然后下载
+逻辑：先请求 DOC 获取完整 HTML，从中精准解析视频对象和提示词，然后交给作品处理流水线下载上传
 """
 from playwright.sync_api import sync_playwright
 import requests
 import os
-from pathlib import Path
+import threading
+import metrics
+from config import HTTP_CACHE_CONFIG
+from http_cache import ListingCache, http_cache_dir
+from models import WorkItem
+from replay import current_tape
+from .item_worker import ItemWorker
+from .pipeline import ItemPipeline
+from utils import CancelToken
 import re
 import time
 import json
@@ -14,11 +22,19 @@ import json
 class InVideoSpider:
     name = 'invideo'
 
-    def __init__(self, target_count=50, data_manager=None, categories=None):
+    user_agent = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+    def __init__(self, target_count=50, data_manager=None, categories=None, item_sink=None):
         self.target_count = int(target_count)
         self.data_manager = data_manager
+        # 队列模式下作品交给 item_sink 入队，而不是就地下载
+        self.item_sink = item_sink
         self.category_name = 'InVideo'
-        self.scraped_count = 0
+        self.scraped_count = 0    # 提交的作品数（控制目标数量；队列模式下即入队数）
+        self.recorded_count = 0   # 下载上传完成、写入结果的作品数
+        self._count_lock = threading.Lock()
+        # 取消信号：分类、视频、下载分块、上传分片之间检查（见 cancel()）
+        self.cancel_token = CancelToken()
 
         # 支持的类别
         self.categories = categories or [
@@ -42,6 +58,47 @@ class InVideoSpider:
         # 存储解析结果（从 Flight 提取）
         self.results = []
 
+        # 下载 / 上传 / 记录由共用的流水线在后台线程中完成，浏览器线程只负责解析列表
+        # （提示词保存完整内容，结果表名保持 InVideo）
+        self.pipeline = ItemPipeline(self.data_manager, self.category_name,
+                                     video_ext='.webm', s3_category=self.category_name,
+                                     table_name=self.category_name, full_prompt=True,
+                                     cancel_token=self.cancel_token)
+        self.item_worker = ItemWorker(self._process_item, cancel_token=self.cancel_token,
+                                      name=self.category_name)
+
+        # /ideas 文档的响应缓存（与 Scrapy 爬虫共用 http_cache.py，放在本次运行的输出目录下）
+        self.listing_cache = (ListingCache(self.name, cache_dir=http_cache_dir(self.data_manager.output_dir))
+                              if HTTP_CACHE_CONFIG['enabled'] else None)
+
+    def _fetch_doc(self, page, doc_url):
+        """请求 DOC HTML（启用列表缓存时 TTL 内直接复用，过期后条件请求；--record / --replay 见 replay.py）"""
+        tape = current_tape()
+        if tape is not None:
+            cache = tape.cache(self.name)
+            if tape.replaying:
+                entry = cache.load('GET', doc_url)
+                cache.count('hits' if entry else 'misses')
+                if entry is None:
+                    return 404, ''
+                return entry['status'], entry['content'].decode('utf-8', errors='replace')
+            response = page.request.get(doc_url)
+            content = response.body()
+            cache.save('GET', doc_url, b'', response.status, response.headers, content)
+            cache.count('misses')
+            return response.status, content.decode('utf-8', errors='replace')
+
+        if self.listing_cache is None:
+            response = page.request.get(doc_url)
+            return response.status, response.text()
+
+        def send(extra_headers):
+            response = page.request.get(doc_url, headers=extra_headers)
+            return response.status, response.headers, response.body()
+
+        status, content = self.listing_cache.fetch('GET', doc_url, send)
+        return status, content.decode('utf-8', errors='replace')
+
     def _parse_doc_html(self, html_content):
         """
         从 DOC HTML 中解析 __next_f.push 数据
@@ -184,176 +241,167 @@ class InVideoSpider:
         for cat, count in category_stats.items():
             print(f"   - {cat}: {count} 个")
 
-    def scrape(self):
-        """执行爬取"""
-        print(f"\n🚀 启动 InVideo Playwright 爬虫...")
-        print(f"   目标: {self.target_count} 条")
-        print(f"   分类: {', '.join(self.categories)}")
-        print(f"   方法: DOC 请求 + 精准解析")
-        print("=" * 60)
+    @staticmethod
+    def launch_browser(playwright):
+        """启动 Chromium 浏览器"""
+        return playwright.chromium.launch(
+            headless=False,
+            slow_mo=50,
+            args=['--disable-blink-features=AutomationControlled']
+        )
+
+    def _crawl_categories(self, browser):
+        """在给定浏览器中遍历所有分类，提取到的视频交给流水线（或 item_sink）；回放时 browser 为 None"""
+        context = page = None
+        if browser is not None:
+            context = browser.new_context(
+                user_agent=self.user_agent,
+                viewport={'width': 1280, 'height': 800},
+                locale='en-US',
+                timezone_id='America/Los_Angeles'
+            )
+
+            page = context.new_page()
+            page.set_default_timeout(60000)
+
+        # 遍历每个分类
+        for category in self.categories:
+            if self.scraped_count >= self.target_count:
+                print(f"   ℹ️  已达到目标数量 {self.target_count}，停止爬取")
+                break
+            if self.cancel_token.cancelled:
+                print(f"   ⏹️  已取消，停止爬取")
+                break
+
+            section_url = self.category_url_map.get(category, '')
+            if not section_url:
+                print(f"   ⚠️  未找到分类 '{category}' 的 URL 映射，跳过")
+                continue
 
-        try:
-            # 确定保存目录
-            save_dir = self.data_manager.text2video_dir / self.category_name
-            save_dir.mkdir(exist_ok=True, parents=True)
-
-            all_results = []  # 存储所有分类的结果
-
-            with sync_playwright() as p:
-                # 启动浏览器
-                browser = p.chromium.launch(
-                    headless=False,
-                    slow_mo=50,
-                    args=['--disable-blink-features=AutomationControlled']
-                )
-
-                context = browser.new_context(
-                    user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    viewport={'width': 1280, 'height': 800},
-                    locale='en-US',
-                    timezone_id='America/Los_Angeles'
-                )
-
-                page = context.new_page()
-                page.set_default_timeout(60000)
-
-                # 遍历每个分类
-                for category in self.categories:
-                    if self.scraped_count >= self.target_count:
-                        print(f"   ℹ️  已达到目标数量 {self.target_count}，停止爬取")
-                        break
-
-                    section_url = self.category_url_map.get(category, '')
-                    if not section_url:
-                        print(f"   ⚠️  未找到分类 '{category}' 的 URL 映射，跳过")
-                        continue
+            doc_url = f'https://invideo.io/ideas/?section={section_url}'
+            print(f"\n🌐 爬取分类: {category}")
+            print(f"   URL: {doc_url}")
 
-                    doc_url = f'https://invideo.io/ideas/?section={section_url}'
-                    print(f"\n🌐 爬取分类: {category}")
-                    print(f"   URL: {doc_url}")
+            # 清空结果
+            self.results = []
 
-                    # 清空结果
-                    self.results = []
+            # 【核心】只需要请求 DOC HTML，videos 已经在 RSC 流里
+            print(f"   📄 请求 DOC HTML（包含 RSC 数据流）...")
+            try:
+                fetch_started = time.time()
+                status, html_content = self._fetch_doc(page, doc_url)
+                metrics.record_stage(self.category_name, 'listing', time.time() - fetch_started, status == 200)
+                if status != 200:
+                    print(f"   ❌ 请求失败: HTTP {status}")
+                    continue
 
-                    # 【核心】只需要请求 DOC HTML，videos 已经在 RSC 流里
-                    print(f"   📄 请求 DOC HTML（包含 RSC 数据流）...")
-                    try:
-                        response = page.request.get(doc_url)
-                        if response.status != 200:
-                            print(f"   ❌ 请求失败: HTTP {response.status}")
-                            continue
-
-                        html_content = response.text()
-                        print(f"   ✅ 请求成功 ({len(html_content)} 字节)")
-
-                        # 解析 RSC 数据流：slot + videos
-                        print(f"   📝 解析 RSC 数据流...")
-                        self._parse_doc_html(html_content)
-                    except Exception as e:
-                        print(f"   ❌ 请求失败: {e}")
-                        continue
+                print(f"   ✅ 请求成功 ({len(html_content)} 字节)")
+                if context is not None:
+                    self._use_browser_session(context, doc_url)
 
-                    # 检查是否解析到数据
-                    if not self.results:
-                        print(f"   ⚠️  未解析到视频数据，跳过此分类")
-                        continue
+                # 解析 RSC 数据流：slot + videos
+                print(f"   📝 解析 RSC 数据流...")
+                self._parse_doc_html(html_content)
+            except Exception as e:
+                print(f"   ❌ 请求失败: {e}")
+                continue
 
-                    # 下载视频
-                    print(f"   📥 开始下载视频...")
-                    for video in self.results:
-                        if self.scraped_count >= self.target_count:
-                            break
-
-                        uuid = video['uuid']
-                        preview_url = video['preview_url']
-                        prompt = video.get('prompt', '')
-
-                        work_id = uuid[:16]
-
-                        print(f"\n   📹 [{self.scraped_count + 1}] 下载: {work_id}")
-                        print(f"      【步骤3-从results读取】提示词长度: {len(prompt)} 字符")
-                        print(f"      【步骤3-从results读取】完整内容:")
-                        print(f"      {prompt}")
-
-                        # 下载视频
-                        try:
-                            response = page.request.get(preview_url)
-                            if response.status == 200:
-                                content = response.body()
-
-                                save_path = save_dir / f"{work_id}_video.webm"
-                                with open(save_path, 'wb') as f:
-                                    f.write(content)
-
-                                file_size = len(content) / 1024 / 1024
-                                print(f"      ✅ 下载成功: {save_path.name} ({file_size:.2f} MB)")
-
-                                # 记录结果
-                                print(f"      【步骤4-保存到all_results前】提示词长度: {len(prompt)} 字符")
-                                all_results.append({
-                                    'id': work_id,
-                                    'local_path': save_path,
-                                    'video_url': preview_url,
-                                    'prompt': prompt,
-                                    'type': 'text2video',
-                                    'cover_url': '',
-                                    'source_image_url': ''
-                                })
-                                print(f"      【步骤4-保存到all_results后】验证: {len(all_results[-1]['prompt'])} 字符")
-
-                                self.scraped_count += 1
-                            else:
-                                print(f"      ❌ 下载失败: HTTP {response.status}")
-
-                        except Exception as e:
-                            print(f"      ❌ 下载失败: {e}")
-
-                    print(f"   ✅ 分类 '{category}' 完成，共 {self.scraped_count} 个视频")
-
-                browser.close()
-
-            # 第4步：上传到 S3 并保存到 Excel
-            print(f"\n☁️  开始上传到 S3...")
-            for idx, result in enumerate(all_results, 1):
-                print(f"\n[{idx}/{len(all_results)}] 处理视频 {result['id']}")
-                print(f"   【步骤5-从all_results读取】提示词长度: {len(result['prompt'])} 字符")
-
-                # 上传到 S3
-                filename = Path(result['local_path']).name
-                s3_url = self.data_manager.upload_to_s3(
-                    result['local_path'],
-                    category=self.category_name,  # InVideo
-                    filename=filename
-                )
-
-                if s3_url:
-                    # 保存到 Excel（格式：["作品URL", "原图URL", "提示词", "缩略图URL"]）
-                    prompt_to_save = result['prompt']
-                    print(f"   【步骤6-写入Excel前】提示词长度: {len(prompt_to_save)} 字符")
-                    print(f"   【步骤6-写入Excel前】完整内容:")
-                    print(f"   {prompt_to_save}")
-                    print(f"   {'='*80}")
-                    
-                    self.data_manager.excel_data.setdefault(self.category_name, []).append([
-                        s3_url,           # 作品URL
-                        '',               # 原图URL（视频没有）
-                        prompt_to_save,   # 提示词（完整）
-                        ''                # 缩略图URL（暂无）
-                    ])
-                    
-                    # 立即验证写入的数据
-                    saved_row = self.data_manager.excel_data[self.category_name][-1]
-                    print(f"   【步骤6-写入Excel后】验证提示词长度: {len(saved_row[2])} 字符")
-                    print(f"   ✅ 已写入数据到内存")
+            # 检查是否解析到数据
+            if not self.results:
+                print(f"   ⚠️  未解析到视频数据，跳过此分类")
+                continue
 
-            print(f"\n🏁 爬取完成！共 {len(all_results)} 条")
-            return len(all_results)
+            # 提交视频
+            print(f"   📥 开始下载视频...")
+            for video in self.results:
+                if self.scraped_count >= self.target_count or self.cancel_token.cancelled:
+                    break
+
+                work_id = video['uuid'][:16]
+                if self.data_manager.seen_index.contains(self.category_name, work_id):
+                    continue  # 之前的运行已处理过
+
+                self.scraped_count += 1
+                print(f"   📹 [{self.scraped_count}] {work_id}（提示词 {len(video['prompt'])} 字符）")
+                self._handle_item(WorkItem(self.category_name, work_id, category=category,
+                                           prompt=video['prompt'], video_url=video['preview_url']))
+
+            print(f"   ✅ 分类 '{category}' 完成，已提交 {self.scraped_count} 个视频")
+
+        if context is not None:
+            context.close()
+
+    def _use_browser_session(self, context, referer: str):
+        """媒体下载沿用浏览器会话：CDN 收到与浏览器下载时相同的 Cookie、User-Agent 和 Referer"""
+        cookies = requests.cookies.RequestsCookieJar()
+        for cookie in context.cookies():
+            cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie.get('path', '/'))
+        self.pipeline.headers = {'User-Agent': self.user_agent, 'Referer': referer}
+        self.pipeline.cookies = cookies
+
+    def _process_item(self, item):
+        """（后台线程）处理作品，写入结果的才计入 recorded_count"""
+        result = self.pipeline.process(item)
+        if result:
+            with self._count_lock:
+                self.recorded_count += 1
+        return result
+
+    def _handle_item(self, item):
+        """处理提取到的作品（队列 / 元数据模式下交给 item_sink，否则提交到后台线程）"""
+        if self.item_sink:
+            self.item_sink(item)
+        else:
+            self.item_worker.submit(item)
+
+    def scrape(self, browser=None):
+        """
+        执行爬取
+        
+        Args:
+            browser: 已启动的 Playwright 浏览器（可选，不传则自行启动并关闭）
+        """
+        print(f"\n🚀 启动 InVideo Playwright 爬虫...")
+        print(f"   目标: {self.target_count} 条")
+        print(f"   分类: {', '.join(self.categories)}")
+        print(f"   方法: DOC 请求 + 精准解析")
+        print("=" * 60)
 
+        tape = current_tape()
+        try:
+            if tape is not None and tape.replaying:
+                # 回放：DOC HTML 从录制目录读取，不启动浏览器
+                self._crawl_categories(None)
+            elif browser is None:
+                with sync_playwright() as p:
+                    # 启动浏览器
+                    browser = self.launch_browser(p)
+                    try:
+                        self._crawl_categories(browser)
+                    finally:
+                        browser.close()
+            else:
+                # 复用外部传入的浏览器（守护进程模式下常驻）
+                self._crawl_categories(browser)
         except Exception as e:
             print(f"❌ 爬取失败: {e}")
             import traceback
             traceback.print_exc()
-            return 0
+        finally:
+            # 等待后台下载 / 上传完成（被取消时正在处理的作品在下一个分块处停止）
+            self.item_worker.close('cancelled' if self.cancel_token.cancelled else 'finished')
+
+        if self.listing_cache is not None:
+            print(f"🗄️  {self.listing_cache.summary()}")
+        if self.item_sink:
+            print(f"\n🏁 爬取完成！共入队 {self.scraped_count} 条")
+            return self.scraped_count
+        print(f"\n🏁 爬取完成！共 {self.recorded_count} 条（提交 {self.scraped_count} 条）")
+        return self.recorded_count
+
+    def cancel(self, reason: str = 'cancelled'):
+        """请求中止爬取（可从其他线程调用），在下一个检查点停止"""
+        self.cancel_token.cancel(reason)
 
     def close(self):
         """关闭爬虫（清理资源）"""
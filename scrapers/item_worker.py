@@ -0,0 +1,120 @@
+"""
+作品后台处理 - 把下载/上传/写入从 Scrapy reactor 线程中移出
+
+Spider 回调里直接调用阻塞的作品处理流水线会卡住 reactor：下一页请求要等整页作品
+下载完才会发出。配合 "先 yield 下一页请求，再提交本页作品" 的顺序，列表页最多领先
+一页；作品积压达到 max_backlog 时施加背压，内存有界：
+- Scrapy 爬虫（bind_crawler）：submit 不阻塞 reactor，而是暂停引擎（不再调度新的列表页请求），
+  积压降到一半以下时恢复
+- 其他调用方（InVideo 在自己的线程中）：submit 阻塞直到有空位
+
+Spider 正常结束（列表遍历完 / 达到目标）时等待积压处理完；被中断（Ctrl-C、守护进程停止）
+时发出取消信号：未开始的作品直接跳过，正在下载 / 上传的作品在下一个分块处停止并清理。
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DOWNLOAD_CONFIG
+from metrics import QUEUE_DEPTH
+from profiling import checkpoint
+from utils import CancelToken
+
+
+class ItemWorker:
+    """有界线程池：后台执行 process_fn(item)"""
+
+    # 这些关闭原因表示正常结束，其余（'shutdown'、'cancelled' 等）都会取消积压的作品
+    normal_close_reasons = ('finished', 'Target count reached')
+
+    def __init__(self, process_fn, max_workers: int = None, max_backlog: int = None,
+                 cancel_token: CancelToken = None, name: str = ''):
+        """
+        Args:
+            process_fn: 处理单个作品的函数（线程中调用）
+            max_workers: 并行处理数
+            max_backlog: 最多积压的作品数（含正在处理的）
+            cancel_token: 取消信号（与 process_fn 内的下载 / 上传共用）
+            name: 积压深度指标中的名称（webscript_queue_depth{queue="items:名称"}）
+        """
+        self._process_fn = process_fn
+        self.cancel_token = cancel_token or CancelToken()
+        self._max_workers = max_workers or DOWNLOAD_CONFIG['item_workers']
+        self._max_backlog = max_backlog or DOWNLOAD_CONFIG['max_backlog']
+        self._slots = threading.BoundedSemaphore(self._max_backlog)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._name = name or 'items'
+        self._queue_label = f"items:{name}" if name else 'items'
+        self._pending = 0
+        self._crawler = None  # bind_crawler 后积压已满时暂停其引擎
+        self._paused = False
+
+    def bind_crawler(self, crawler):
+        """在 Scrapy reactor 中使用：积压已满时暂停引擎，而不是阻塞 submit（Spider.from_crawler 中调用）"""
+        self._crawler = crawler
+
+    def submit(self, item):
+        """提交作品；积压已满时暂停引擎（bind_crawler 后），否则阻塞直到有空位"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='item')
+        if self._crawler is None:
+            self._slots.acquire()
+        self._track(1)
+        self._executor.submit(self._run, item)
+
+    def _track(self, delta: int):
+        """更新积压深度指标；绑定引擎时按积压暂停 / 恢复引擎"""
+        with self._lock:
+            self._pending += delta
+            QUEUE_DEPTH.set(self._pending, queue=self._queue_label)
+            if self._crawler is None:
+                return
+            if delta > 0 and not self._paused and self._pending >= self._max_backlog:
+                self._paused = True
+            elif delta < 0 and self._paused and self._pending <= self._max_backlog // 2:
+                self._paused = False
+            else:
+                return
+        if delta > 0:
+            self._apply_pause()  # submit 在 reactor 线程中调用
+        else:
+            from twisted.internet import reactor
+            reactor.callFromThread(self._apply_pause)
+
+    def _apply_pause(self):
+        """（reactor 线程）按当前状态暂停或恢复引擎；排队中的恢复执行时若又已暂停则保持暂停"""
+        engine = self._crawler.engine
+        if engine is None:
+            return
+        with self._lock:
+            paused = self._paused
+        if paused:
+            engine.pause()
+        else:
+            engine.unpause()
+
+    def _run(self, item):
+        try:
+            if self.cancel_token.cancelled:
+                return None  # 已取消，未开始的作品直接跳过
+            return self._process_fn(item)
+        finally:
+            self._track(-1)
+            if self._crawler is None:
+                self._slots.release()
+
+    def join(self):
+        """等待所有已提交的作品处理完成"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def close(self, reason: str = 'finished'):
+        """Spider 关闭时调用：正常结束则等待处理完，否则先取消再等待正在处理的作品收尾"""
+        if reason not in self.normal_close_reasons:
+            self.cancel_token.cancel(reason)
+        checkpoint(f"{self._name} listing")
+        self.join()
+        checkpoint(f"{self._name} downloads")
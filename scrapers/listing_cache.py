@@ -0,0 +1,81 @@
+"""
+Scrapy HttpCache 策略 / 存储：列表接口响应走 http_cache.ListingCache
+
+Scrapy 自带的 HttpCacheMiddleware 负责调用，这里只决定：
+- 存储：按 方法 + URL + 请求体 存到 {缓存目录}/{爬虫名称}/，与 InVideo 共用同一格式
+- 策略：TTL（按爬虫名称）内直接复用；过期后带 ETag / If-Modified-Since 重新请求，
+  304 时复用缓存并刷新时间。接口普遍返回 no-cache / no-store，所以不看 Cache-Control
+
+ScrapyScraper.get_settings 在 HTTP_CACHE_CONFIG['enabled'] 时启用（默认关闭，环境变量 HTTP_CACHE=1 开启），
+缓存目录为本次运行的 {输出目录}/httpcache（HTTPCACHE_DIR）。
+"""
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+
+from http_cache import ListingCache
+
+
+class ListingCacheStorage:
+    """HTTPCACHE_STORAGE"""
+
+    def __init__(self, settings):
+        self.cache_dir = settings.get('HTTPCACHE_DIR')
+        self.cache = None
+
+    def open_spider(self, spider):
+        self.cache = ListingCache(spider.name, cache_dir=self.cache_dir)
+        spider.logger.info(f"🗄️  列表缓存: {self.cache.root}（TTL {self.cache.ttl} 秒）")
+
+    def close_spider(self, spider):
+        spider.logger.info(f"🗄️  {self.cache.summary()}")
+
+    def retrieve_response(self, spider, request):
+        entry = self.cache.load(request.method, request.url, request.body)
+        if entry is None:
+            self.cache.count('misses')
+            return None
+        # 交给 ListingCachePolicy 判断新鲜度 / 304 后刷新时间
+        request.meta['listing_cache'] = self.cache
+        request.meta['listing_cache_entry'] = entry
+        headers = Headers(entry['headers'])
+        respcls = responsetypes.from_args(headers=headers, url=entry['url'], body=entry['content'])
+        return respcls(url=entry['url'], headers=headers, status=entry['status'], body=entry['content'])
+
+    def store_response(self, spider, request, response):
+        self.cache.save(request.method, request.url, request.body, response.status,
+                        dict(response.headers.to_unicode_dict()), response.body)
+
+
+class ListingCachePolicy:
+    """HTTPCACHE_POLICY"""
+
+    def __init__(self, settings):
+        pass
+
+    def should_cache_request(self, request):
+        return not request.meta.get('dont_cache', False)
+
+    def should_cache_response(self, response, request):
+        return response.status == 200
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        cache = request.meta.get('listing_cache')
+        entry = request.meta.get('listing_cache_entry')
+        if cache is None or entry is None:
+            return False
+        if cache.is_fresh(entry):
+            cache.count('hits')
+            return True
+        for name, value in cache.conditional_headers(entry).items():
+            request.headers[name] = value
+        return False
+
+    def is_cached_response_valid(self, cachedresponse, response, request):
+        cache = request.meta.get('listing_cache')
+        if response.status != 304 or cache is None:
+            if cache is not None:
+                cache.count('misses')
+            return False
+        cache.count('revalidated')
+        cache.touch(request.method, request.url, request.body)
+        return True
@@ -0,0 +1,282 @@
+"""
+作品处理流水线 - 所有网站共用：过滤 → 探测 → 下载 → 校验 → 上传 → 记录
+
+各爬虫只负责从列表接口提取 WorkItem，交给 ItemWorker（或队列 / 元数据清单）；
+ItemWorker 的线程调用 ItemPipeline.process 完成其余步骤。下载和上传各有独立的并发上限
+（PIPELINE_CONFIG，同一进程内所有网站共享），例如上传带宽紧张时可以只收紧上传。
+
+- 过滤：已取消、没有作品 URL、之前的运行已处理过的作品直接跳过
+- 探测：确定要下载的媒体（作品、原图、封面）和本地路径；作品失败时不再下载其余媒体
+- 校验：空文件、HTML 错误页（CDN 返回 200 但内容是错误页面）当作下载失败
+- 上传：通过校验的文件加入打包（开启时）并上传到 S3
+- 记录：写入结果行清单 / 素材库，并加入已处理索引
+"""
+import hashlib
+import os
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import metrics
+import tracing
+from archive import current_archive
+from config import PIPELINE_CONFIG
+from models import AssetRecord, WorkItem
+from utils import (Cancelled, CancelToken, begin_item_stats, clean_prompt, current_item_stats,
+                   download_to_file, site_table_name)
+
+# (媒体, WorkItem 字段, 显示名称)；作品排第一，失败时不再下载原图和封面
+ASSETS = (
+    ('video', 'video_url', '视频'),
+    ('source', 'source_image_url', '原图'),
+    ('cover', 'cover_url', '封面'),
+)
+
+# 这些开头的内容不是视频 / 图片
+_INVALID_PREFIXES = (b'<', b'{')
+
+# 文件名沿用 URL 中的扩展名（不在其中时按媒体类型取默认扩展名）
+_VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mov', '.m4v')
+_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif')
+
+# 文件名中可以直接使用的作品 ID 字符，其余 ID 取哈希
+_SAFE_ID_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_')
+
+
+def file_stem(item: WorkItem) -> str:
+    """
+    作品的本地文件名前缀：完整 ID（含不宜放进文件名的字符时取 ID 的哈希），没有 ID 时取作品 URL 的哈希
+
+    作品在多个线程中并行处理，截断的 ID（连续编号的 ID 前缀常常相同）会让不同作品写到同一个文件
+    """
+    if item.id and len(item.id) <= 64 and set(item.id) <= _SAFE_ID_CHARS:
+        return item.id
+    return hashlib.md5((item.id or item.video_url).encode('utf-8')).hexdigest()
+
+
+def file_extension(url: str, video: bool, video_ext: str = '.mp4') -> str:
+    """URL 中的扩展名（小写，.jpeg 记为 .jpg）；无法识别时视频用 video_ext，图片用 .jpg"""
+    ext = os.path.splitext(urlparse(url).path)[1].lower()
+    if ext in (_VIDEO_EXTENSIONS if video else _IMAGE_EXTENSIONS):
+        return '.jpg' if ext == '.jpeg' else ext
+    return video_ext if video else '.jpg'
+
+
+class ItemPipeline:
+    """一个网站的作品处理流水线（线程安全，由 ItemWorker 的多个线程同时调用）"""
+
+    _stage_slots: Dict[str, threading.BoundedSemaphore] = {}
+    _slots_lock = threading.Lock()
+
+    def __init__(self, data_manager, site_name: str, subdir: str = None, by_category: bool = False,
+                 cancel_token: CancelToken = None, logger=None, video_ext: str = '.mp4', s3_category: str = '', table_name: str = None,
+                 full_prompt: bool = False):
+        """
+        Args:
+            data_manager: 数据管理器
+            site_name: 爬虫标识（Spider.category_name，已处理索引的键）
+            subdir: 下载目录 {text2video|image2video}/{subdir}（默认 site_name）
+            by_category: 下载目录再按作品分类分一层
+            cancel_token: 取消信号
+            logger: Spider.logger（不传时 print）
+            video_ext: 作品为视频且 URL 中没有可识别的扩展名时使用的扩展名
+            s3_category: S3 键名中的分类目录
+            table_name: 结果表名（默认由 site_name 转换）
+            full_prompt: 保存完整提示词（默认清理换行并限制 500 字符）
+        """
+        self.data_manager = data_manager
+        self.site_name = site_name
+        self.subdir = subdir or site_name
+        self.by_category = by_category
+        self.cancel_token = cancel_token or CancelToken()
+        self.logger = logger
+        self.video_ext = video_ext
+        self.s3_category = s3_category
+        self.table_name = table_name or site_table_name(site_name)
+        self.full_prompt = full_prompt
+        # 下载媒体时附带的请求头 / Cookie（InVideo 沿用浏览器会话，见 InVideoSpider._use_browser_session）
+        self.headers = None
+        self.cookies = None
+
+    @classmethod
+    def _slots(cls, stage: str) -> threading.BoundedSemaphore:
+        """阶段的并发上限（进程内共享）"""
+        with cls._slots_lock:
+            if stage not in cls._stage_slots:
+                cls._stage_slots[stage] = threading.BoundedSemaphore(PIPELINE_CONFIG[stage])
+            return cls._stage_slots[stage]
+
+    def _info(self, message: str):
+        if self.logger is not None:
+            self.logger.info(message)
+        else:
+            print(message)
+
+    def _warn(self, message: str):
+        if self.logger is not None:
+            self.logger.warning(message)
+        else:
+            print(message)
+
+    def process(self, item: WorkItem) -> Optional[str]:
+        """
+        处理一个作品
+
+        Returns:
+            作品的 S3 URL，失败 / 跳过返回 None
+        """
+        begin_item_stats()  # 统计本作品的下载/上传字节数和耗时
+        video_url, reason = None, ''
+        try:
+            if not self.filter(item):
+                return None
+            tracing.begin_item(self.site_name, item)  # --trace 时记录各阶段 span（见 tracing.py）
+            plan = self._run_stage('probe', self.probe, item)
+            files = self._run_stage('download', self.download, plan)
+            files = self._run_stage('validate', self.validate, files)
+            urls = self._run_stage('upload', self.upload, files)
+            if not urls.get('video'):
+                return None
+            self._run_stage('record', self.record, item, urls)
+            video_url = urls['video']
+            return video_url
+        except Cancelled:
+            reason = 'cancelled'
+            self._info(f"    ⏹️  已取消: {item.id}")
+            return None
+        except Exception as e:
+            reason = f"{type(e).__name__}: {e}"
+            self._warn(f"    ❌ 处理失败: {e}")
+            traceback.print_exc()
+            return None
+        finally:
+            tracing.end_item(video_url is not None, reason)
+
+    def _run_stage(self, stage: str, fn, *args):
+        """执行一个阶段并记录耗时（结果为空视为失败，见 metrics.py）"""
+        started = time.time()
+        ok = False
+        try:
+            with tracing.span(stage) as span:
+                result = fn(*args)
+                ok = bool(result)
+                span.set(ok=ok)
+            return result
+        finally:
+            metrics.record_stage(self.site_name, stage, time.time() - started, ok)
+
+    # ========== 阶段 ==========
+
+    def filter(self, item: WorkItem) -> bool:
+        """是否需要处理"""
+        if self.cancel_token.cancelled or not item.video_url:
+            return False
+        if item.id and self.data_manager.seen_index.contains(self.site_name, item.id):
+            return False  # 之前的运行（或另一个 worker）已处理过
+        return True
+
+    def probe(self, item: WorkItem) -> List[Tuple[str, str, Path, str]]:
+        """确定要下载的媒体：[(媒体, URL, 本地路径, 显示名称)]"""
+        stem = file_stem(item)
+
+        base_dir = self.data_manager.image2video_dir if item.type == 'image2video' else self.data_manager.text2video_dir
+        save_dir = base_dir / self.subdir
+        if self.by_category and item.category:
+            save_dir = save_dir / item.category
+        save_dir.mkdir(exist_ok=True, parents=True)
+
+        plan = []
+        for role, field, label in ASSETS:
+            url = getattr(item, field)
+            if not url:
+                continue
+            ext = file_extension(url, role == 'video' and item.media_type == 'video', self.video_ext)
+            plan.append((role, url, save_dir / f"{stem}_{role}{ext}", label))
+        return plan
+
+    def download(self, plan: List[Tuple[str, str, Path, str]]) -> List[Tuple[str, Path, str]]:
+        """下载媒体；作品下载失败时放弃整个作品"""
+        files = []
+        slots = self._slots('download')
+        for role, url, path, label in plan:
+            self._info(f"    📥 下载{label}...")
+            try:
+                with tracing.span('download.asset', role=role, **{'http.host': urlparse(url).netloc}) as span:
+                    with slots:
+                        written = download_to_file(url, path, cancel_token=self.cancel_token,
+                                                   headers=self.headers, cookies=self.cookies)
+                    span.set(bytes=written)
+            except Cancelled:
+                raise
+            except Exception as e:
+                self._warn(f"    ⚠️  {label}下载失败: {e}")
+                if role == 'video':
+                    return []
+                continue
+            metrics.add_bytes(self.site_name, 'in', written)
+            files.append((role, path, label))
+        return files
+
+    def validate(self, files: List[Tuple[str, Path, str]]) -> List[Tuple[str, Path, str]]:
+        """丢弃空文件和错误页面"""
+        valid = []
+        for role, path, label in files:
+            try:
+                with open(path, 'rb') as f:
+                    head = f.read(64).lstrip()
+            except OSError:
+                head = b''
+            if not head or head.startswith(_INVALID_PREFIXES):
+                self._warn(f"    ⚠️  {label}文件无效（空文件或错误页面）: {path.name}")
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                if role == 'video':
+                    return []
+                continue
+            valid.append((role, path, label))
+        return valid
+
+    def upload(self, files: List[Tuple[str, Path, str]]) -> Dict[str, str]:
+        """上传到 S3，返回 {媒体: S3 URL}；作品上传失败时不再上传其余媒体
+
+        开启打包时（见 archive.py），通过校验的文件在上传前加入网站的 ZIP，
+        错误页和空文件在校验阶段已被删除，不会进入压缩包。
+        """
+        urls = {}
+        slots = self._slots('upload')
+        archiver = current_archive()
+        for role, path, label in files:
+            if archiver is not None:
+                archiver.add(path)
+            with tracing.span('upload.asset', role=role, bytes=path.stat().st_size) as span:
+                with slots:
+                    s3_url = self.data_manager.upload_to_s3(
+                        str(path), self.s3_category, path.name, cancel_token=self.cancel_token)
+                span.set(ok=bool(s3_url))
+            self.cancel_token.raise_if_cancelled()
+            if not s3_url:
+                if role == 'video':
+                    return {}
+                continue
+            urls[role] = s3_url
+            metrics.add_bytes(self.site_name, 'out', path.stat().st_size)
+            self._info(f"    ✅ {label}上传成功")
+        return urls
+
+    def record(self, item: WorkItem, urls: Dict[str, str]) -> AssetRecord:
+        """写入结果并加入已处理索引"""
+        record = AssetRecord(
+            self.table_name, urls['video'], urls.get('source', ''),
+            item.prompt if self.full_prompt else clean_prompt(item.prompt),
+            urls.get('cover', ''), item.category, item.type,
+        )
+        self.data_manager.record_asset(record.attach_stats(current_item_stats(), time.time()))
+        if item.id:
+            self.data_manager.seen_index.add(self.site_name, item.id)
+        self._info(f"    ✅ 已写入结果清单")
+        return record
@@ -2,17 +2,20 @@
 Pixverse Spider - 基于 Scrapy 框架
 专业爬虫实现，直接调用 API
 """
-import scrapy
-from scrapy.http import Request
 import json
-import os
-from pathlib import Path
-from typing import Dict, Optional
-import requests
+import math
+
+import scrapy
 from scrapy.exceptions import CloseSpider
 
+from models import WorkItem
+from utils import CancelToken
+from .category_scheduler import CategoryScheduler
+from .item_worker import ItemWorker
+from .pipeline import ItemPipeline
 
-class PixverseSpider(scrapy.Spider):
+
+class PixverseSpider(CategoryScheduler, scrapy.Spider):
     name = 'pixverse'
     
     # API 配置
@@ -39,38 +42,96 @@ class PixverseSpider(scrapy.Spider):
         'Emotional Close-up': 119,
     }
     
-    def __init__(self, target_count=20, data_manager=None, categories=None, *args, **kwargs):
+    # 分页配置：每个类别独立调度，最多 max_pages_per_category 页同时在途
+    page_size = 50
+    max_pages_per_category = 2
+    
+    custom_settings = {
+        'DOWNLOADER_MIDDLEWARES': {
+            'scrapers.category_scheduler.CategoryCancelMiddleware': 50,
+        },
+    }
+    
+    def __init__(self, target_count=20, data_manager=None, categories=None, item_sink=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.target_count_per_category = int(target_count)
         self.data_manager = data_manager
+        # 队列模式下作品交给 item_sink 入队，而不是就地下载
+        self.item_sink = item_sink
+        # 取消信号（列表回调与后台下载 / 上传共用）
+        self.cancel_token = CancelToken()
         self.category_name = 'Pixverse'
         self.scraped_count = 0
-        self.total_target = 0
         
         # 如果指定了类别，则只爬取这些类别
         if categories:
             self.categories = {k: v for k, v in self.categories.items() if k in categories}
         
-        # 每个类别的计数器
-        self.category_counts = {cat: 0 for cat in self.categories.keys()}
-        self.total_target = len(self.categories) * self.target_count_per_category
+        # 每个类别的计数器、配额和在途页数（见 category_scheduler.py）
+        self._init_categories(self.target_count_per_category)
+        
+        # 每个类别的分页状态
+        self.category_totals = {}                               # 第一页响应后得知
+        self.category_offsets = {cat: 0 for cat in self.categories.keys()}  # 下一个待发出的 offset
+        self.seen_ids = set()                                   # 跨页 / 跨类别去重
         
         # 确保有 data_manager
         if not self.data_manager:
             self.logger.error("❌ data_manager 未提供！")
             raise ValueError("data_manager is required")
+        
+        # 下载 / 上传 / 记录由共用的流水线在后台线程中完成，回调可以立即发出下一页请求
+        self.pipeline = ItemPipeline(self.data_manager, self.category_name, by_category=True,
+                                     cancel_token=self.cancel_token, logger=self.logger)
+        self.item_worker = ItemWorker(self.pipeline.process, cancel_token=self.cancel_token,
+                                      name=self.category_name)
+    
+    async def start(self):
+        """Scrapy 2.13+ 的入口（不再调用 start_requests），旧版本仍调用 start_requests"""
+        for request in self.start_requests():
+            yield request
     
     def start_requests(self):
         """开始请求所有类别"""
-        for category_name, category_id in self.categories.items():
+        for category_name in self.categories:
             self.logger.info(f"\n📂 开始爬取类别: {category_name}")
-            yield self._make_request(category_name, category_id, offset=0)
+            yield self._next_request(category_name)
+    
+    def _next_request(self, category_name):
+        """发出类别的下一页请求"""
+        offset = self.category_offsets[category_name]
+        self.category_offsets[category_name] = offset + self.page_size
+        self.pages_in_flight[category_name] += 1
+        return self._make_request(category_name, self.categories[category_name], offset)
+    
+    def _plan_category(self, category_name):
+        """
+        按类别剩余配额补发列表页请求
+        
+        类别的在途页预计能补足剩余配额、或已达到并行上限 / 最后一页时停止；
+        列表已耗尽而配额未满时，把差额分给其他类别。
+        """
+        if self.is_category_done(category_name) or category_name in self.exhausted_categories:
+            return
+        
+        total = self.category_totals.get(category_name, 0)
+        remaining = self.category_quotas[category_name] - self.category_counts[category_name]
+        pages_needed = math.ceil(remaining / self.page_size)
+        while (self.pages_in_flight[category_name] < min(pages_needed, self.max_pages_per_category)
+               and self.category_offsets[category_name] < total):
+            self.logger.info(f"   ⏩ [{category_name}] 请求 offset={self.category_offsets[category_name]}...")
+            yield self._next_request(category_name)
+        
+        if not self.pages_in_flight[category_name] and self.category_offsets[category_name] >= total:
+            self.logger.info(f"   ℹ️  [{category_name}] 已到最后一页")
+            self.exhausted_categories.add(category_name)
+            yield from self._rebalance(category_name)
     
     def _make_request(self, category_name, category_id, offset):
-        """构造 API 请求"""
+        """构造 API 请求（每个类别独立的下载槽，互不阻塞）"""
         params = {
             'offset': offset,
-            'limit': 50,
+            'limit': self.page_size,
             'primary_category': 1,
             'secondary_category': category_id,
             'platform': 'web',
@@ -89,56 +150,69 @@ class PixverseSpider(scrapy.Spider):
             meta={
                 'category_name': category_name,
                 'category_id': category_id,
-                'offset': offset
+                'offset': offset,
+                'download_slot': f"{self.name}-{category_id}",
             }
         )
     
     def parse_api(self, response):
         """解析 API 响应"""
         try:
-            data = json.loads(response.text)
             category_name = response.meta['category_name']
-            category_id = response.meta['category_id']
-            offset = response.meta['offset']
+            self.pages_in_flight[category_name] -= 1
+            if self.is_category_done(category_name):
+                return  # 类别在本页下载期间已达到配额
+            
+            data = json.loads(response.text)
             
             if data.get('ErrCode') != 0:
                 self.logger.error(f"❌ API 返回错误: {data.get('ErrMsg', '未知错误')}")
+                yield from self._plan_category(category_name)
                 return
             
             resp = data.get('Resp', {})
             items = resp.get('data', [])
             total = resp.get('total', 0)
+            self.category_totals[category_name] = total
+            if not items:
+                self.category_offsets[category_name] = max(self.category_offsets[category_name], total)
             
             self.logger.info(f"✅ [{category_name}] 找到 {len(items)} 个作品 (总共 {total})")
             
-            # 处理每个作品
+            # 提取本页作品（只做计数，下载在后台线程中进行）
+            page_items = []
             for item_data in items:
-                # 检查当前类别是否已达到目标
-                if self.category_counts[category_name] >= self.target_count_per_category:
+                # 检查当前类别是否已达到配额
+                if self.is_category_done(category_name):
                     break
                 
-                # 检查总数是否已达到目标
-                if self.scraped_count >= self.total_target:
-                    raise CloseSpider('Target count reached')
-                
                 item = self._extract_work_data(item_data, category_name)
+                if item and item.id:  # 没有 ID 的作品无法去重，直接保留
+                    if item.id in self.seen_ids:
+                        continue  # 其他页 / 类别已提取过
+                    self.seen_ids.add(item.id)
+                if item and self.data_manager.seen_index.contains(self.category_name, item.id):
+                    continue  # 之前的运行已处理过
                 if item:
                     self.category_counts[category_name] += 1
                     self.scraped_count += 1
-                    self._process_work(item)
+                    page_items.append(item)
                     self.logger.info(
-                        f"   ✅ [{category_name}] {self.category_counts[category_name]}/{self.target_count_per_category} "
+                        f"   ✅ [{category_name}] {self.category_counts[category_name]}/{self.category_quotas[category_name]} "
                         f"(总计: {self.scraped_count}/{self.total_target})"
                     )
             
-            # 自动翻页（如果当前类别还没达到目标）
-            if self.category_counts[category_name] < self.target_count_per_category:
-                next_offset = offset + 50
-                if next_offset < total:
-                    self.logger.info(f"   ⏩ [{category_name}] 翻页到 offset={next_offset}...")
-                    yield self._make_request(category_name, category_id, next_offset)
-                else:
-                    self.logger.info(f"   ℹ️  [{category_name}] 已到最后一页")
+            # 先补发本类别的后续页（或把耗尽类别的配额分出去），本页作品下载时后续页已在路上
+            yield from self._plan_category(category_name)
+            if self.is_category_done(category_name):
+                self.logger.info(f"   🏁 [{category_name}] 已达到配额，取消其余在途请求")
+            
+            # 再把本页作品交给后台处理
+            for item in page_items:
+                self._handle_item(item)
+            
+            if self.all_categories_done():
+                raise CloseSpider('Target count reached')
         
         except CloseSpider as e:
             self.logger.info(f"🏁 爬取完成: {e}")
@@ -171,126 +245,31 @@ class PixverseSpider(scrapy.Spider):
             cover_url = item_data.get('first_frame', '')
             prompt = item_data.get('prompt', '')
             
-            return {
-                'id': str(item_data.get('video_id', '')),
-                'prompt': prompt,
-                'video_url': video_url,
-                'source_image_url': source_image_url,
-                'cover_url': cover_url,
-                'type': work_type,
-                'category': category_name,
-                'media_type': 'video',
-            }
+            return WorkItem(
+                self.category_name, item_data.get('video_id', ''),
+                type=work_type,
+                category=category_name,
+                prompt=prompt,
+                video_url=video_url,
+                source_image_url=source_image_url,
+                cover_url=cover_url,
+            )
         
         except Exception as e:
             self.logger.error(f"提取作品数据失败: {e}")
             return None
     
-    def _process_work(self, item):
-        """处理作品：下载、上传、写入TXT"""
-        try:
-            work_id = item['id'][:8] if item.get('id') else str(self.scraped_count)
-            work_type = item['type']
-            category = item['category']
-            
-            # 确定保存目录
-            if work_type == 'image2video':
-                save_dir = self.data_manager.image2video_dir / self.category_name / category
-            else:
-                save_dir = self.data_manager.text2video_dir / self.category_name / category
-            
-            save_dir.mkdir(exist_ok=True, parents=True)
-            
-            video_s3_url = None
-            cover_s3_url = None
-            source_s3_url = None
-            
-            # 下载原图（如果有）
-            if item.get('source_image_url'):
-                try:
-                    self.logger.info(f"    📥 下载原图...")
-                    local_path = self._download_file(
-                        item['source_image_url'],
-                        save_dir / f"{work_id}_source.jpg"
-                    )
-                    if local_path:
-                        s3_url = self.data_manager.upload_to_s3(
-                            str(local_path), '', os.path.basename(str(local_path)))
-                        if s3_url:
-                            source_s3_url = s3_url
-                            self.logger.info(f"    ✅ 原图上传成功")
-                except Exception as e:
-                    self.logger.warning(f"    ⚠️  原图处理失败: {e}")
-            
-            # 下载视频
-            if item.get('video_url'):
-                try:
-                    self.logger.info(f"    📥 下载视频...")
-                    local_path = self._download_file(
-                        item['video_url'],
-                        save_dir / f"{work_id}_video.mp4"
-                    )
-                    if local_path:
-                        s3_url = self.data_manager.upload_to_s3(
-                            str(local_path), '', os.path.basename(str(local_path)))
-                        if s3_url:
-                            video_s3_url = s3_url
-                            self.logger.info(f"    ✅ 视频上传成功")
-                except Exception as e:
-                    self.logger.warning(f"    ⚠️  视频处理失败: {e}")
-            
-            # 下载封面
-            if item.get('cover_url'):
-                try:
-                    self.logger.info(f"    📥 下载封面...")
-                    local_path = self._download_file(
-                        item['cover_url'],
-                        save_dir / f"{work_id}_cover.jpg"
-                    )
-                    if local_path:
-                        s3_url = self.data_manager.upload_to_s3(
-                            str(local_path), '', os.path.basename(str(local_path)))
-                        if s3_url:
-                            cover_s3_url = s3_url
-                            self.logger.info(f"    ✅ 封面上传成功")
-                except Exception as e:
-                    self.logger.warning(f"    ⚠️  封面处理失败: {e}")
-            
-            # 写入 TXT 文件
-            if video_s3_url:
-                self.data_manager.append_to_txt(
-                    work_url=video_s3_url,
-                    site_name=self.category_name,
-                    source_url=source_s3_url or '',
-                    prompt=item.get('prompt', ''),
-                    cover_url=cover_s3_url or ''
-                )
-                self.logger.info(f"    ✅ 已写入TXT文件")
-            
-        except Exception as e:
-            self.logger.error(f"    ❌ 处理失败: {e}")
-            import traceback
-            traceback.print_exc()
-    
-    def _download_file(self, url, save_path):
-        """下载文件"""
-        try:
-            response = requests.get(url, timeout=60, stream=True)
-            response.raise_for_status()
-            
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            return save_path
-        except Exception as e:
-            self.logger.error(f"      下载失败: {e}")
-            return None
+    def _handle_item(self, item):
+        """处理提取到的作品（队列模式下只入队，否则提交到后台线程）"""
+        if self.item_sink:
+            self.item_sink(item)
+        else:
+            self.item_worker.submit(item)
     
-    def errback_httpbin(self, failure):
-        """错误回调"""
-        self.logger.error(f"❌ 请求失败: {failure.request.url}")
-        self.logger.error(f"   原因: {failure.value}")
+    def closed(self, reason):
+        """Spider 关闭时等待后台作品处理完成，被中断时取消（不阻塞 reactor）"""
+        from twisted.internet import threads
+        return threads.deferToThread(self.item_worker.close, reason)
 
 
 def run_spider(data_manager, target_count=20, categories=None):
@@ -0,0 +1,39 @@
+"""
+Scrapy 下载中间件：录制 / 回放列表接口响应（见 replay.py）
+
+放在最靠近下载器的位置（950）：录制的是线上原始响应（含 Content-Encoding），
+回放的响应同样经过解压、重试等中间件，与真实请求走同一条路径。
+"""
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+
+from replay import current_tape
+
+
+class ReplayMiddleware:
+    """--record 时保存每个响应，--replay 时直接返回录制的响应（没有录制的请求被忽略）"""
+
+    def process_request(self, request, spider):
+        tape = current_tape()
+        if tape is None or not tape.replaying:
+            return None
+        cache = tape.cache(spider.name)
+        entry = cache.load(request.method, request.url, request.body)
+        if entry is None:
+            cache.count('misses')
+            raise IgnoreRequest(f"未录制: {request.method} {request.url}")
+        cache.count('hits')
+        headers = Headers(entry['headers'])
+        respcls = responsetypes.from_args(headers=headers, url=entry['url'], body=entry['content'])
+        return respcls(url=entry['url'], headers=headers, status=entry['status'],
+                       body=entry['content'], flags=['replay'])
+
+    def process_response(self, request, response, spider):
+        tape = current_tape()
+        if tape is not None and tape.recording:
+            cache = tape.cache(spider.name)
+            cache.save(request.method, request.url, request.body, response.status,
+                       dict(response.headers.to_unicode_dict()), response.body)
+            cache.count('misses')
+        return response
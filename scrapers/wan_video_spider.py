@@ -7,9 +7,17 @@ from scrapy.http import Request
 import json
 import uuid
 import os
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, Optional
-import requests
+from config import CURSOR_CONFIG
+from utils import CancelToken
+from models import WorkItem
+from .item_worker import ItemWorker
+from .pipeline import ItemPipeline
+import math
 
 
 class WanVideoSpider(scrapy.Spider):
@@ -18,6 +26,11 @@ class WanVideoSpider(scrapy.Spider):
     name = 'wan_video'
     allowed_domains = ['wan.video', 'wanxai.com']
     start_urls = ['https://create.wan.video/']
+    api_url = 'https://create.wan.video/wanx/api/v2/square/recommend'
+    
+    # 页大小规划（见 _plan_page_size）
+    first_page_size = 12  # 第一页小，尽快拿到首批作品
+    max_page_size = 40    # 单页上限，一次失败最多损失一页
     
     custom_settings = {
         # 下载延迟（礼貌爬取）
@@ -50,36 +63,72 @@ class WanVideoSpider(scrapy.Spider):
         }
     }
     
-    def __init__(self, target_count=50, data_manager=None, *args, **kwargs):
+    def __init__(self, target_count=50, data_manager=None, item_sink=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.target_count = int(target_count)
         self.data_manager = data_manager
+        # 队列模式下作品交给 item_sink 入队，而不是就地下载
+        self.item_sink = item_sink
+        # 取消信号（列表回调与后台下载 / 上传共用）
+        self.cancel_token = CancelToken()
         self.scraped_count = 0
         self.category_name = 'WanVideo'  # 去掉空格
         
+        # 分页统计：用于规划页大小，并核对被跳过的条目
+        self.pages_fetched = 0
+        self.entries_seen = 0
+        self.entries_usable = 0
+        self.skipped_non_work = 0
+        self.skipped_seen = 0
+        
+        # 续页 token 按页顺序推进：一页的作品全部处理完（且之前的页都已完成）才保存它之后的 token
+        # 页序号 → [未完成作品数, 下一页 token]
+        self._open_pages = OrderedDict()
+        self._cursor_lock = threading.Lock()
+        
         # 确保有 data_manager
         if not self.data_manager:
             self.logger.error("❌ data_manager 未提供！")
             raise ValueError("data_manager is required")
+        
+        # 下载 / 上传 / 记录由共用的流水线在后台线程中完成，回调可以立即发出下一页请求
+        self.pipeline = ItemPipeline(self.data_manager, self.category_name, subdir='wan_video',
+                                     cancel_token=self.cancel_token, logger=self.logger)
+        self.item_worker = ItemWorker(self._process_item, cancel_token=self.cancel_token,
+                                      name=self.category_name)
+    
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.item_worker.bind_crawler(crawler)
+        return spider
     
     def parse(self, response):
         """解析首页，直接调用真实 API"""
         self.logger.info(f"🎯 使用真实 API 获取作品列表")
         
-        # 真实的 API 地址（从 Network 分析得到）
-        api_url = 'https://create.wan.video/wanx/api/v2/square/recommend'
+        # 上次运行中断时从保存的续页 token 继续，否则从第一页开始
+        token = self._load_cursor()
+        if token:
+            self.logger.info(f"⏯️  从上次中断的位置继续")
+        yield self._make_request(token)
+    
+    def _make_request(self, token: str = ''):
+        """构造列表 API 请求（页大小由 _plan_page_size 决定）"""
+        page_size = self._plan_page_size()
+        self.logger.info(f"📄 请求第 {self.pages_fetched + 1} 页（pageSize={page_size}）")
         
         # 请求参数
         payload = {
-            'pageSize': self.target_count,
+            'pageSize': page_size,
             'source': 'task_image',
             'mediaType': 'all',
-            'token': ''  # 第一页为空，后续分页会用到
+            'token': token  # 第一页为空，后续分页用上一页返回的 token
         }
         
         # 发送 POST 请求
-        yield Request(
-            url=api_url,
+        return Request(
+            url=self.api_url,
             method='POST',
             headers={
                 'Content-Type': 'application/json',
@@ -88,9 +137,27 @@ class WanVideoSpider(scrapy.Spider):
             },
             body=json.dumps(payload),
             callback=self.parse_api,
-            errback=self.errback_httpbin
+            errback=self.errback_httpbin,
+            dont_filter=True,
+            meta={'token': token}
         )
     
+    def _plan_page_size(self) -> int:
+        """
+        计算下一页的 pageSize
+        
+        第一页用小页尽快拿到首批作品；之后按剩余目标除以已观察到的有效率
+        （type == 'WORK' 且未处理过的条目占比）放大，补足被跳过的条目，上限 max_page_size。
+        """
+        remaining = max(self.target_count - self.scraped_count, 1)
+        if self.entries_seen:
+            usable_ratio = max(self.entries_usable / self.entries_seen, 0.25)
+        else:
+            usable_ratio = 1.0
+        wanted = math.ceil(remaining / usable_ratio)
+        cap = self.first_page_size if self.pages_fetched == 0 else self.max_page_size
+        return max(1, min(wanted, cap))
+    
     def parse_api(self, response):
         """解析真实 API 响应"""
         try:
@@ -100,86 +167,53 @@ class WanVideoSpider(scrapy.Spider):
                 self.logger.error(f"❌ API 返回失败: {data.get('errorMsg', '未知错误')}")
                 return
             
+            self.pages_fetched += 1
+            
             # 提取作品列表
             works = data.get('data', {}).get('works', [])
             
             if not works:
                 self.logger.warning(f"⚠️  未找到作品数据")
+                self._open_page(0, '')  # 已到列表末尾
                 return
             
-            self.logger.info(f"✅ 获取到 {len(works)} 个作品")
+            self.logger.info(f"✅ 获取到 {len(works)} 个条目")
             
-            # 遍历每个作品
+            # 遍历每个作品（只做提取和计数，下载在后台线程中进行）
+            page_items = []
             for work_item in works:
+                if self.scraped_count >= self.target_count:
+                    self.logger.info(f"✅ 已达到目标数量: {self.target_count}")
+                    break
+                
+                self.entries_seen += 1
                 if work_item.get('type') != 'WORK':
+                    self.skipped_non_work += 1
                     continue
                 
-                work_data = work_item.get('data', {})
+                item = self._parse_work_item(work_item.get('data', {}))
                 
-                # 提取关键信息
-                media_type = work_data.get('mediaType')  # "video" 或 "image"
-                task_type = work_data.get('taskType')    # "text_to_video", "image_to_video" 等
-                task_input = work_data.get('taskInput', {})
-                image_info = work_data.get('image', {})
-                
-                # 构造标准化数据
-                item = {
-                    'id': work_data.get('resourceId'),
-                    'type': 'image2video' if 'image_to' in task_type else 'text2video',
-                    'media_type': media_type,
-                    'prompt': task_input.get('prompt') or task_input.get('finalPrompt', 'No prompt'),
-                    
-                    # 视频/图片 URL
-                    'video_url': image_info.get('downloadUrl') if media_type == 'video' else image_info.get('url'),
-                    'cover_url': image_info.get('resizeUrl') or image_info.get('url'),
-                    
-                    # 原图 URL（图生视频才有）
-                    'source_image_url': None,
-                }
-                
-                # 提取原图（如果有）
-                ref_images = task_input.get('refImagesurlsInfo', [])
-                if ref_images and len(ref_images) > 0:
-                    item['source_image_url'] = ref_images[0].get('originImage')
-                    item['type'] = 'image2video'
-                
-                # 计数控制
-                if self.scraped_count >= self.target_count:
-                    self.logger.info(f"✅ 已达到目标数量: {self.target_count}")
-                    return
+                if self.data_manager.seen_index.contains(self.category_name, item.id):
+                    self.skipped_seen += 1
+                    continue  # 之前的运行已处理过
                 
+                self.entries_usable += 1
                 self.scraped_count += 1
-                self.logger.info(f"  [{self.scraped_count}/{self.target_count}] {item['type']} - {item['prompt'][:50]}...")
-                
-                # 下载并上传到 S3
-                self._process_work(item)
-                
-                yield item
+                self.logger.info(f"  [{self.scraped_count}/{self.target_count}] {item.type} - {item.prompt[:50]}...")
+                page_items.append(item)
             
-            # 分页：获取下一页
+            # 分页：先预取下一页，本页作品下载时下一页已在路上；
+            # 续页 token 等本页作品都处理完再保存（见 _page_item_done）
             next_token = data.get('data', {}).get('token')
+            page_no = self._open_page(len(page_items), next_token)
+            
             if next_token and self.scraped_count < self.target_count:
-                self.logger.info(f"📄 继续获取下一页...")
-                
-                payload = {
-                    'pageSize': self.target_count - self.scraped_count,
-                    'source': 'task_image',
-                    'mediaType': 'all',
-                    'token': next_token
-                }
-                
-                yield Request(
-                    url='https://create.wan.video/wanx/api/v2/square/recommend',
-                    method='POST',
-                    headers={
-                        'Content-Type': 'application/json',
-                        'Accept': 'application/json',
-                        'x-platform': 'web',
-                    },
-                    body=json.dumps(payload),
-                    callback=self.parse_api,
-                    dont_filter=True
-                )
+                yield self._make_request(next_token)
+            
+            # 再把本页作品交给后台下载并上传到 S3
+            for item in page_items:
+                self._handle_item(page_no, item)
+                yield item.to_dict()
                 
         except json.JSONDecodeError:
             self.logger.warning(f"⚠️  API 响应不是 JSON")
@@ -188,6 +222,92 @@ class WanVideoSpider(scrapy.Spider):
             import traceback
             traceback.print_exc()
     
+    def _parse_work_item(self, work_data: Dict) -> WorkItem:
+        """把 API 中的一条作品转换成标准化数据"""
+        # 提取关键信息
+        media_type = work_data.get('mediaType')  # "video" 或 "image"
+        task_type = work_data.get('taskType') or ''  # "text_to_video", "image_to_video" 等
+        task_input = work_data.get('taskInput', {})
+        image_info = work_data.get('image', {})
+        
+        # 原图 URL（图生视频才有）
+        source_image_url = ''
+        ref_images = task_input.get('refImagesurlsInfo', [])
+        if ref_images and len(ref_images) > 0:
+            source_image_url = ref_images[0].get('originImage')
+        
+        return WorkItem(
+            self.category_name, work_data.get('resourceId'),
+            type='image2video' if 'image_to' in task_type or ref_images else 'text2video',
+            prompt=task_input.get('prompt') or task_input.get('finalPrompt', 'No prompt'),
+            # 视频/图片 URL
+            video_url=image_info.get('downloadUrl') if media_type == 'video' else image_info.get('url'),
+            cover_url=image_info.get('resizeUrl') or image_info.get('url'),
+            source_image_url=source_image_url,
+            media_type=media_type,
+        )
+    
+    @property
+    def cursor_path(self) -> Path:
+        """续页 token 文件：{输出目录}/cursors/wan_video.json"""
+        return self.data_manager.output_dir / 'cursors' / f'{self.name}.json'
+    
+    def _load_cursor(self) -> str:
+        """读取上次中断时保存的续页 token（超过 CURSOR_CONFIG['max_age_hours'] 的丢弃）"""
+        try:
+            with open(self.cursor_path, 'r', encoding='utf-8') as f:
+                cursor = json.load(f)
+        except (OSError, ValueError):
+            return ''
+        age_hours = (time.time() - cursor.get('saved_at', 0)) / 3600
+        if age_hours > CURSOR_CONFIG['max_age_hours']:
+            self.logger.info(f"⏯️  续页 token 已保存 {age_hours:.0f} 小时，从第一页开始")
+            self._clear_cursor()
+            return ''
+        return cursor.get('token') or ''
+    
+    def _save_cursor(self, token: str):
+        """保存续页 token（原子替换），中断后下次运行可以继续"""
+        self.cursor_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cursor_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'token': token, 'pages': self.pages_fetched, 'saved_at': time.time()}, f)
+        os.replace(tmp_path, self.cursor_path)
+    
+    def _open_page(self, item_count: int, next_token: str) -> int:
+        """登记一页：item_count 个作品处理完后，续页 token 可以推进到 next_token（空表示列表末尾）"""
+        with self._cursor_lock:
+            page_no = self.pages_fetched
+            self._open_pages[page_no] = [item_count, next_token]
+            self._advance_cursor()
+        return page_no
+    
+    def _page_item_done(self, page_no: int):
+        """一个作品已记录（或已入队）"""
+        with self._cursor_lock:
+            self._open_pages[page_no][0] -= 1
+            self._advance_cursor()
+    
+    def _advance_cursor(self):
+        """（持有 _cursor_lock）按页顺序把已完成的页出队，保存最后一页之后的 token"""
+        advanced = False
+        while self._open_pages and next(iter(self._open_pages.values()))[0] <= 0:
+            _, (_, next_token) = self._open_pages.popitem(last=False)
+            advanced = True
+        if not advanced:
+            return
+        if next_token:
+            self._save_cursor(next_token)
+        else:
+            self._clear_cursor()
+    
+    def _clear_cursor(self):
+        """列表已遍历完，下次从第一页开始"""
+        try:
+            self.cursor_path.unlink()
+        except OSError:
+            pass
+    
     def parse_work(self, response):
         """解析作品详情页"""
         self.logger.info(f"📄 解析作品: {response.url}")
@@ -256,7 +376,7 @@ class WanVideoSpider(scrapy.Spider):
         
         return find_arrays(data)
     
-    def _create_work_item(self, work: Dict) -> Dict:
+    def _create_work_item(self, work: Dict) -> WorkItem:
         """创建标准化的作品数据"""
         # 智能提取字段（适配不同的 API 响应格式）
         def get_value(data, keys):
@@ -265,122 +385,57 @@ class WanVideoSpider(scrapy.Spider):
                     return data[key]
             return None
         
-        return {
-            'id': get_value(work, ['id', 'video_id', '_id']),
-            'video_url': get_value(work, ['video_url', 'videoUrl', 'url', 'video', 'media_url']),
-            'cover_url': get_value(work, ['cover_url', 'coverUrl', 'cover', 'thumbnail', 'poster']),
-            'prompt': get_value(work, ['prompt', 'description', 'text', 'caption']) or 'No prompt',
-            'source_image_url': get_value(work, ['source_image_url', 'sourceImageUrl', 'source', 'input_image']),
-            'type': 'image2video' if get_value(work, ['source_image_url', 'source']) else 'text2video',
-        }
+        return WorkItem(
+            self.category_name, get_value(work, ['id', 'video_id', '_id']),
+            video_url=get_value(work, ['video_url', 'videoUrl', 'url', 'video', 'media_url']),
+            cover_url=get_value(work, ['cover_url', 'coverUrl', 'cover', 'thumbnail', 'poster']),
+            prompt=get_value(work, ['prompt', 'description', 'text', 'caption']) or 'No prompt',
+            source_image_url=get_value(work, ['source_image_url', 'sourceImageUrl', 'source', 'input_image']),
+            type='image2video' if get_value(work, ['source_image_url', 'source']) else 'text2video',
+        )
     
-    def _process_work(self, item):
-        """处理作品：下载、上传、写入TXT"""
-        try:
-            
-            work_id = item['id'][:8] if item.get('id') else str(self.scraped_count)
-            work_type = item['type']
-            
-            # 确定保存目录
-            if work_type == 'image2video':
-                save_dir = self.data_manager.image2video_dir / 'wan_video'
-            else:
-                save_dir = self.data_manager.text2video_dir / 'wan_video'
-            
-            save_dir.mkdir(exist_ok=True, parents=True)
-            
-            video_s3_url = None
-            cover_s3_url = None
-            source_s3_url = None
-            
-            # 下载原图（如果有）
-            if item.get('source_image_url'):
-                try:
-                    self.logger.info(f"    📥 下载原图...")
-                    local_path = self._download_file(
-                        item['source_image_url'],
-                        save_dir / f"{work_id}_source.jpg"
-                    )
-                    if local_path:
-                        s3_url = self.data_manager.upload_to_s3(
-                            str(local_path), '', os.path.basename(str(local_path)))
-                        if s3_url:
-                            source_s3_url = s3_url
-                            self.logger.info(f"    ✅ 原图上传成功")
-                except Exception as e:
-                    self.logger.warning(f"    ⚠️  原图处理失败: {e}")
-            
-            # 下载视频/图片
-            if item.get('video_url'):
-                try:
-                    ext = '.mp4' if item.get('media_type') == 'video' else '.jpg'
-                    self.logger.info(f"    📥 下载{'视频' if ext == '.mp4' else '图片'}...")
-                    
-                    local_path = self._download_file(
-                        item['video_url'],
-                        save_dir / f"{work_id}_video{ext}"
-                    )
-                    if local_path:
-                        s3_url = self.data_manager.upload_to_s3(
-                            str(local_path), '', os.path.basename(str(local_path)))
-                        if s3_url:
-                            video_s3_url = s3_url
-                            self.logger.info(f"    ✅ {'视频' if ext == '.mp4' else '图片'}上传成功")
-                except Exception as e:
-                    self.logger.warning(f"    ⚠️  视频/图片处理失败: {e}")
-            
-            # 下载封面
-            if item.get('cover_url'):
-                try:
-                    self.logger.info(f"    📥 下载封面...")
-                    local_path = self._download_file(
-                        item['cover_url'],
-                        save_dir / f"{work_id}_cover.jpg"
-                    )
-                    if local_path:
-                        s3_url = self.data_manager.upload_to_s3(
-                            str(local_path), '', os.path.basename(str(local_path)))
-                        if s3_url:
-                            cover_s3_url = s3_url
-                            self.logger.info(f"    ✅ 封面上传成功")
-                except Exception as e:
-                    self.logger.warning(f"    ⚠️  封面处理失败: {e}")
-            
-            # 写入 TXT 文件
-            if video_s3_url:
-                self.data_manager.append_to_txt(
-                    work_url=video_s3_url,
-                    site_name=self.category_name,
-                    source_url=source_s3_url or '',
-                    prompt=item.get('prompt', ''),
-                    cover_url=cover_s3_url or ''
-                )
-                self.logger.info(f"    ✅ 已写入TXT文件")
-            
-        except Exception as e:
-            self.logger.error(f"    ❌ 处理失败: {e}")
-            import traceback
-            traceback.print_exc()
+    def _handle_item(self, page_no: int, item):
+        """处理提取到的作品（队列模式下只入队，否则提交到后台线程）"""
+        if self.item_sink:
+            self.item_sink(item)
+            self._page_item_done(page_no)
+        else:
+            self.item_worker.submit((page_no, item))
     
-    def _download_file(self, url, save_path):
-        """下载文件"""
-        try:
-            response = requests.get(url, timeout=60, stream=True)
-            response.raise_for_status()
-            
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            return save_path
-        except Exception as e:
-            self.logger.error(f"      下载失败: {e}")
-            return None
+    def _process_item(self, entry):
+        """（后台线程）下载上传并记录一个作品；被取消的作品不算完成，续页 token 停在它所在的页"""
+        page_no, item = entry
+        self.pipeline.process(item)
+        if not self.cancel_token.cancelled:
+            self._page_item_done(page_no)
+    
+    def closed(self, reason):
+        """Spider 关闭时等待后台作品处理完成，被中断时取消（不阻塞 reactor）"""
+        from twisted.internet import threads
+        
+        self.logger.info(
+            f"📊 {self.pages_fetched} 页 / {self.entries_seen} 个条目: 提取 {self.scraped_count} 个，"
+            f"跳过非作品 {self.skipped_non_work} 个、已处理 {self.skipped_seen} 个"
+        )
+        if self.scraped_count < self.target_count:
+            self.logger.warning(f"⚠️  未达到目标数量，只提取到 {self.scraped_count}/{self.target_count} 个")
+        return threads.deferToThread(self._finish, reason)
+    
+    def _finish(self, reason):
+        """（后台线程）等作品处理完，续页 token 已随之推进；正常完成时清除，下次从最新的第一页开始"""
+        self.item_worker.close(reason)
+        if self.scraped_count >= self.target_count and not self.cancel_token.cancelled:
+            with self._cursor_lock:
+                self._open_pages.clear()
+                self._clear_cursor()
     
     def errback_httpbin(self, failure):
         """错误回调"""
         self.logger.error(f"❌ 请求失败: {failure.request.url}")
         self.logger.error(f"   原因: {failure.value}")
+        
+        # 失败页的 token 就是上一页登记的下一页 token：上一页的作品处理完后保存到 cursors/，
+        # 下次运行从失败的这一页继续
 
 
 def run_spider(data_manager, target_count=50):
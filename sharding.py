@@ -0,0 +1,157 @@
+"""
+多进程分片爬取（main.py --workers N）
+
+每个网站（或可按分类拆分的网站的每个分类）作为一个分片在独立子进程中运行，
+突破单进程 GIL 对 JSON 解析、哈希、Excel 生成等 CPU 密集工作的限制。
+
+- 子进程各自写结果行清单：{输出目录}/journals/{分片ID}.jsonl
+- 父进程在每个分片结束后把它的清单合并到自己的清单，再输出摘要
+- 每个子进程只运行一个分片（Scrapy 的 reactor 不能在同一进程内重启）
+"""
+import multiprocessing
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from config import WEBSITES
+from metrics import REGISTRY
+from scrapers import SITES
+
+
+def plan_shards(sites: List[str]) -> List[Dict]:
+    """
+    把网站列表拆成分片
+
+    Returns:
+        [{'id': 分片ID, 'site': 网站标识, 'categories': 分类列表或 None}, ...]
+    """
+    shards = []
+    for site in sites:
+        entry = SITES[site]
+        categories = WEBSITES[entry['config_key']].get('categories') or []
+        if entry['shard_by_category'] and categories:
+            for idx, category in enumerate(categories):
+                shards.append({'id': f"{site}-{idx}", 'site': site, 'categories': [category]})
+        else:
+            shards.append({'id': site, 'site': site, 'categories': None})
+    return shards
+
+
+def run_shard(shard: Dict, output_dir: str, deadline_at: float = None, zip_mode: str = None,
+              tape: Tuple[str, str] = None, profile_dir: str = None, trace_dir: str = None) -> Dict:
+    """
+    子进程入口：运行单个分片，数据写入分片清单
+
+    Args:
+        deadline_at: 截止时间戳（main.py --deadline），子进程据此做下载准入并到期取消
+        zip_mode: 'local' / 's3' 时子进程把下载的文件打包到自己的 ZIP，None 不打包
+        tape: (录制目录, 'record' / 'replay')，main.py --record / --replay
+        profile_dir: 性能剖析输出目录（main.py --profile），文件名以分片 ID 开头
+        trace_dir: 作品追踪输出目录（main.py --trace），写到 {分片ID}.jsonl
+
+    Returns:
+        {'id', 'site', 'count', 'journal', 'error', 'seconds'}
+    """
+    from utils import DataManager
+    from scrapers import create_scraper
+    from deadline import start_deadline
+    from archive import finish_archive, start_archive
+    from replay import finish_tape, start_tape
+    from profiling import finish_profile, profiled, start_profile
+    from tracing import finish_tracing, start_tracing
+
+    journal_path = Path(output_dir) / 'journals' / f"{shard['id']}.jsonl"
+    if journal_path.exists():
+        journal_path.unlink()  # 上次运行残留的清单
+
+    result = {'id': shard['id'], 'site': shard['site'], 'count': 0,
+              'journal': str(journal_path), 'error': None, 'seconds': 0.0}
+    started = time.time()
+    data_manager = DataManager(output_dir, manifest_path=str(journal_path))
+    deadline = start_deadline(deadline_at) if deadline_at else None
+    if zip_mode:
+        start_archive(output_dir, to_s3=zip_mode == 's3')
+    if tape:
+        start_tape(*tape)
+    if profile_dir:
+        start_profile(profile_dir, tag=shard['id'])
+    if trace_dir:
+        start_tracing(str(Path(trace_dir) / f"{shard['id']}.jsonl"))
+    try:
+        extra = {'categories': shard['categories']} if shard['categories'] else {}
+        scraper = create_scraper(shard['site'], data_manager, **extra)
+        if scraper is None:
+            result['error'] = '爬虫暂未实现'
+        elif deadline and deadline.expired():
+            result['error'] = '已到截止时间，未启动'
+        else:
+            if deadline:
+                deadline.watch(scraper)
+            with profiled(shard['id']):
+                result['count'] = scraper.scrape()
+            scraper.close()
+    except Exception as e:
+        result['error'] = str(e)
+        import traceback
+        traceback.print_exc()
+    finally:
+        if deadline:
+            deadline.close()
+        data_manager.close()
+        finish_archive(aborted=result['error'] is not None)
+        finish_tape()
+        finish_profile()
+        finish_tracing()
+        result['seconds'] = time.time() - started
+        # 本分片的指标随结果交回父进程合并
+        result['metrics'] = REGISTRY.snapshot()
+    return result
+
+
+def _run_shard_star(args):
+    return run_shard(*args)
+
+
+def run_sharded(sites: List[str], output_dir: str, workers: int, data_manager, deadline_at: float = None,
+                zip_mode: str = None, tape: Tuple[str, str] = None, profile_dir: str = None,
+                trace_dir: str = None) -> int:
+    """
+    多进程运行所有分片，并把结果合并到 data_manager
+
+    Args:
+        sites: 网站标识列表
+        output_dir: 输出目录
+        workers: 最大并行进程数
+        data_manager: 父进程的数据管理器（合并目标）
+        deadline_at: 截止时间戳（传给每个分片）
+        zip_mode: 打包方式（传给每个分片）
+        tape: 录制 / 回放（传给每个分片）
+        profile_dir: 性能剖析输出目录（传给每个分片）
+        trace_dir: 作品追踪输出目录（传给每个分片）
+
+    Returns:
+        爬取的数据总条数
+    """
+    shards = plan_shards(sites)
+    print(f"🧩 分片数: {len(shards)}，并行进程: {min(workers, len(shards))}")
+
+    # spawn：子进程不继承父进程的 reactor / 锁状态；maxtasksperchild=1：每个分片一个新进程
+    context = multiprocessing.get_context('spawn')
+    total = 0
+    tasks = [(shard, output_dir, deadline_at, zip_mode, tape, profile_dir, trace_dir) for shard in shards]
+    with context.Pool(processes=min(workers, len(shards)), maxtasksperchild=1) as pool:
+        for result in pool.imap_unordered(_run_shard_star, tasks):
+            display_name = SITES[result['site']]['display_name']
+            if result['error']:
+                print(f"✗ [{result['id']}] {display_name} 失败: {result['error']}")
+            else:
+                print(f"✓ [{result['id']}] {display_name} 完成: {result['count']} 条 "
+                      f"({result['seconds']:.1f}s)")
+            total += result['count']
+            REGISTRY.merge_snapshot(result.get('metrics'))
+
+            if Path(result['journal']).exists():
+                merged = data_manager.merge_manifest(result['journal'])
+                print(f"   ↳ 合并分片清单: {merged} 行")
+
+    return total
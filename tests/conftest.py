@@ -0,0 +1,5 @@
+"""测试从仓库根目录导入模块（与 python main.py 的运行方式相同）"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,65 @@
+"""截止时间预算：时长解析、按大小和观测吞吐的下载准入、到期取消"""
+import threading
+import time
+
+import pytest
+
+import deadline
+from deadline import RunDeadline, parse_duration
+
+
+@pytest.fixture(autouse=True)
+def fixed_config(monkeypatch):
+    monkeypatch.setitem(deadline.DEADLINE_CONFIG, 'safety_factor', 2.0)
+    monkeypatch.setitem(deadline.DEADLINE_CONFIG, 'assumed_bandwidth', 1024 * 1024)
+
+
+@pytest.mark.parametrize('text, seconds', [('900', 900), ('90s', 90), ('30m', 1800), ('1.5h', 5400), (' 2M ', 120)])
+def test_parse_duration(text, seconds):
+    assert parse_duration(text) == seconds
+
+
+@pytest.mark.parametrize('text', ['', 'abc', '-5m', '10d'])
+def test_parse_duration_rejects(text):
+    with pytest.raises(ValueError):
+        parse_duration(text)
+
+
+def test_admission_uses_assumed_bandwidth_before_any_transfer():
+    budget = RunDeadline(time.time() + 100, flush_reserve=0)
+    assert budget.admit(40 * 1024 * 1024)       # 40s × 2 < 100s
+    assert not budget.admit(60 * 1024 * 1024)   # 60s × 2 > 100s
+    assert budget.admit(None)                   # 大小未知且没有观测时不拦
+
+
+def test_admission_follows_observed_throughput():
+    budget = RunDeadline(time.time() + 100, flush_reserve=0)
+    budget.record_transfer(1024 * 1024, 10.0)  # 实测 100KB/s 左右
+    assert not budget.admit(10 * 1024 * 1024)
+    assert budget.admit(100 * 1024)
+    assert budget.admit(None)  # 大小未知时按平均单文件耗时（10s）估算
+
+    short = RunDeadline(time.time() + 15, flush_reserve=0)
+    short.record_transfer(1024 * 1024, 10.0)
+    assert not short.admit(None)
+
+
+def test_flush_reserve_shrinks_budget():
+    budget = RunDeadline(time.time() + 100, flush_reserve=90)
+    assert budget.transfer_budget() <= 10
+    assert not budget.admit(10 * 1024 * 1024)
+    assert not RunDeadline(time.time() + 10, flush_reserve=20).admit(1)
+    assert RunDeadline(time.time() + 10, flush_reserve=20).expired()
+
+
+def test_expiry_cancels_watched_scrapers():
+    cancelled = threading.Event()
+
+    class Scraper:
+        def cancel(self):
+            cancelled.set()
+
+    budget = RunDeadline(time.time() + 0.2, flush_reserve=0.1)
+    budget.watch(Scraper())
+    assert cancelled.wait(2)
+    budget.close()
@@ -0,0 +1,96 @@
+"""媒体下载（download_to_file）：临时错误重试、实际重试次数记入 trace、其余错误不重试"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('requests')
+
+import requests
+
+import utils
+from utils import download_to_file
+
+BODY = b'\x00\x00\x00\x18ftypmp42' + b'x' * 4096
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """按 server.statuses 依次返回状态码，用完后返回 200"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests += 1
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = BODY if status == 200 else b'error'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    httpd.statuses = []
+    httpd.requests = 0
+    threading.Thread(target=httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/v.mp4"
+    yield httpd
+    httpd.shutdown()
+
+
+@pytest.fixture
+def annotations(monkeypatch):
+    """不真的退避；收集 annotate 记下的属性"""
+    monkeypatch.setattr(utils.time, 'sleep', lambda seconds: None)
+    monkeypatch.setitem(utils.DOWNLOAD_CONFIG, 'max_retries', 3)
+    recorded = {}
+    monkeypatch.setattr(utils, 'annotate', lambda **attributes: recorded.update(attributes))
+    return recorded
+
+
+def test_transient_errors_are_retried(server, annotations, tmp_path):
+    server.statuses = [503, 429]
+    path = tmp_path / 'v.mp4'
+
+    assert download_to_file(server.url, path) == len(BODY)
+    assert path.read_bytes() == BODY
+    assert server.requests == 3
+    assert annotations['retries'] == 2
+    assert annotations['http.status_code'] == 200
+
+
+def test_first_try_records_zero_retries(server, annotations, tmp_path):
+    download_to_file(server.url, tmp_path / 'v.mp4')
+    assert annotations['retries'] == 0
+
+
+def test_gives_up_after_max_retries(server, annotations, tmp_path):
+    server.statuses = [503, 503, 503, 503]
+    path = tmp_path / 'v.mp4'
+
+    with pytest.raises(requests.HTTPError):
+        download_to_file(server.url, path)
+    assert server.requests == 3
+    assert annotations['retries'] == 2
+    assert not path.exists()
+
+
+def test_client_errors_are_not_retried(server, annotations, tmp_path):
+    server.statuses = [404]
+
+    with pytest.raises(requests.HTTPError):
+        download_to_file(server.url, tmp_path / 'v.mp4')
+    assert server.requests == 1
+    assert annotations['retries'] == 0
+
+
+def test_cancel_during_backoff(server, annotations, tmp_path):
+    server.statuses = [503]
+    token = utils.CancelToken()
+    token.cancel('shutdown')
+
+    with pytest.raises(utils.Cancelled):
+        download_to_file(server.url, tmp_path / 'v.mp4', cancel_token=token)
@@ -0,0 +1,78 @@
+"""Higgsfield 社区接口解析（parse_feed / extract_work）"""
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('scrapy')
+
+from replay import Tape
+from scrapers.higgsfield_spider import HiggsfieldSpider, export_recorded_feeds, extract_work, parse_feed
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'higgsfield'
+SAMPLE = FIXTURES / 'sample-viral.json'
+
+
+def _load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize('path', sorted(FIXTURES.glob('*.json')), ids=lambda path: path.name)
+def test_every_fixture_parses(path):
+    items, cursor = parse_feed(_load(path))
+    assert items
+    works = [extract_work(item, 'Viral') for item in items]
+    for item, work in zip(items, works):
+        if work is None:
+            assert not (item.get('results') or {}).get('raw')  # 只有还没生成结果的作品被跳过
+            continue
+        assert work.id == item['id']
+        assert work.video_url.startswith('https://')
+        assert work.media_type in ('video', 'image')
+    assert cursor is None or isinstance(cursor, str)
+
+
+def test_parse_feed_returns_items_and_cursor():
+    items, cursor = parse_feed(_load(SAMPLE))
+    assert len(items) == 4
+    assert cursor == '1735689600000'
+
+
+def test_parse_feed_last_page():
+    assert parse_feed({'items': [], 'cursor': None}) == ([], None)
+    assert parse_feed({'items': [], 'cursor': '1735689600000'}) == ([], None)
+
+
+def test_extract_work():
+    items, _ = parse_feed(_load(SAMPLE))
+    text2video, image2video, image, pending = [extract_work(item, 'Viral') for item in items]
+
+    assert text2video.id == '7f3c2a10-5b1e-4c8a-9d2e-1a6b0c9e4f01'
+    assert text2video.type == 'text2video'
+    assert text2video.category == 'Viral'
+    assert text2video.prompt == 'A slow dolly shot through a neon-lit alley in the rain'
+    assert text2video.video_url == 'https://cdn.higgsfield.ai/community/7f3c2a10/raw.mp4'
+    assert text2video.cover_url == 'https://cdn.higgsfield.ai/community/7f3c2a10/min.webp'
+    assert text2video.source_image_url == ''
+    assert text2video.media_type == 'video'
+
+    assert image2video.type == 'image2video'
+    assert image2video.source_image_url == 'https://cdn.higgsfield.ai/uploads/b41d9e77/input.jpg'
+
+    assert image.media_type == 'image'
+    assert pending is None  # 还没有生成结果
+
+
+def test_export_recorded_feeds(tmp_path):
+    tape = Tape(str(tmp_path / 'tape'), 'record')
+    body = SAMPLE.read_bytes()
+    cache = tape.cache(HiggsfieldSpider.name)
+    cache.save('GET', f"{HiggsfieldSpider.api_url}?feed=viral&size=50", b'', 200, {}, body)
+    cache.save('GET', f"{HiggsfieldSpider.api_url}?feed=viral&size=50&cursor=42", b'', 200, {}, body)
+    cache.save('GET', f"{HiggsfieldSpider.api_url}?feed=ugc&size=50", b'', 503, {}, b'busy')
+
+    written = export_recorded_feeds(str(tmp_path / 'tape'), str(tmp_path / 'fixtures'))
+
+    assert sorted(path.name for path in written) == ['viral-42.json', 'viral-first.json']
+    assert _load(written[0]) == _load(SAMPLE)
@@ -0,0 +1,87 @@
+"""列表接口响应缓存（http_cache.ListingCache.fetch）：TTL 内命中、过期后条件请求、304 复用"""
+import json
+import os
+
+import http_cache
+from http_cache import ListingCache, http_cache_dir
+
+URL = 'https://api.example.com/list?page=1'
+
+
+class FakeServer:
+    """记录每次请求的条件请求头，按顺序返回预设响应"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, headers):
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+
+def _cache(tmp_path, ttl):
+    cache = ListingCache('pixverse', ttl=ttl, cache_dir=str(tmp_path))
+    cache.report_metrics = False
+    return cache
+
+
+def _expire(cache, url=URL):
+    """把条目的写入时间改到 TTL 之前"""
+    meta_path, _ = cache._paths(http_cache.cache_key('GET', url))
+    entry = json.loads(meta_path.read_text(encoding='utf-8'))
+    entry['stored_at'] -= cache.ttl + 1
+    meta_path.write_text(json.dumps(entry), encoding='utf-8')
+
+
+def test_fresh_entry_is_reused_without_request(tmp_path):
+    cache = _cache(tmp_path, ttl=600)
+    server = FakeServer((200, {'ETag': '"v1"'}, b'page-1'))
+
+    assert cache.fetch('GET', URL, server) == (200, b'page-1')
+    assert cache.fetch('GET', URL, server) == (200, b'page-1')
+
+    assert server.requests == [{}]
+    assert (cache.misses, cache.hits, cache.revalidated) == (1, 1, 0)
+
+
+def test_expired_entry_is_revalidated(tmp_path):
+    cache = _cache(tmp_path, ttl=600)
+    server = FakeServer((200, {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}, b'page-1'),
+                        (304, {}, b''))
+    cache.fetch('GET', URL, server)
+    _expire(cache)
+
+    assert cache.fetch('GET', URL, server) == (200, b'page-1')
+    assert server.requests[1] == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+    assert cache.revalidated == 1
+    assert cache.is_fresh(cache.load('GET', URL))  # 304 后刷新时间，下一个 TTL 内不再发请求
+
+
+def test_changed_response_replaces_entry(tmp_path):
+    cache = _cache(tmp_path, ttl=0)  # TTL 0：每次都重新验证
+    server = FakeServer((200, {'ETag': '"v1"'}, b'page-1'), (200, {'ETag': '"v2"'}, b'page-1b'))
+
+    cache.fetch('GET', URL, server)
+    assert cache.fetch('GET', URL, server) == (200, b'page-1b')
+
+    assert server.requests[1] == {'If-None-Match': '"v1"'}
+    assert cache.load('GET', URL)['headers'] == {'ETag': '"v2"'}
+    assert cache.misses == 2
+
+
+def test_errors_are_not_cached(tmp_path):
+    cache = _cache(tmp_path, ttl=600)
+    server = FakeServer((503, {}, b'busy'), (200, {}, b'page-1'))
+
+    assert cache.fetch('GET', URL, server) == (503, b'busy')
+    assert cache.fetch('GET', URL, server) == (200, b'page-1')
+    assert len(server.requests) == 2
+
+
+def test_cache_dir_follows_output_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(http_cache.HTTP_CACHE_CONFIG, 'dir', None)
+    assert http_cache_dir(str(tmp_path)) == os.path.join(str(tmp_path), 'httpcache')
+
+    monkeypatch.setitem(http_cache.HTTP_CACHE_CONFIG, 'dir', '/srv/httpcache')
+    assert http_cache_dir(str(tmp_path)) == '/srv/httpcache'
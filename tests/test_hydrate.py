@@ -0,0 +1,28 @@
+"""两阶段爬取：元数据清单读写和进度键"""
+from hydrate import ManifestWriter, progress_key, read_manifest
+from models import WorkItem
+
+
+def test_progress_key_falls_back_to_the_work_url():
+    first = WorkItem('Pixverse', '', video_url='https://cdn/1.mp4')
+    second = WorkItem('Pixverse', '', video_url='https://cdn/2.mp4')
+    assert progress_key('pixverse', first) != progress_key('pixverse', second)
+    assert progress_key('pixverse', WorkItem('Pixverse', '42', video_url='https://cdn/1.mp4')) == 'pixverse/42'
+
+
+def test_manifest_round_trip(tmp_path):
+    path = tmp_path / 'today.jsonl'
+    writer = ManifestWriter(str(path))
+    sink = writer.sink('pixverse')
+    sink(WorkItem('Pixverse', '42', category='Ad Magic', prompt='neon', video_url='https://cdn/42.mp4'))
+    sink(WorkItem('Pixverse', '', video_url='https://cdn/no-id.mp4'))
+    writer.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"site": "pixverse", "item": [')  # 被中断写入的不完整行
+
+    rows = list(read_manifest(str(path)))
+    assert [(site, item.id, item.video_url) for site, item in rows] == [
+        ('pixverse', '42', 'https://cdn/42.mp4'),
+        ('pixverse', '', 'https://cdn/no-id.mp4'),
+    ]
+    assert rows[0][1].prompt == 'neon'
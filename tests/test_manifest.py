@@ -0,0 +1,81 @@
+"""结果行清单（RowManifest）：追加、重新打开续写、读回，以及 DataManager 从清单派生各表"""
+import json
+
+import pytest
+
+import utils
+from models import AssetRecord
+from utils import DataManager, RowManifest
+
+
+def _record(site, idx, **kwargs):
+    return AssetRecord(site, f"https://cdn/{site}/{idx}.mp4", prompt=f"prompt {idx}", **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setitem(utils.MANIFEST_CONFIG, 'flush_rows', 2)
+    monkeypatch.setitem(utils.MANIFEST_CONFIG, 'fsync', False)
+
+
+def test_append_and_read_back(tmp_path):
+    path = tmp_path / 'manifests' / 'rows.jsonl'
+    manifest = RowManifest(path)
+    assert not path.exists()  # 首次写入时才创建
+
+    manifest.append(_record('pixverse', 1, category='Anime', type='text2video', bytes=2048,
+                            download_seconds=0.5, upload_seconds=0.25, total_seconds=1.0))
+    manifest.append(_record('wan', 2))
+    manifest.close()
+
+    records = list(RowManifest.read_records(path))
+    assert [(record.site, record.work_url) for record in records] == [
+        ('pixverse', 'https://cdn/pixverse/1.mp4'), ('wan', 'https://cdn/wan/2.mp4')]
+    assert records[0].to_list() == ['pixverse', 'https://cdn/pixverse/1.mp4', '', 'prompt 1', '', 'Anime',
+                                    'text2video', 2048, 0.5, 0.25, 1.0]
+    assert list(RowManifest.read(path))[1] == ('wan', ['https://cdn/wan/2.mp4', '无原图', 'prompt 2', '无缩略图'])
+
+
+def test_reopen_appends(tmp_path):
+    path = tmp_path / 'rows.jsonl'
+    first = RowManifest(path)
+    first.append(_record('wan', 1))
+    first.close()
+
+    second = RowManifest(path)
+    second.append(_record('wan', 2))
+    second.close()
+
+    assert [record.work_url for record in RowManifest.read_records(path)] == [
+        'https://cdn/wan/1.mp4', 'https://cdn/wan/2.mp4']
+
+
+def test_skips_torn_and_legacy_lines(tmp_path):
+    path = tmp_path / 'rows.jsonl'
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(_record('wan', 1).to_json() + '\n')
+        f.write('\n')
+        f.write(json.dumps(['wan', 'https://cdn/wan/2.mp4', '', 'p', '']) + '\n')  # 旧版本：没有统计列
+        f.write('["wan", "https://cdn/wan/3.mp4", "", "p')  # 写入被中断的最后一行
+
+    assert [record.work_url for record in RowManifest.read_records(path)] == [
+        'https://cdn/wan/1.mp4', 'https://cdn/wan/2.mp4']
+
+
+def test_data_manager_counts_rows_on_reopen(tmp_path):
+    path = tmp_path / 'out' / 'manifests' / 'rows-run.jsonl'
+    data_manager = DataManager(str(tmp_path / 'out'), use_s3=False, manifest_path=str(path))
+    data_manager.record_asset(_record('pixverse', 1))
+    data_manager.record_asset(_record('wan', 2))
+    data_manager.record_asset(_record('pixverse', 3))
+    data_manager.close()
+
+    reopened = DataManager(str(tmp_path / 'out'), use_s3=False, manifest_path=str(path))
+    try:
+        assert reopened.row_counts == {'pixverse': 2, 'wan': 1}
+        assert reopened.get_summary()['total_count'] == 3
+        assert [row[0] for row in reopened.iter_rows('pixverse')] == [
+            'https://cdn/pixverse/1.mp4', 'https://cdn/pixverse/3.mp4']
+        assert len(list(reopened.iter_rows())) == 3
+    finally:
+        reopened.close()
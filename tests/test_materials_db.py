@@ -0,0 +1,77 @@
+"""素材库（MaterialsStore）：同一作品重复记录时更新、上传状态、提示词检索（FTS5 / LIKE）"""
+import pytest
+
+import materials_db
+from materials_db import MaterialsStore, fts_query, materials_db_path
+from models import AssetRecord
+
+S3 = materials_db.AWS_S3_CONFIG['url_prefix']
+
+
+@pytest.fixture(params=['fts', 'like'])
+def store(request, tmp_path):
+    store = MaterialsStore(str(tmp_path / 'materials.db'), run_id='run-1')
+    if request.param == 'like':
+        store.fts = False  # SQLite 未编译 FTS5 时的退化查询
+    elif not store.fts:
+        pytest.skip('SQLite 未编译 FTS5')
+    yield store
+    store.close()
+
+
+def _work(idx, prompt, site='pixverse', **kwargs):
+    return AssetRecord(site, f"{S3}{site}/{idx}.mp4", prompt=prompt, **kwargs)
+
+
+def test_upsert_updates_existing_work(store):
+    store.add(_work(1, 'neon city at night', type='text2video', bytes=1000))
+    store.add(_work(1, 'neon city in the rain', cover_url=f"{S3}pixverse/1.jpg"), run_id='run-2')
+
+    rows = store.query()
+    assert len(rows) == 1
+    assert rows[0]['prompt'] == 'neon city in the rain'
+    assert rows[0]['type'] == 'text2video'   # 新记录没有的字段保留旧值
+    assert rows[0]['bytes'] == 1000
+    assert rows[0]['run_id'] == 'run-2'
+    assert rows[0]['cover_url'] == f"{S3}pixverse/1.jpg"
+    assert store.stats() == {'total': 1, 'sites': {'pixverse': 1}, 'upload_status': {'uploaded': 1}, 'runs': 1}
+
+
+def test_upload_status(store):
+    store.add(_work(1, 'uploaded', cover_url=f"{S3}pixverse/1.jpg"))
+    store.add(_work(2, 'partial', cover_url='https://origin.example.com/2.jpg'))
+
+    assert [row['prompt'] for row in store.query(status='partial')] == ['partial']
+    assert [row['prompt'] for row in store.query(status='uploaded')] == ['uploaded']
+
+
+def test_prompt_search(store):
+    store.add(_work(1, 'A sci-fi neon city skyline'))
+    store.add(_work(2, 'Neon signs in a rainy alley', site='wan'))
+    store.add(_work(3, 'Sunset over a quiet lake'))
+
+    assert {row['work_url'] for row in store.query('neon')} == {f"{S3}pixverse/1.mp4", f"{S3}wan/2.mp4"}
+    assert [row['work_url'] for row in store.query('neon city')] == [f"{S3}pixverse/1.mp4"]
+    assert [row['work_url'] for row in store.query('sci-fi')] == [f"{S3}pixverse/1.mp4"]
+    assert [row['work_url'] for row in store.query('neon', site='wan')] == [f"{S3}wan/2.mp4"]
+    assert store.query('forest') == []
+
+
+def test_search_follows_prompt_updates(store):
+    store.add(_work(1, 'old prompt about mountains'))
+    store.flush()
+    store.add(_work(1, 'new prompt about oceans'))
+
+    assert store.query('mountains') == []
+    assert len(store.query('oceans')) == 1
+
+
+def test_fts_query_quotes_terms():
+    assert fts_query(['sci-fi', 'it"s']) == '"sci-fi" "it""s"'
+
+
+def test_materials_db_path(tmp_path, monkeypatch):
+    monkeypatch.setitem(materials_db.MATERIALS_DB_CONFIG, 'path', None)
+    assert materials_db_path(str(tmp_path)) == str(tmp_path / 'materials.db')
+    monkeypatch.setitem(materials_db.MATERIALS_DB_CONFIG, 'path', '')
+    assert materials_db_path(str(tmp_path)) is None
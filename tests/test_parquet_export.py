@@ -0,0 +1,42 @@
+"""Parquet 导出（ParquetSink / convert_manifest）"""
+import pytest
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+from models import AssetRecord
+from parquet_export import ParquetSink, convert_manifest
+from utils import RowManifest
+
+
+def _manifest(path, *work_urls):
+    manifest = RowManifest(str(path))
+    for url in work_urls:
+        manifest.append(AssetRecord('pixverse', url, prompt='neon city', category='Ad Magic', type='text2video'))
+    manifest.close()
+    return str(path)
+
+
+def test_sink_writes_partitioned_row_groups(tmp_path):
+    sink = ParquetSink(str(tmp_path), row_group_size=2)
+    for idx in range(3):
+        sink(AssetRecord('pixverse', f'https://s3/{idx}.mp4', bytes=idx))
+    sink.close()
+
+    files = list((tmp_path / 'parquet' / 'site=pixverse').glob('*.parquet'))
+    assert len(files) == 1
+    table = pq.read_table(str(files[0]))
+    assert table.num_rows == 3
+    assert pq.ParquetFile(str(files[0])).num_row_groups == 2
+    assert table.column('work_url').to_pylist() == ['https://s3/0.mp4', 'https://s3/1.mp4', 'https://s3/2.mp4']
+
+
+def test_converting_manifests_in_the_same_second_keeps_every_file(tmp_path):
+    first = _manifest(tmp_path / 'a.jsonl', 'https://s3/a.mp4')
+    second = _manifest(tmp_path / 'b.jsonl', 'https://s3/b.mp4')
+
+    assert convert_manifest(first, str(tmp_path)) == 1
+    assert convert_manifest(second, str(tmp_path)) == 1
+
+    partition = tmp_path / 'parquet' / 'site=pixverse'
+    rows = sum(pq.read_table(str(path)).num_rows for path in partition.glob('*.parquet'))
+    assert rows == 2
@@ -0,0 +1,67 @@
+"""作品处理流水线：本地文件命名（probe）和下载校验（validate）"""
+import pytest
+
+from models import WorkItem
+from scrapers.pipeline import ItemPipeline, file_extension, file_stem
+from utils import DataManager
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    data_manager = DataManager(str(tmp_path / 'out'), use_s3=False)
+    yield ItemPipeline(data_manager, 'Imagine.art', subdir='imagine')
+    data_manager.close()
+
+
+def test_ids_sharing_a_prefix_get_distinct_files(pipeline):
+    first = WorkItem('Imagine.art', '1876543210123456789', video_url='https://cdn/a.mp4')
+    second = WorkItem('Imagine.art', '1876543210987654321', video_url='https://cdn/b.mp4')
+
+    first_paths = {path for _, _, path, _ in pipeline.probe(first)}
+    second_paths = {path for _, _, path, _ in pipeline.probe(second)}
+    assert first_paths.isdisjoint(second_paths)
+
+
+def test_file_stem():
+    assert file_stem(WorkItem('s', 'abc-123_X', video_url='https://cdn/v.mp4')) == 'abc-123_X'
+    unsafe = file_stem(WorkItem('s', 'a/b:c', video_url='https://cdn/v.mp4'))
+    assert '/' not in unsafe and ':' not in unsafe
+    assert file_stem(WorkItem('s', '', video_url='https://cdn/1.mp4')) != file_stem(WorkItem('s', '', video_url='https://cdn/2.mp4'))
+
+
+@pytest.mark.parametrize('url, video, expected', [
+    ('https://cdn/v.webm?sig=1', True, '.webm'),
+    ('https://cdn/v', True, '.mp4'),
+    ('https://cdn/cover.webp', False, '.webp'),
+    ('https://cdn/source.PNG', False, '.png'),
+    ('https://cdn/source.jpeg', False, '.jpg'),
+    ('https://cdn/image?format=webp', False, '.jpg'),
+    ('https://cdn/v.mp4', False, '.jpg'),  # 图片作品的 URL 不会是视频扩展名
+])
+def test_file_extension(url, video, expected):
+    assert file_extension(url, video) == expected
+
+
+def test_probe_keeps_image_extensions(pipeline):
+    item = WorkItem('Imagine.art', 'w1', type='image2video', video_url='https://cdn/w1.mp4',
+                    source_image_url='https://cdn/w1-src.png', cover_url='https://cdn/w1-cover.webp')
+    names = {role: path.name for role, _, path, _ in pipeline.probe(item)}
+    assert names == {'video': 'w1_video.mp4', 'source': 'w1_source.png', 'cover': 'w1_cover.webp'}
+
+
+def test_validate_drops_error_pages(pipeline, tmp_path):
+    video = tmp_path / 'v.mp4'
+    video.write_bytes(b'\x00\x00\x00\x18ftypmp42')
+    cover = tmp_path / 'c.jpg'
+    cover.write_bytes(b'<html>403 Forbidden</html>')
+
+    valid = pipeline.validate([('video', video, '视频'), ('cover', cover, '封面')])
+    assert valid == [('video', video, '视频')]
+    assert not cover.exists()
+
+
+def test_validate_rejects_the_work_when_the_video_is_invalid(pipeline, tmp_path):
+    video = tmp_path / 'v.mp4'
+    video.write_bytes(b'')
+    assert pipeline.validate([('video', video, '视频')]) == []
+    assert not video.exists()
@@ -0,0 +1,38 @@
+"""
+录制 / 回放（--record / --replay）对每个 Scrapy 网站都生效
+
+Spider.custom_settings 里的 DOWNLOADER_MIDDLEWARES 会整个替换项目设置，
+这里按 Scrapy 的方式合并 Spider 设置后检查 ReplayMiddleware 仍然启用。
+"""
+import pytest
+
+pytest.importorskip('scrapy')
+
+from replay import finish_tape, start_tape
+from scrapers import SITES, load_scraper
+from scrapers.base_scraper import ScrapyScraper
+
+REPLAY_MIDDLEWARE = 'scrapers.replay_middleware.ReplayMiddleware'
+
+
+@pytest.fixture
+def tape(tmp_path):
+    yield start_tape(str(tmp_path), 'record')
+    finish_tape()
+
+
+@pytest.mark.parametrize('site', sorted(SITES))
+def test_replay_middleware_enabled(site, tape):
+    if site == 'invideo':
+        pytest.skip('InVideo 不经过 Scrapy，由爬虫自身读写录制目录')
+    scraper_cls = load_scraper(site)
+    assert issubclass(scraper_cls, ScrapyScraper)
+
+    settings = scraper_cls(None).get_settings()
+    scraper_cls.spider_cls.update_settings(settings)
+    middlewares = settings.getdict('DOWNLOADER_MIDDLEWARES')
+
+    assert middlewares.get(REPLAY_MIDDLEWARE) == 950
+    spider_middlewares = (scraper_cls.spider_cls.custom_settings or {}).get('DOWNLOADER_MIDDLEWARES', {})
+    for path, order in spider_middlewares.items():
+        assert middlewares.get(path) == order
@@ -0,0 +1,75 @@
+"""Wan 续页 token：本页作品处理完才推进，被取消时停在原页，过期的 token 丢弃"""
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('scrapy')
+
+from scrapy.http import TextResponse
+
+from scrapers.wan_video_spider import WanVideoSpider
+from utils import DataManager
+
+
+@pytest.fixture
+def spider(tmp_path):
+    data_manager = DataManager(str(tmp_path / 'out'), use_s3=False)
+    spider = WanVideoSpider(target_count=10, data_manager=data_manager)
+    yield spider
+    spider.item_worker.close('shutdown')
+    data_manager.close()
+
+
+def _page(ids, token):
+    works = [{'type': 'WORK', 'data': {'resourceId': work_id, 'mediaType': 'video', 'taskType': 'text_to_video',
+                                       'taskInput': {'prompt': work_id},
+                                       'image': {'downloadUrl': f'https://cdn/{work_id}.mp4'}}} for work_id in ids]
+    body = json.dumps({'success': True, 'data': {'works': works, 'token': token}})
+    return TextResponse(url=WanVideoSpider.api_url, body=body.encode('utf-8'), encoding='utf-8')
+
+
+def test_cursor_waits_for_page_items(spider):
+    release = threading.Event()
+    spider.pipeline.process = lambda item: release.wait(5)
+
+    list(spider.parse_api(_page(['w1', 'w2'], 'token-2')))
+    assert not spider.cursor_path.exists()  # 作品还在处理，下一页 token 不能先保存
+
+    release.set()
+    spider.item_worker.join()
+    assert spider._load_cursor() == 'token-2'
+
+
+def test_cursor_advances_in_page_order(spider):
+    first_page = threading.Event()
+    spider.pipeline.process = lambda item: item.id == 'w1' and first_page.wait(5)
+
+    list(spider.parse_api(_page(['w1'], 'token-2')))
+    list(spider.parse_api(_page(['w2'], 'token-3')))
+    time.sleep(0.1)
+    assert not spider.cursor_path.exists()  # 第二页先完成，但第一页还没有
+
+    first_page.set()
+    spider.item_worker.join()
+    assert spider._load_cursor() == 'token-3'
+
+
+def test_cancelled_items_keep_cursor(spider):
+    spider._save_cursor('token-1')
+    spider.cancel_token.cancel('shutdown')
+
+    list(spider.parse_api(_page(['w1', 'w2'], 'token-2')))
+    spider.item_worker.join()
+    assert spider._load_cursor() == 'token-1'
+
+
+def test_stale_cursor_is_dropped(spider):
+    spider._save_cursor('token-1')
+    cursor = json.loads(spider.cursor_path.read_text(encoding='utf-8'))
+    cursor['saved_at'] -= 7 * 24 * 3600
+    spider.cursor_path.write_text(json.dumps(cursor), encoding='utf-8')
+
+    assert spider._load_cursor() == ''
+    assert not spider.cursor_path.exists()
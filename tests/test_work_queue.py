@@ -0,0 +1,113 @@
+"""共享工作队列：SQLite 和本地 Redis 替身的租用 / ack / nack / 租约超时 / 死信 / 去重"""
+import time
+
+import pytest
+
+from work_queue import LocalRespServer, RedisWorkQueue, SQLiteWorkQueue, open_queue
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def queue(request, tmp_path):
+    if request.param == 'sqlite':
+        queue = open_queue(f"sqlite:///{tmp_path / 'queue.db'}")
+        queue.max_attempts = 2
+    else:
+        server = LocalRespServer().start()
+        request.addfinalizer(server.shutdown)
+        queue = open_queue(server.url)
+        queue.max_attempts = 2
+    yield queue
+    queue.close()
+
+
+def test_open_queue_picks_backend(tmp_path):
+    queue = open_queue(f"sqlite:///{tmp_path / 'queue.db'}")
+    assert isinstance(queue, SQLiteWorkQueue)
+    queue.close()
+    with pytest.raises(ValueError):
+        open_queue('amqp://localhost')
+
+
+def test_lease_ack(queue):
+    assert queue.put({'kind': 'item', 'id': 'a'})
+    assert queue.put({'kind': 'item', 'id': 'b'})
+
+    task = queue.lease('w1', 60)
+    assert task.payload == {'kind': 'item', 'id': 'a'}
+    assert task.attempts == 1
+    assert queue.stats() == {'pending': 1, 'leased': 1, 'done': 0, 'dead': 0}
+
+    queue.ack(task)
+    assert queue.lease('w1', 60).payload['id'] == 'b'
+    assert queue.stats()['done'] == 1
+    assert not queue.is_idle()
+
+
+def test_dedupe_key(queue):
+    assert queue.put({'id': 'a'}, dedupe_key='pixverse/a')
+    assert not queue.put({'id': 'a'}, dedupe_key='pixverse/a')
+    assert queue.stats()['pending'] == 1
+
+
+def test_nack_with_delay(queue):
+    queue.put({'id': 'a'})
+    task = queue.lease('w1', 60)
+
+    queue.nack(task, delay=0.2)
+    assert queue.lease('w1', 60) is None
+    time.sleep(0.25)
+    retried = queue.lease('w2', 60)
+    assert retried.id == task.id
+    assert retried.attempts == 2
+
+
+def test_expired_lease_reappears(queue):
+    queue.put({'id': 'a'})
+    task = queue.lease('w1', 0.1)
+    assert queue.lease('w2', 60) is None
+
+    time.sleep(0.15)
+    assert queue.lease('w2', 60).id == task.id
+
+
+def test_extend_keeps_lease(queue):
+    queue.put({'id': 'a'})
+    task = queue.lease('w1', 0.1)
+    queue.extend(task, 60)
+
+    time.sleep(0.15)
+    assert queue.lease('w2', 60) is None
+
+
+def test_dead_letter_after_max_attempts(queue):
+    queue.put({'id': 'a'})
+    for _ in range(2):
+        queue.nack(queue.lease('w1', 60))
+
+    assert queue.lease('w1', 60) is None
+    stats = queue.stats()
+    assert stats['dead'] == 1
+    assert queue.is_idle()
+
+
+def test_results_round_trip(queue):
+    queue.push_result({'site': 'pixverse', 'id': 'a'})
+    queue.push_result({'site': 'wan', 'id': 'b'})
+
+    assert [record['id'] for record in queue.drain_results()] == ['a', 'b']
+    assert queue.drain_results() == []
+
+
+def test_redis_namespace_isolation():
+    server = LocalRespServer().start()
+    try:
+        host, port = server.server_address[:2]
+        first = RedisWorkQueue(host, port, namespace='run-1')
+        second = RedisWorkQueue(host, port, namespace='run-2')
+        first.put({'id': 'a'})
+        assert second.lease('w1', 60) is None
+        assert first.lease('w1', 60).payload == {'id': 'a'}
+        first.close()
+        second.close()
+    finally:
+        server.shutdown()
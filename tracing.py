@@ -0,0 +1,277 @@
+"""
+作品处理追踪（main.py --trace）
+
+聚合指标（metrics.py）说明不了 60 秒的长尾作品来自哪个 CDN 主机、哪类媒体、哪个分类。
+开启后每个作品记录一条 trace：
+
+    item                            site / item.id / category / media_type
+    ├── probe
+    ├── download
+    │   └── download.asset          role / http.host / http.status_code / bytes / retries
+    ├── validate
+    ├── upload
+    │   └── upload.asset            role / bytes
+    └── record
+
+每个作品处理完写一行 OTLP JSON（{"resourceSpans": [...]}，与 OpenTelemetry Collector 的
+file exporter 格式相同，可以用 otelcol 的 otlpjsonfile 接收器导入 Jaeger / Tempo），
+写到 {输出目录}/traces/run-{时间}/spans.jsonl（多进程分片时为 {分片ID}.jsonl）。也可以直接在本地分析：
+
+    python tracing.py downloads/traces/run-*/*.jsonl    # 最慢的作品、各主机下载耗时 p50 / p99
+
+TRACE_CONFIG['min_item_seconds'] 大于 0 时只保留耗时超过它的作品（大规模运行时只看长尾）。
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from config import TRACE_CONFIG
+
+# OTLP 状态码
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def _attribute(key: str, value) -> Dict:
+    """Python 值 → OTLP KeyValue"""
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}  # OTLP JSON 中 int64 为字符串
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+class Span:
+    """一个阶段（或一个媒体文件）的耗时和属性"""
+
+    __slots__ = ('name', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name: str, parent_id: str = '', attributes: Dict = None):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_otlp(self, trace_id: str) -> Dict:
+        span = {
+            'traceId': trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_attribute(key, value) for key, value in self.attributes.items() if value is not None],
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error else {'code': STATUS_OK},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class ItemTrace:
+    """一个作品的 trace（只在处理它的线程中使用）"""
+
+    def __init__(self, site: str, item):
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span('item', attributes={
+            'site': site, 'item.id': item.id, 'category': item.category,
+            'media_type': item.media_type, 'item.type': item.type,
+        })
+        self.spans: List[Span] = [self.root]
+        self.stack: List[Span] = [self.root]
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = Span(name, self.stack[-1].span_id)
+        span.set(**attributes)
+        self.spans.append(span)
+        self.stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            self.stack.pop()
+
+
+class SpanWriter:
+    """把作品 trace 追加写到 JSONL 文件（线程安全）"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.min_ns = int(TRACE_CONFIG['min_item_seconds'] * 1e9)
+        self.written = 0
+        self.dropped = 0
+        self._local = threading.local()
+
+    def begin(self, site: str, item) -> ItemTrace:
+        trace = self._local.trace = ItemTrace(site, item)
+        return trace
+
+    def current(self) -> Optional[ItemTrace]:
+        return getattr(self._local, 'trace', None)
+
+    def end(self, ok: bool, reason: str = ''):
+        """结束当前线程的作品 trace 并写出"""
+        trace, self._local.trace = self.current(), None
+        if trace is None:
+            return
+        root = trace.root
+        root.end_ns = time.time_ns()
+        root.set(ok=ok)
+        if not ok and reason:
+            root.error = reason
+        if root.end_ns - root.start_ns < self.min_ns:
+            with self._lock:
+                self.dropped += 1
+            return
+        line = json.dumps({'resourceSpans': [{
+            'resource': {'attributes': [_attribute('service.name', 'webscript')]},
+            'scopeSpans': [{
+                'scope': {'name': 'webscript.pipeline'},
+                'spans': [span.to_otlp(trace.trace_id) for span in trace.spans],
+            }],
+        }]}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self.written += 1
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+_current: Optional[SpanWriter] = None
+
+
+def start_tracing(path: str) -> SpanWriter:
+    """开始记录本进程的作品 trace，写到 path"""
+    global _current
+    _current = SpanWriter(path)
+    return _current
+
+
+def current_tracer() -> Optional[SpanWriter]:
+    """本进程的 trace 写入器，未开启时为 None"""
+    return _current
+
+
+def finish_tracing() -> Optional[SpanWriter]:
+    """关闭 trace 文件，返回写入器（用于打印条数）"""
+    global _current
+    writer, _current = _current, None
+    if writer is not None:
+        writer.close()
+    return writer
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """在当前线程的作品 trace 中记录一个 span；未开启追踪（或不在作品处理中）时什么都不做"""
+    trace = _current.current() if _current is not None else None
+    if trace is None:
+        yield _NOOP_SPAN
+        return
+    with trace.span(name, **attributes) as current:
+        yield current
+
+
+def begin_item(site: str, item):
+    """开始当前线程的作品 trace（ItemPipeline.process 通过过滤后调用）"""
+    if _current is not None:
+        _current.begin(site, item)
+
+
+def end_item(ok: bool, reason: str = ''):
+    """结束并写出当前线程的作品 trace"""
+    if _current is not None:
+        _current.end(ok, reason)
+
+
+def annotate(**attributes):
+    """给当前线程最内层的 span 加属性（如 download_to_file 的状态码、重试次数）"""
+    trace = _current.current() if _current is not None else None
+    if trace is not None:
+        trace.stack[-1].set(**attributes)
+
+
+# ========== 本地分析 ==========
+
+def _percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def _plain_attributes(span: Dict) -> Dict:
+    return {attr['key']: next(iter(attr['value'].values())) for attr in span.get('attributes', [])}
+
+
+def _read_spans(path: str) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource in json.loads(line)['resourceSpans']:
+                for scope in resource['scopeSpans']:
+                    yield from scope['spans']
+
+
+def analyze(paths: List[str], top: int = 20):
+    """打印最慢的作品，以及各主机下载耗时分布（据此调整各主机并发）"""
+    items = []
+    hosts: Dict[str, List[float]] = {}
+    for path in paths:
+        for span in _read_spans(path):
+            seconds = (int(span['endTimeUnixNano']) - int(span['startTimeUnixNano'])) / 1e9
+            attrs = _plain_attributes(span)
+            if span['name'] == 'item':
+                items.append((seconds, attrs))
+            elif span['name'] == 'download.asset' and attrs.get('http.host'):
+                hosts.setdefault(attrs['http.host'], []).append(seconds)
+
+    print(f"📈 {len(items)} 个作品")
+    print(f"\n🐢 最慢的 {top} 个作品:")
+    for seconds, attrs in sorted(items, key=lambda entry: entry[0], reverse=True)[:top]:
+        print(f"   {seconds:8.2f}s  {attrs.get('site', '')}  {attrs.get('category', '')}  "
+              f"{attrs.get('media_type', '')}  {attrs.get('item.id', '')}")
+    print("\n🌐 各主机下载耗时:")
+    for host, values in sorted(hosts.items(), key=lambda entry: -_percentile(entry[1], 0.99)):
+        print(f"   {host:<40} {len(values):>6} 个  p50 {_percentile(values, 0.5):6.2f}s  "
+              f"p99 {_percentile(values, 0.99):6.2f}s  最大 {max(values):6.2f}s")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='分析 --trace 记录的作品 trace')
+    parser.add_argument('paths', nargs='+', help='spans.jsonl（多进程分片时每个分片一个文件）')
+    parser.add_argument('--top', type=int, default=20, help='列出最慢的作品数 (默认: 20)')
+    args = parser.parse_args()
+    analyze(args.paths, args.top)
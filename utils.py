@@ -4,43 +4,230 @@
 import os
 import time
 import random
-import requests
-import zipfile
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional
 from urllib.parse import urlparse
 import json
-from tqdm import tqdm
-import boto3
-from botocore.exceptions import ClientError
-from config import DOWNLOAD_CONFIG, USER_AGENTS, AWS_S3_CONFIG
+from config import DOWNLOAD_CONFIG, USER_AGENTS, AWS_S3_CONFIG, MANIFEST_CONFIG, EXPORT_CONFIG
+from metrics import record_stage
+from profiling import checkpoint
+from tracing import annotate
+from models import AssetRecord
+
+# 注意：boto3 / requests / openpyxl 都是重量级依赖，统一在使用处导入，
+# 避免 `import utils` 拖慢命令行启动（见 bench_import.py）
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    获取进程内共享的 requests.Session
+    
+    连接池跨下载复用，守护进程模式下跨多次爬取复用，避免每个文件重新 TLS 握手
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=DOWNLOAD_CONFIG['pool_size'],
+                    pool_maxsize=DOWNLOAD_CONFIG['pool_size']
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _http_session = session
+    return _http_session
+
+
+_item_stats = threading.local()
+
+
+def begin_item_stats() -> Dict:
+    """
+    开始统计当前线程正在处理的作品（ItemPipeline.process 开头调用）
+    
+    download_to_file / S3Uploader.upload_file 把字节数和耗时累加进来，
+    DataManager.append_to_txt 记录结果时一并写入（见 parquet_export.py）
+    """
+    _item_stats.current = {
+        'bytes': 0,
+        'download_seconds': 0.0,
+        'upload_seconds': 0.0,
+        'started': time.time(),
+    }
+    return _item_stats.current
+
+
+def current_item_stats() -> Optional[Dict]:
+    """当前线程正在处理的作品统计，未开始时为 None"""
+    return getattr(_item_stats, 'current', None)
+
+
+class Cancelled(Exception):
+    """协作式取消：下载 / 上传过程中检测到取消信号"""
+
+
+class CancelToken:
+    """
+    协作式取消信号（线程安全）
+    
+    列表、下载、上传各阶段在循环中检查；取消后正在下载的分块、正在上传的分片尽快停止，
+    并清理半成品（本地残留文件、S3 未完成的分段上传）
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+    
+    def cancel(self, reason: str = 'cancelled'):
+        """发出取消信号（重复调用只保留第一次的原因）"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def raise_if_cancelled(self):
+        """已取消时抛出 Cancelled"""
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+    
+    def wait(self, seconds: float) -> bool:
+        """等待最多 seconds 秒（如重试前退避），期间被取消时提前返回 True"""
+        return self._event.wait(seconds)
+
+
+# 媒体下载遇到这些状态码时重试（其余 4xx 重试也不会成功）
+RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+def _is_transient(error: BaseException) -> bool:
+    """连接错误、超时、RETRY_STATUS_CODES 值得重试；取消、截止时间准入失败等不重试"""
+    import requests
+    
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUS_CODES
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError))
+
+
+def download_to_file(url: str, save_path, cancel_token: Optional[CancelToken] = None, timeout: int = 60,
+                     headers: Optional[Dict[str, str]] = None, cookies=None) -> int:
+    """
+    流式下载到本地文件（共享连接池），每个分块检查一次取消信号
+    headers / cookies 随请求发送（如 InVideo 沿用浏览器会话的 Cookie 和 Referer）
+    
+    设置了截止时间（main.py --deadline）时，拿到响应头后按 Content-Length 判断能否按时完成，
+    赶不上的文件抛出 Cancelled('deadline') 不下载。连接错误、超时、429 / 5xx 按 DOWNLOAD_CONFIG['max_retries']
+    重试（指数退避），实际重试次数记入作品 trace 的 retries。取消或出错时删除残留的半成品文件，并把异常抛给调用方。
+    --record 时同时录制，--replay 时从录制目录读取（见 replay.py）
+    
+    Returns:
+        写入的字节数
+    """
+    from deadline import current_deadline
+    from replay import current_tape
+    
+    deadline = current_deadline()
+    tape = current_tape()
+    written = 0
+    started = transfer_started = time.time()
+    try:
+        if tape is not None and tape.replaying:
+            written = tape.replay_media(url, save_path)  # --replay：从录制目录读取，不访问网络
+        else:
+            # 连接错误、超时、429 / 5xx 最多尝试 max_retries 次（指数退避），实际重试次数记入 trace
+            max_attempts = max(DOWNLOAD_CONFIG['max_retries'], 1)
+            for attempt in range(1, max_attempts + 1):
+                transfer_started = time.time()
+                try:
+                    response, written = _stream_to_file(url, save_path, cancel_token, timeout, headers, cookies,
+                                                        deadline)
+                    break
+                except Exception as e:
+                    if attempt == max_attempts or not _is_transient(e):
+                        annotate(retries=attempt - 1)
+                        raise
+                delay = 2 ** (attempt - 1)
+                if cancel_token is not None:
+                    if cancel_token.wait(delay):
+                        cancel_token.raise_if_cancelled()
+                else:
+                    time.sleep(delay)
+            annotate(retries=attempt - 1)
+            if tape is not None:
+                tape.record_media(url, response.status_code, dict(response.headers), save_path)
+        if deadline is not None:
+            deadline.record_transfer(written, time.time() - transfer_started)
+        stats = current_item_stats()
+        if stats is not None:
+            stats['bytes'] += written
+            stats['download_seconds'] += time.time() - started
+        return written
+    except BaseException:
+        try:
+            os.remove(save_path)
+        except OSError:
+            pass
+        raise
+
+
+def _stream_to_file(url: str, save_path, cancel_token: Optional[CancelToken], timeout: int,
+                    headers: Optional[Dict[str, str]], cookies, deadline):
+    """download_to_file 的一次尝试：返回 (响应, 写入的字节数)"""
+    written = 0
+    with get_http_session().get(url, timeout=timeout, stream=True, headers=headers, cookies=cookies) as response:
+        annotate(**{'http.status_code': response.status_code})
+        response.raise_for_status()
+        if deadline is not None:
+            size = int(response.headers.get('Content-Length') or 0) or None
+            if not deadline.admit(size):
+                raise Cancelled('deadline')
+        with open(save_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                f.write(chunk)
+                written += len(chunk)
+    return response, written
 
 
 class S3Uploader:
     """S3上传工具类"""
     
+    # boto3 客户端是线程安全的，进程内只创建一次
+    _shared_client = None
+    _client_lock = threading.Lock()
+    
     def __init__(self):
         """初始化S3客户端"""
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=AWS_S3_CONFIG['access_key_id'],
-            aws_secret_access_key=AWS_S3_CONFIG['secret_access_key'],
-            region_name=AWS_S3_CONFIG['region']
-        )
+        self.s3_client = self.get_client()
         self.bucket_name = AWS_S3_CONFIG['bucket_name']
         self.cdn_prefix = AWS_S3_CONFIG['url_prefix']
     
-    def upload_file(self, local_path: str, s3_key: str) -> Optional[str]:
+    def upload_file(self, local_path: str, s3_key: str, cancel_token: Optional[CancelToken] = None) -> Optional[str]:
         """
         上传文件到S3
         
         Args:
             local_path: 本地文件路径
             s3_key: S3对象键名
+            cancel_token: 取消信号（每个分片回调时检查，取消后中止分段上传）
             
         Returns:
             CDN URL或None
         """
+        from botocore.exceptions import ClientError
+        
         try:
             # 检查文件是否存在
             if not os.path.exists(local_path):
@@ -51,6 +238,7 @@ class S3Uploader:
             content_type = self._get_content_type(local_path)
             
             print(f"    📤 上传中: {os.path.basename(local_path)} -> S3")
+            started = time.time()
             
             # 上传文件（不使用ACL，存储桶已配置为公开访问）
             self.s3_client.upload_file(
@@ -59,14 +247,23 @@ class S3Uploader:
                 s3_key,
                 ExtraArgs={
                     'ContentType': content_type
-                }
+                },
+                Callback=(lambda _: cancel_token.raise_if_cancelled()) if cancel_token else None
             )
             
+            stats = current_item_stats()
+            if stats is not None:
+                stats['upload_seconds'] += time.time() - started
+            
             # 返回CDN URL
             cdn_url = f"{self.cdn_prefix}{s3_key}"
             print(f"    ✅ S3成功: {cdn_url}")
             return cdn_url
             
+        except Cancelled:
+            print(f"    ⏹️  上传已取消: {os.path.basename(local_path)}")
+            self.abort_multipart_uploads(s3_key)
+            return None
         except ClientError as e:
             print(f"    ❌ S3上传失败: {e}")
             return None
@@ -74,6 +271,38 @@ class S3Uploader:
             print(f"    ❌ 上传错误: {e}")
             return None
     
+    def abort_multipart_uploads(self, s3_key: str):
+        """中止该键名下未完成的分段上传（取消后不留下计费的孤儿分片）"""
+        try:
+            response = self.s3_client.list_multipart_uploads(Bucket=self.bucket_name, Prefix=s3_key)
+            for upload in response.get('Uploads', []):
+                if upload['Key'] == s3_key:
+                    self.s3_client.abort_multipart_upload(
+                        Bucket=self.bucket_name, Key=s3_key, UploadId=upload['UploadId'])
+        except Exception as e:
+            print(f"    ⚠️  中止分段上传失败: {e}")
+    
+    @classmethod
+    def get_client(cls):
+        """获取共享的 boto3 S3 客户端（首次调用时创建；--replay 时为本地替身）"""
+        from replay import current_tape
+        
+        tape = current_tape()
+        if tape is not None and tape.replaying:
+            return tape.s3_client()
+        if cls._shared_client is None:
+            with cls._client_lock:
+                if cls._shared_client is None:
+                    import boto3
+                    
+                    cls._shared_client = boto3.client(
+                        's3',
+                        aws_access_key_id=AWS_S3_CONFIG['access_key_id'],
+                        aws_secret_access_key=AWS_S3_CONFIG['secret_access_key'],
+                        region_name=AWS_S3_CONFIG['region']
+                    )
+        return cls._shared_client
+    
     @staticmethod
     def _get_content_type(file_path: str) -> str:
         """根据文件扩展名获取Content-Type"""
@@ -122,6 +351,8 @@ class DownloadUtils:
         Returns:
             是否下载成功
         """
+        import requests
+        
         # 跳过blob和data URLs
         if url.startswith('blob:') or url.startswith('data:'):
             return False
@@ -162,7 +393,7 @@ class DownloadUtils:
                 }
                 
                 # 动态超时：连接超时15秒，读取超时60秒
-                response = requests.get(
+                response = get_http_session().get(
                     url, 
                     headers=headers, 
                     proxies=proxies,
@@ -244,10 +475,144 @@ class DownloadUtils:
         return ext
 
 
+class SeenIndex:
+    """
+    已处理作品索引：{网站: {作品ID}}
+    
+    内存中维护；指定 path 时从 JSON 文件加载并可持久化（守护进程跨次运行去重）
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._seen: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._seen = {site: set(ids) for site, ids in json.load(f).items()}
+            except Exception as e:
+                print(f"  ⚠️  读取已处理索引失败: {e}")
+    
+    def contains(self, site: str, work_id: str) -> bool:
+        """作品是否已处理过"""
+        if not work_id:
+            return False
+        with self._lock:
+            return work_id in self._seen.get(site, ())
+    
+    def add(self, site: str, work_id: str):
+        """记录已处理作品"""
+        if not work_id:
+            return
+        with self._lock:
+            self._seen.setdefault(site, set()).add(work_id)
+    
+    def save(self):
+        """持久化到 JSON 文件（未指定 path 时不做任何事）"""
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = {site: sorted(ids) for site, ids in self._seen.items()}
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+    
+    def __len__(self):
+        with self._lock:
+            return sum(len(ids) for ids in self._seen.values())
+
+
+class RowManifest:
+    """
+    结果行清单：追加写的 JSONL，每行一个 AssetRecord（定长列表，见 models.py）
+    
+    每行只写一次、不在内存中保留；按 flush_rows 行或 flush_seconds 秒批量 flush + fsync，
+    进程崩溃时最多丢失最后一批。各网站表和总表在导出时从清单派生（见 DataManager.iter_rows）
+    """
+    
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._file = None
+        self._pending = 0
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+    
+    def append(self, record: AssetRecord):
+        """追加一行（首次写入时才创建文件）"""
+        self.append_lines([record.to_json()])
+    
+    def append_lines(self, lines: List[str]):
+        """追加已序列化的行"""
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            for line in lines:
+                self._file.write(line + '\n')
+            self._pending += len(lines)
+            if (self._pending >= MANIFEST_CONFIG['flush_rows']
+                    or time.time() - self._last_flush >= MANIFEST_CONFIG['flush_seconds']):
+                self._flush_locked()
+    
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        if self._file is not None and self._pending:
+            self._file.flush()
+            if MANIFEST_CONFIG['fsync']:
+                os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_flush = time.time()
+    
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    @staticmethod
+    def read_records(path: str):
+        """逐行读取清单，返回 AssetRecord（兼容旧版本的字典行）；跳过被中断写入的不完整行"""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield AssetRecord.from_json(line)
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+    
+    @staticmethod
+    def read(path: str):
+        """逐行读取清单，返回 (网站表名, Excel 结果行)"""
+        for record in RowManifest.read_records(path):
+            yield record.site, record.row()
+
+
+def clean_prompt(prompt: str) -> str:
+    """清理提示词：去掉换行符和多余空格，限制 500 字符"""
+    if not prompt:
+        return ''
+    prompt = ' '.join(prompt.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ').split())
+    return prompt[:500]
+
+
+def site_table_name(site_name: str) -> str:
+    """网站名称 → 结果表名（Excel 文件名），如 'Pixverse' → 'pixverse'"""
+    return site_name.lower().replace(' ', '_').replace('.', '_')
+
+
 class DataManager:
     """数据管理类"""
     
-    def __init__(self, output_dir: str, use_s3: bool = True):
+    def __init__(self, output_dir: str, use_s3: bool = True, seen_index: Optional[SeenIndex] = None,
+                 manifest_path: Optional[str] = None, materials_db: Optional[str] = None):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -257,16 +622,45 @@ class DataManager:
         self.text2video_dir.mkdir(exist_ok=True)
         self.image2video_dir.mkdir(exist_ok=True)
         
-        # Excel 数据存储（内存中维护）
-        self.excel_data: Dict[str, List[List]] = {}  # {site_name: [[row1], [row2], ...]}
+        # 结果行清单（追加写 JSONL，默认每次运行一个文件）；内存中只保留各表行数
+        if manifest_path is None:
+            manifest_path = self.output_dir / 'manifests' / f"rows-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl"
+        self.manifest = RowManifest(manifest_path)
+        self.row_counts: Dict[str, int] = {}  # {site_name: 行数}
+        self.column_maxima: Dict[str, List[int]] = {}  # {site_name: 各列最长文本}，导出时据此设置列宽
+        self._data_lock = threading.Lock()
+        if self.manifest.path.exists():
+            # 续写已有清单（如 hydrate.py 中断后重新运行）
+            for site_key, row in RowManifest.read(self.manifest.path):
+                self._count_row(site_key, row)
+        
+        # 已处理作品索引（守护进程模式下跨次运行共享）
+        self.seen_index = seen_index if seen_index is not None else SeenIndex()
         
-        # S3上传器
+        # 每记录一行时回调 listener(record)（队列模式下把结果回传给协调者）
+        self.row_listeners = []
+        
+        # 素材库（跨运行的 SQLite，见 materials_db.py）；分片 / 列表子进程不打开，由父进程合并时写入
+        self.store = None
+        if materials_db:
+            from materials_db import MaterialsStore
+            self.store = MaterialsStore(materials_db, run_id=self.manifest.path.stem.replace('rows-', '', 1))
+        
+        # S3上传器（首次上传时才创建，避免启动时导入 boto3）
         self.use_s3 = use_s3
+        self._s3_uploader = None
         if use_s3:
-            self.s3_uploader = S3Uploader()
             print("✓ S3上传已启用")
     
-    def upload_to_s3(self, local_path: str, category: str, filename: str) -> Optional[str]:
+    @property
+    def s3_uploader(self) -> S3Uploader:
+        """S3上传器（懒加载）"""
+        if self._s3_uploader is None:
+            self._s3_uploader = S3Uploader()
+        return self._s3_uploader
+    
+    def upload_to_s3(self, local_path: str, category: str, filename: str,
+                     cancel_token: Optional[CancelToken] = None) -> Optional[str]:
         """
         上传文件到S3并返回URL
         
@@ -274,6 +668,7 @@ class DataManager:
             local_path: 本地文件路径
             category: 分类（用于S3路径）
             filename: 文件名
+            cancel_token: 取消信号
             
         Returns:
             S3 CDN URL
@@ -288,14 +683,15 @@ class DataManager:
             s3_key = f"video-materials/{filename}"
         
         # 上传并获取URL
-        cdn_url = self.s3_uploader.upload_file(local_path, s3_key)
+        cdn_url = self.s3_uploader.upload_file(local_path, s3_key, cancel_token=cancel_token)
         
         return cdn_url
     
     
-    def append_to_txt(self, work_url: str, site_name: str, source_url: str = '', prompt: str = '', cover_url: str = ''):
+    def append_to_txt(self, work_url: str, site_name: str, source_url: str = '', prompt: str = '', cover_url: str = '',
+                      category: str = '', work_type: str = ''):
         """
-        实时追加数据到 Excel 数据（内存中）
+        实时追加数据到结果行清单
         
         Args:
             work_url: 作品URL（视频或图片）
@@ -303,153 +699,164 @@ class DataManager:
             source_url: 原图URL（图生视频/图生图的输入图）
             prompt: 提示词
             cover_url: 缩略图URL（视频封面）
+            category: 作品分类
+            work_type: text2video / image2video
         """
         try:
-            # 清理提示词（去掉换行符，限制长度）
-            if prompt:
-                prompt = prompt.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-                # 去除多余空格
-                prompt = ' '.join(prompt.split())
-                # 限制长度
-                if len(prompt) > 500:
-                    prompt = prompt[:500]
-            
-            # 网站标识
-            site_normalized = site_name.lower().replace(' ', '_').replace('.', '_')
-            
-            # 添加到 Excel 数据（内存中）
-            if site_normalized not in self.excel_data:
-                self.excel_data[site_normalized] = []
-            
-            self.excel_data[site_normalized].append([
-                work_url,
-                source_url or '无原图',
-                prompt or '无提示词',
-                cover_url or '无缩略图'
-            ])
-            
-            # 同时添加到总数据
-            if 'all_materials' not in self.excel_data:
-                self.excel_data['all_materials'] = []
-            
-            self.excel_data['all_materials'].append([
-                work_url,
-                source_url or '无原图',
-                prompt or '无提示词',
-                cover_url or '无缩略图'
-            ])
+            # 追加到结果行清单
+            record = AssetRecord(site_table_name(site_name), work_url, source_url, clean_prompt(prompt),
+                                 cover_url, category, work_type)
+            self.record_asset(record.attach_stats(current_item_stats(), time.time()))
                 
         except Exception as e:
             print(f"  ⚠️  写入数据失败: {e}")
     
-    def save_excel(self):
+    def record_asset(self, record: AssetRecord):
+        """
+        记录一个作品的结果：追加到结果行清单（总表在导出时派生）和素材库
+        
+        Args:
+            record: 作品结果（网站表名即 Excel 文件名）
+        """
+        self.manifest.append(record)
+        if self.store is not None:
+            self.store.add(record)
+        with self._data_lock:
+            self._count_row(record.site, record.row())
+        
+        for listener in self.row_listeners:
+            listener(record)
+    
+    def merge_manifest(self, manifest_path: str) -> int:
+        """
+        合并子进程的结果行清单到当前清单
+        
+        Returns:
+            合并的行数
+        """
+        merged = 0
+        batch = []
+        for record in RowManifest.read_records(manifest_path):
+            batch.append(record.to_json())
+            with self._data_lock:
+                self._count_row(record.site, record.row())
+            if self.store is not None:
+                self.store.add(record)
+            for listener in self.row_listeners:
+                listener(record)
+            if len(batch) >= MANIFEST_CONFIG['flush_rows']:
+                self.manifest.append_lines(batch)
+                merged += len(batch)
+                batch = []
+        if batch:
+            self.manifest.append_lines(batch)
+            merged += len(batch)
+        return merged
+    
+    def _count_row(self, site_key: str, row: List):
+        """更新行数和各列最长文本（调用方持有锁）"""
+        self.row_counts[site_key] = self.row_counts.get(site_key, 0) + 1
+        maxima = self.column_maxima.setdefault(site_key, [])
+        for idx, value in enumerate(row):
+            length = len(str(value))
+            if idx >= len(maxima):
+                maxima.append(length)
+            elif length > maxima[idx]:
+                maxima[idx] = length
+    
+    def _column_widths(self, site_name: str) -> List[float]:
+        """按各列最长文本计算列宽"""
+        with self._data_lock:
+            if site_name == 'all_materials':
+                tables = list(self.column_maxima.values())
+            else:
+                tables = [self.column_maxima.get(site_name, [])]
+        return _widths_from_maxima(tables)
+    
+    def sites(self) -> List[str]:
+        """已有数据的网站表名"""
+        with self._data_lock:
+            return [site_key for site_key, count in self.row_counts.items() if count]
+    
+    def iter_rows(self, site_key: Optional[str] = None):
+        """
+        从清单派生视图：指定 site_key 时只返回该网站的行，否则返回全部（总表）
+        """
+        self.manifest.flush()
+        if not self.manifest.path.exists():
+            return
+        for row_site, row in RowManifest.read(self.manifest.path):
+            if site_key is None or row_site == site_key:
+                yield row
+    
+    def close(self):
+        """落盘并关闭结果行清单和素材库"""
+        self.manifest.close()
+        if self.store is not None:
+            self.store.close()
+    
+    def save_excel(self, verify: Optional[bool] = None, include_all: bool = True, name_suffix: str = ''):
         """
-        保存 Excel 文件（从内存中的数据）
-        每个网站一个 Excel 文件，加一个总的 all_materials.xlsx
+        保存 Excel 文件（从结果行清单流式生成）
+        每个网站一个 Excel 文件，加一个总的 all_materials.xlsx，多个文件并行生成
         格式：作品URL | 原图URL | 提示词 | 缩略图URL
+        
+        Args:
+            verify: 保存后重新打开文件抽查提示词（默认见 EXPORT_CONFIG['verify']）
+            include_all: 是否生成总表 all_materials.xlsx
+            name_suffix: 文件名后缀（守护进程每次运行单独导出，如 pixverse-20240101-120000.xlsx）
         """
+        started = time.monotonic()
         try:
-            if not self.excel_data:
+            sites = self.sites()
+            if not sites:
                 print("  ℹ️  没有数据需要保存到 Excel")
                 return
             
             print(f"\n📊 生成 Excel 文件...")
+            if verify is None:
+                verify = EXPORT_CONFIG['verify']
             
-            for site_name, rows in self.excel_data.items():
-                if not rows:
-                    continue
-                
-                # 创建工作簿
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "素材数据"
-                
-                # 设置表头
-                headers = ["作品URL", "原图URL", "提示词", "缩略图URL"]
-                ws.append(headers)
-                
-                # 设置表头样式
-                for cell in ws[1]:
-                    cell.font = Font(bold=True, size=12)
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                
-                # 添加数据
-                print(f"  📝 开始写入 {len(rows)} 行数据到Excel...")
-                for row_idx, row in enumerate(rows, start=1):
-                    # 检查提示词列（第3列）
-                    if len(row) >= 3:
-                        prompt = row[2]
-                        if row_idx <= 3:  # 只打印前3行
-                            print(f"    行{row_idx} - 提示词长度: {len(str(prompt))} 字符")
-                            print(f"           前50字符: {str(prompt)[:50]}")
-                    ws.append(row)
-                
-                # 设置单元格样式：文本换行 + 估算行高
-                for row_idx, row_cells in enumerate(ws.iter_rows(min_row=2), start=2):
-                    max_text_length = 0
-                    for cell_idx, cell in enumerate(row_cells):
-                        cell.alignment = Alignment(wrap_text=True, vertical='top')
-                        # 检查第3列（提示词）的文本长度
-                        if cell_idx == 2 and cell.value:  # 第3列是提示词
-                            text_length = len(str(cell.value))
-                            max_text_length = max(max_text_length, text_length)
-                    
-                    # 根据提示词长度设置行高
-                    if max_text_length > 80:
-                        # 估算行高：每80字符一行，每行15磅
-                        estimated_lines = (max_text_length // 80) + 1
-                        ws.row_dimensions[row_idx].height = min(estimated_lines * 15, 300)  # 最高300磅
-                    else:
-                        ws.row_dimensions[row_idx].height = 30  # 默认行高
-                
-                # 自动调整列宽（提示词列特殊处理）
-                for col_idx, column in enumerate(ws.columns, start=1):
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    
-                    # 第3列是提示词，设置固定宽度80
-                    if col_idx == 3:
-                        ws.column_dimensions[column_letter].width = 80
-                    else:
-                        for cell in column:
-                            try:
-                                if len(str(cell.value)) > max_length:
-                                    max_length = len(str(cell.value))
-                            except:
-                                pass
-                        adjusted_width = min(max_length + 2, 100)
-                        ws.column_dimensions[column_letter].width = adjusted_width
-                
-                # 保存文件
-                excel_path = self.output_dir.parent / f'{site_name}.xlsx'
-                wb.save(excel_path)
-                print(f"  ✅ {site_name}.xlsx ({len(rows)} 条)")
+            self.manifest.flush()
+            if self.store is not None:
+                self.store.flush()
+            tables = sites + ['all_materials'] if include_all else sites
+            jobs = [
+                (str(self.manifest.path), site_name, str(self.output_dir.parent / f'{site_name}{name_suffix}.xlsx'),
+                 self._column_widths(site_name), verify)
+                for site_name in tables
+            ]
+            
+            workers = min(EXPORT_CONFIG['workers'], len(jobs))
+            if workers <= 1:
+                results = [write_excel_sheet(*job) for job in jobs]
+            else:
+                # openpyxl 是纯 Python 的 CPU 密集工作，用进程而不是线程并行
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
                 
-                # 【验证】读取保存的文件，检查提示词是否完整
-                print(f"  🔍 验证Excel文件...")
-                wb_check = load_workbook(excel_path)
-                ws_check = wb_check.active
-                for row_idx in range(2, min(4, ws_check.max_row + 1)):  # 检查前2行数据
-                    cell_value = ws_check.cell(row_idx, 3).value  # 第3列是提示词
-                    if cell_value:
-                        print(f"    行{row_idx-1} 提示词长度: {len(str(cell_value))} 字符")
-                        print(f"           内容: {str(cell_value)[:100]}...")
-                wb_check.close()
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                    results = list(executor.map(write_excel_sheet, *zip(*jobs)))
+            
+            for (_, _, path, _, _), count in zip(jobs, results):
+                print(f"  ✅ {Path(path).name} ({count} 条)")
             
+            record_stage('all', 'export', time.monotonic() - started)
+            checkpoint('save_excel')
             print(f"📊 Excel 文件生成完成！")
             
         except Exception as e:
+            record_stage('all', 'export', time.monotonic() - started, ok=False)
             print(f"  ⚠️  生成 Excel 失败: {e}")
             import traceback
             traceback.print_exc()
     
     
     def get_summary(self) -> Dict:
-        """获取数据摘要（基于 Excel 数据）"""
-        total_count = sum(len(rows) for rows in self.excel_data.values() if rows)
-        # 减去重复的 all_materials 计数
-        if 'all_materials' in self.excel_data:
-            total_count = len(self.excel_data['all_materials'])
+        """获取数据摘要（基于结果行计数）"""
+        with self._data_lock:
+            total_count = sum(self.row_counts.values())
         
         return {
             'text2video_count': 0,  # 已不再单独统计
@@ -458,6 +865,124 @@ class DataManager:
         }
 
 
+EXCEL_HEADERS = ["作品URL", "原图URL", "提示词", "缩略图URL"]
+
+
+def _widths_from_maxima(tables: List[List[int]]) -> List[float]:
+    """各表的各列最长文本 → 列宽（提示词列固定 80，其余最宽 100）"""
+    widths = []
+    for idx, header in enumerate(EXCEL_HEADERS):
+        if idx == 2:
+            widths.append(80)
+            continue
+        max_length = max([len(header)] + [maxima[idx] for maxima in tables if idx < len(maxima)])
+        widths.append(min(max_length + 2, 100))
+    return widths
+
+
+def excel_column_widths(rows: List[List]) -> List[float]:
+    """按已在内存中的行计算列宽（素材库查询结果导出时使用）"""
+    maxima = [0] * len(EXCEL_HEADERS)
+    for row in rows:
+        for idx, value in enumerate(row[:len(maxima)]):
+            maxima[idx] = max(maxima[idx], len(str(value)))
+    return _widths_from_maxima([maxima])
+
+
+def write_excel_sheet(manifest_path: str, site_name: str, excel_path: str,
+                      widths: List[float], verify: bool = False) -> int:
+    """
+    从结果行清单流式写出一个 Excel 文件
+    
+    Args:
+        manifest_path: 结果行清单路径
+        site_name: 网站表名，'all_materials' 表示全部行
+        excel_path: 输出文件路径
+        widths: 各列宽度
+        verify: 保存后重新打开文件抽查提示词
+        
+    Returns:
+        写入的数据行数
+    """
+    rows = (row for row_site, row in RowManifest.read(manifest_path)
+            if site_name == 'all_materials' or row_site == site_name)
+    return write_excel_rows(rows, excel_path, widths, verify, label=site_name)
+
+
+def write_excel_rows(rows, excel_path: str, widths: List[float], verify: bool = False, label: str = '') -> int:
+    """
+    流式写出一个 Excel 文件（openpyxl 只写模式，内存占用与行数无关）
+    
+    列宽必须在写入第一行之前确定，由调用方按各列最长文本算好传入；
+    行高按提示词长度估算，在写入该行时设置。
+    
+    Args:
+        rows: 结果行（可迭代）
+        excel_path: 输出文件路径
+        widths: 各列宽度
+        verify: 保存后重新打开文件抽查提示词
+        label: 抽查输出中显示的表名
+        
+    Returns:
+        写入的数据行数
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font
+    from openpyxl.utils import get_column_letter
+    
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("素材数据")
+    for col_idx, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = width
+    
+    # 表头
+    header_font = Font(bold=True, size=12)
+    header_alignment = Alignment(horizontal='center', vertical='center')
+    header_cells = []
+    for header in EXCEL_HEADERS:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.alignment = header_alignment
+        header_cells.append(cell)
+    ws.append(header_cells)
+    
+    # 数据：文本换行 + 按提示词长度估算行高
+    body_alignment = Alignment(wrap_text=True, vertical='top')
+    row_idx = 1
+    for row in rows:
+        row_idx += 1
+        
+        prompt_length = len(str(row[2])) if len(row) >= 3 and row[2] else 0
+        if prompt_length > 80:
+            # 估算行高：每80字符一行，每行15磅，最高300磅
+            ws.row_dimensions[row_idx].height = min((prompt_length // 80 + 1) * 15, 300)
+        else:
+            ws.row_dimensions[row_idx].height = 30  # 默认行高
+        
+        cells = []
+        for value in row:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.alignment = body_alignment
+            cells.append(cell)
+        ws.append(cells)
+    
+    wb.save(excel_path)
+    
+    if verify:
+        # 【验证】读取保存的文件，检查提示词是否完整
+        from openpyxl import load_workbook
+        
+        wb_check = load_workbook(excel_path, read_only=True)
+        ws_check = wb_check.active
+        for check_idx, values in enumerate(ws_check.iter_rows(min_row=2, max_row=3, values_only=True), start=1):
+            if len(values) >= 3 and values[2]:
+                print(f"    {label} 行{check_idx} 提示词长度: {len(str(values[2]))} 字符")
+        wb_check.close()
+    
+    return row_idx - 1
+
+
 def setup_proxy(proxy_config: Dict) -> Optional[Dict]:
     """
     设置代理
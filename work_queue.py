@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+共享工作队列 - 多节点分布式爬取的任务队列
+
+任务是 JSON 字典。worker 租用（lease）任务后须在可见性超时内 ack，
+超时未 ack 的任务会重新出现；尝试次数超过 max_attempts 进入死信。
+入队时可指定去重键，同一个键只会入队一次（多个协调者不会重复派发作品）。
+
+后端（open_queue 按 URL 选择）：
+- sqlite:///path/to/queue.db   单机多进程，依赖 SQLite 文件锁
+- redis://host:port/db         多节点，Redis 协议（内置最小 RESP 客户端，无额外依赖）
+
+本地替身（单机调试 / 无 Redis 环境）：
+    python work_queue.py serve --port 6390
+    python main.py --queue redis://127.0.0.1:6390/0 --role worker
+"""
+import json
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from config import QUEUE_CONFIG
+
+
+class Task:
+    """已租用的任务"""
+
+    def __init__(self, task_id: str, payload: Dict, attempts: int):
+        self.id = task_id
+        self.payload = payload
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"Task({self.id}, {self.payload.get('kind')}, attempts={self.attempts})"
+
+
+class WorkQueue(ABC):
+    """工作队列接口"""
+
+    def __init__(self, max_attempts: int = None):
+        self.max_attempts = max_attempts or QUEUE_CONFIG['max_attempts']
+
+    @abstractmethod
+    def put(self, payload: Dict, dedupe_key: Optional[str] = None) -> bool:
+        """入队，返回是否真正入队（去重键已存在时返回 False）"""
+
+    @abstractmethod
+    def lease(self, worker_id: str, visibility_timeout: float) -> Optional[Task]:
+        """租用一个可用任务，没有则返回 None"""
+
+    @abstractmethod
+    def ack(self, task: Task):
+        """确认任务完成"""
+
+    @abstractmethod
+    def nack(self, task: Task, delay: float = 0):
+        """放回任务，delay 秒后可再次租用"""
+
+    @abstractmethod
+    def extend(self, task: Task, visibility_timeout: float):
+        """把租约延长到从现在起 visibility_timeout 秒"""
+
+    @abstractmethod
+    def push_result(self, record: Dict):
+        """回传一条结果记录（协调者汇总用）"""
+
+    @abstractmethod
+    def drain_results(self) -> List[Dict]:
+        """取出全部结果记录"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """{'pending', 'leased', 'done', 'dead'}"""
+
+    def is_idle(self) -> bool:
+        """没有待处理或处理中的任务"""
+        stats = self.stats()
+        return stats['pending'] == 0 and stats['leased'] == 0
+
+    def close(self):
+        pass
+
+
+# ========== SQLite 后端 ==========
+
+class SQLiteWorkQueue(WorkQueue):
+    """SQLite 队列：同一台机器上的多个进程共享一个数据库文件"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payload TEXT NOT NULL,
+            dedupe_key TEXT UNIQUE,
+            status TEXT NOT NULL DEFAULT 'pending',   -- pending / leased / done / dead
+            available_at REAL NOT NULL,               -- pending: 可租用时间；leased: 租约到期时间
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_ready ON tasks(status, available_at);
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payload TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: str, max_attempts: int = None):
+        super().__init__(max_attempts)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def _transaction(self):
+        """BEGIN IMMEDIATE：立即拿写锁，保证多进程租用互斥"""
+        self._conn.execute('BEGIN IMMEDIATE')
+
+    def put(self, payload: Dict, dedupe_key: Optional[str] = None) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO tasks (payload, dedupe_key, available_at) VALUES (?, ?, ?)',
+                (json.dumps(payload, ensure_ascii=False), dedupe_key, time.time())
+            )
+            return cursor.rowcount == 1
+
+    def lease(self, worker_id: str, visibility_timeout: float) -> Optional[Task]:
+        with self._lock:
+            self._transaction()
+            try:
+                while True:
+                    now = time.time()
+                    row = self._conn.execute(
+                        "SELECT id, payload, attempts FROM tasks "
+                        "WHERE status IN ('pending', 'leased') AND available_at <= ? "
+                        "ORDER BY id LIMIT 1",
+                        (now,)
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute('COMMIT')
+                        return None
+
+                    task_id, payload, attempts = row
+                    if attempts >= self.max_attempts:
+                        self._conn.execute("UPDATE tasks SET status = 'dead' WHERE id = ?", (task_id,))
+                        continue
+
+                    self._conn.execute(
+                        "UPDATE tasks SET status = 'leased', available_at = ?, attempts = attempts + 1, "
+                        "worker = ? WHERE id = ?",
+                        (now + visibility_timeout, worker_id, task_id)
+                    )
+                    self._conn.execute('COMMIT')
+                    return Task(str(task_id), json.loads(payload), attempts + 1)
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def ack(self, task: Task):
+        with self._lock:
+            self._conn.execute("UPDATE tasks SET status = 'done' WHERE id = ?", (int(task.id),))
+
+    def nack(self, task: Task, delay: float = 0):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = 'pending', available_at = ? WHERE id = ? AND status = 'leased'",
+                (time.time() + delay, int(task.id))
+            )
+
+    def extend(self, task: Task, visibility_timeout: float):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET available_at = ? WHERE id = ? AND status = 'leased'",
+                (time.time() + visibility_timeout, int(task.id))
+            )
+
+    def push_result(self, record: Dict):
+        with self._lock:
+            self._conn.execute('INSERT INTO results (payload) VALUES (?)',
+                               (json.dumps(record, ensure_ascii=False),))
+
+    def drain_results(self) -> List[Dict]:
+        with self._lock:
+            self._transaction()
+            rows = self._conn.execute('SELECT id, payload FROM results ORDER BY id').fetchall()
+            if rows:
+                self._conn.execute('DELETE FROM results WHERE id <= ?', (rows[-1][0],))
+            self._conn.execute('COMMIT')
+        return [json.loads(payload) for _, payload in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._conn.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status').fetchall())
+        return {key: counts.get(key, 0) for key in ('pending', 'leased', 'done', 'dead')}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ========== Redis 后端 ==========
+
+class RespError(Exception):
+    """Redis 返回的错误回复"""
+
+
+class RespConnection:
+    """最小 RESP2 客户端（只实现本队列用到的请求/回复格式）"""
+
+    def __init__(self, host: str, port: int, db: int = 0, password: Optional[str] = None, timeout: float = 30):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._reader = self._sock.makefile('rb')
+        self._lock = threading.Lock()
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    def execute(self, *args):
+        """发送一条命令并读取回复"""
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        with self._lock:
+            self._sock.sendall(b''.join(parts))
+            return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError('Redis 连接已关闭')
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b'+':
+            return body.decode('utf-8')
+        if prefix == b'-':
+            raise RespError(body.decode('utf-8'))
+        if prefix == b':':
+            return int(body)
+        if prefix == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)[:-2]
+            return data.decode('utf-8')
+        if prefix == b'*':
+            length = int(body)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RespError(f'无法解析的回复: {line!r}')
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+
+class RedisWorkQueue(WorkQueue):
+    """
+    Redis 队列，键布局（{ns} 为命名空间）：
+        {ns}:seq        任务 ID 自增计数
+        {ns}:tasks      HASH  任务ID → payload
+        {ns}:attempts   HASH  任务ID → 尝试次数
+        {ns}:pending    LIST  可租用的任务ID
+        {ns}:delayed    ZSET  nack 延迟中的任务（score = 可租用时间）
+        {ns}:leases     ZSET  已租用的任务（score = 租约到期时间）
+        {ns}:dedupe     SET   去重键
+        {ns}:results    LIST  结果记录
+        {ns}:done       已完成计数
+        {ns}:dead       LIST  死信任务ID
+    """
+
+    def __init__(self, host: str, port: int, db: int = 0, password: Optional[str] = None,
+                 namespace: str = None, max_attempts: int = None):
+        super().__init__(max_attempts)
+        self.conn = RespConnection(host, port, db, password)
+        self.ns = namespace or QUEUE_CONFIG['namespace']
+
+    def _key(self, name: str) -> str:
+        return f"{self.ns}:{name}"
+
+    def put(self, payload: Dict, dedupe_key: Optional[str] = None) -> bool:
+        if dedupe_key and self.conn.execute('SADD', self._key('dedupe'), dedupe_key) == 0:
+            return False
+        task_id = self.conn.execute('INCR', self._key('seq'))
+        self.conn.execute('HSET', self._key('tasks'), task_id, json.dumps(payload, ensure_ascii=False))
+        self.conn.execute('RPUSH', self._key('pending'), task_id)
+        return True
+
+    def _requeue_due(self, now: float):
+        """租约到期 / 延迟到期的任务放回 pending（ZREM 成功者负责入队，避免重复）"""
+        for name in ('leases', 'delayed'):
+            due = self.conn.execute('ZRANGEBYSCORE', self._key(name), '-inf', now, 'LIMIT', 0, 100) or []
+            for task_id in due:
+                if self.conn.execute('ZREM', self._key(name), task_id) == 1:
+                    self.conn.execute('RPUSH', self._key('pending'), task_id)
+
+    def lease(self, worker_id: str, visibility_timeout: float) -> Optional[Task]:
+        now = time.time()
+        self._requeue_due(now)
+        while True:
+            task_id = self.conn.execute('LPOP', self._key('pending'))
+            if task_id is None:
+                return None
+
+            payload = self.conn.execute('HGET', self._key('tasks'), task_id)
+            if payload is None:
+                continue  # 已被 ack 的过期副本
+
+            attempts = self.conn.execute('HINCRBY', self._key('attempts'), task_id, 1)
+            if attempts > self.max_attempts:
+                self.conn.execute('RPUSH', self._key('dead'), task_id)
+                self.conn.execute('HDEL', self._key('tasks'), task_id)
+                continue
+
+            self.conn.execute('ZADD', self._key('leases'), now + visibility_timeout, task_id)
+            return Task(str(task_id), json.loads(payload), attempts)
+
+    def ack(self, task: Task):
+        self.conn.execute('ZREM', self._key('leases'), task.id)
+        if self.conn.execute('HDEL', self._key('tasks'), task.id) == 1:
+            self.conn.execute('INCR', self._key('done'))
+        self.conn.execute('HDEL', self._key('attempts'), task.id)
+
+    def nack(self, task: Task, delay: float = 0):
+        if self.conn.execute('ZREM', self._key('leases'), task.id) == 1:
+            if delay > 0:
+                self.conn.execute('ZADD', self._key('delayed'), time.time() + delay, task.id)
+            else:
+                self.conn.execute('RPUSH', self._key('pending'), task.id)
+
+    def extend(self, task: Task, visibility_timeout: float):
+        # XX：只更新仍在租约中的任务
+        self.conn.execute('ZADD', self._key('leases'), 'XX', time.time() + visibility_timeout, task.id)
+
+    def push_result(self, record: Dict):
+        self.conn.execute('RPUSH', self._key('results'), json.dumps(record, ensure_ascii=False))
+
+    def drain_results(self) -> List[Dict]:
+        results = []
+        while True:
+            payload = self.conn.execute('LPOP', self._key('results'))
+            if payload is None:
+                return results
+            results.append(json.loads(payload))
+
+    def stats(self) -> Dict[str, int]:
+        pending = self.conn.execute('LLEN', self._key('pending'))
+        delayed = self.conn.execute('ZCARD', self._key('delayed'))
+        return {
+            'pending': pending + delayed,
+            'leased': self.conn.execute('ZCARD', self._key('leases')),
+            'done': int(self.conn.execute('GET', self._key('done')) or 0),
+            'dead': self.conn.execute('LLEN', self._key('dead')),
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+def open_queue(url: str) -> WorkQueue:
+    """
+    按 URL 打开队列
+
+    Args:
+        url: sqlite:///queue.db（相对路径）、sqlite:////abs/queue.db 或 redis://[:password@]host:port/db
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        # 与 SQLAlchemy 相同：sqlite:///相对路径，sqlite:////绝对路径
+        return SQLiteWorkQueue(parsed.path[1:] or 'queue.db')
+    if parsed.scheme == 'redis':
+        db = int(parsed.path.lstrip('/') or 0)
+        return RedisWorkQueue(parsed.hostname or '127.0.0.1', parsed.port or 6379, db, parsed.password)
+    raise ValueError(f"不支持的队列地址: {url}（支持 sqlite:/// 和 redis://）")
+
+
+# ========== 本地 Redis 替身 ==========
+
+class _RespStore:
+    """内存数据（只实现 RedisWorkQueue 用到的命令）"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def _get(self, key, factory):
+        return self.data.setdefault(key, factory())
+
+    def execute(self, command: str, args: list):
+        with self.lock:
+            return getattr(self, f"cmd_{command.lower()}")(*args)
+
+    def cmd_ping(self, *args):
+        return 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_auth(self, *args):
+        return 'OK'
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        return 'OK'
+
+    def cmd_incr(self, key):
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value)
+        return value
+
+    def cmd_get(self, key):
+        return self.data.get(key)
+
+    def cmd_sadd(self, key, *members):
+        target = self._get(key, set)
+        added = len(set(members) - target)
+        target.update(members)
+        return added
+
+    def cmd_hset(self, key, field, value):
+        target = self._get(key, dict)
+        is_new = field not in target
+        target[field] = value
+        return int(is_new)
+
+    def cmd_hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def cmd_hdel(self, key, *fields):
+        target = self.data.get(key, {})
+        return sum(1 for field in fields if target.pop(field, None) is not None)
+
+    def cmd_hincrby(self, key, field, amount):
+        target = self._get(key, dict)
+        value = int(target.get(field, 0)) + int(amount)
+        target[field] = str(value)
+        return value
+
+    def cmd_rpush(self, key, *values):
+        target = self._get(key, list)
+        target.extend(values)
+        return len(target)
+
+    def cmd_lpop(self, key):
+        target = self.data.get(key)
+        return target.pop(0) if target else None
+
+    def cmd_llen(self, key):
+        return len(self.data.get(key, []))
+
+    def cmd_zadd(self, key, *args):
+        flags = {arg.upper() for arg in args[:-2]}
+        score, member = args[-2:]
+        target = self._get(key, dict)
+        is_new = member not in target
+        if 'XX' in flags and is_new:
+            return 0
+        target[member] = float(score)
+        return int(is_new)
+
+    def cmd_zrem(self, key, *members):
+        target = self.data.get(key, {})
+        return sum(1 for member in members if target.pop(member, None) is not None)
+
+    def cmd_zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def cmd_zrangebyscore(self, key, low, high, *options):
+        low = float('-inf') if low == '-inf' else float(low)
+        high = float('inf') if high == '+inf' else float(high)
+        members = sorted((score, member) for member, score in self.data.get(key, {}).items()
+                         if low <= score <= high)
+        result = [member for _, member in members]
+        if len(options) == 3 and options[0].upper() == 'LIMIT':
+            offset, count = int(options[1]), int(options[2])
+            result = result[offset:offset + count]
+        return result
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            try:
+                reply = self.server.store.execute(args[0], args[1:])
+            except AttributeError:
+                self.wfile.write(f"-ERR unknown command '{args[0]}'\r\n".encode())
+                continue
+            except Exception as e:
+                self.wfile.write(f"-ERR {e}\r\n".encode())
+                continue
+            self.wfile.write(self._encode(reply))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            raise ValueError('只支持 RESP 数组命令')
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2].decode('utf-8'))
+        return args
+
+    def _encode(self, value) -> bytes:
+        if value is None:
+            return b'$-1\r\n'
+        if isinstance(value, int):
+            return b':%d\r\n' % value
+        if isinstance(value, list):
+            return b'*%d\r\n' % len(value) + b''.join(self._encode(item) for item in value)
+        if value in ('OK', 'PONG'):
+            return f"+{value}\r\n".encode()
+        data = str(value).encode('utf-8')
+        return b'$%d\r\n%s\r\n' % (len(data), data)
+
+
+class LocalRespServer(socketserver.ThreadingTCPServer):
+    """
+    Redis 协议的本地替身：内存存储，只支持队列用到的命令
+
+    用于单机调试和离线测试，不是 Redis 的替代品。
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), _RespHandler)
+        self.store = _RespStore()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> 'LocalRespServer':
+        """后台线程启动"""
+        threading.Thread(target=self.serve_forever, name='resp-standin', daemon=True).start()
+        return self
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='工作队列工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help='启动本地 Redis 协议替身')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=6390)
+    stats = sub.add_parser('stats', help='查看队列状态')
+    stats.add_argument('url')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        server = LocalRespServer(args.host, args.port)
+        print(f"🧪 本地队列替身: {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    else:
+        queue = open_queue(args.url)
+        print(json.dumps(queue.stats(), ensure_ascii=False))
+        queue.close()